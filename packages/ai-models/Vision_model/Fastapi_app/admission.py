@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from .config import settings
+from .telemetry import LATENCY_BUCKETS
+
+# ========= ADMISSION CONTROL =========
+#
+# Bounded concurrency with a bounded wait queue, per worker process:
+#   - request : every /predict* request (checked before the upload is read)
+#   - vit     : decode + ViT forward passes (CPU bound, keep close to the core count)
+#   - vlm     : Groq calls (network bound, much higher)
+# A request that finds the queue full, or waits longer than ADMISSION_MAX_WAIT, is
+# rejected right away with 503 + Retry-After instead of piling up until clients time out.
+#
+# Retried requests (X-Retry-Attempt >= 1) wait in a priority lane that is always served
+# first, so a client that already backed off is not shed again behind fresh traffic.
+
+IN_FLIGHT = Gauge("vision_admission_in_flight", "Work items holding a slot", ["limiter"],
+                  multiprocess_mode="livesum")
+QUEUED = Gauge("vision_admission_queued", "Work items waiting for a slot", ["limiter"],
+               multiprocess_mode="livesum")
+REJECTED = Counter("vision_admission_rejected_total", "Work items shed with 503", ["limiter", "reason"])
+WAIT_SECONDS = Histogram("vision_admission_wait_seconds", "Time spent waiting for a slot", ["limiter"],
+                         buckets=LATENCY_BUCKETS)
+
+_priority: ContextVar[bool] = ContextVar("vision_admission_priority", default=False)
+
+
+def set_priority(priority: bool):
+    """Mark the current request (and every stage it runs) for the priority lane."""
+    _priority.set(priority)
+
+
+class Overloaded(Exception):
+    def __init__(self, limiter: str, reason: str, retry_after: float):
+        super().__init__(f"Server overloaded ({limiter}: {reason}), retry later")
+        self.limiter = limiter
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, max_wait: float,
+                 retry_after: float, enabled: bool = True):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.enabled = enabled
+
+        self._active = 0
+        # priority lane first; each lane holds up to max_queue waiters
+        self._lanes: tuple[deque, deque] = (deque(), deque())
+
+    @property
+    def queued(self) -> int:
+        return sum(len(lane) for lane in self._lanes)
+
+    @asynccontextmanager
+    async def slot(self, priority: bool | None = None):
+        if not self.enabled:
+            yield
+            return
+        await self._acquire(_priority.get() if priority is None else priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _reject(self, reason: str) -> Overloaded:
+        REJECTED.labels(self.name, reason).inc()
+        return Overloaded(self.name, reason, self.retry_after)
+
+    async def _acquire(self, priority: bool):
+        if self._active < self.max_concurrency and not self.queued:
+            self._active += 1
+            self._update_gauges()
+            WAIT_SECONDS.labels(self.name).observe(0.0)
+            return
+
+        lane = self._lanes[0 if priority else 1]
+        if len(lane) >= self.max_queue:
+            raise self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane.append(waiter)
+        self._update_gauges()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self._release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject("timeout")
+        finally:
+            if waiter in lane:
+                lane.remove(waiter)
+            self._update_gauges()
+        WAIT_SECONDS.labels(self.name).observe(time.monotonic() - start)
+
+    def _release(self):
+        for lane in self._lanes:
+            while lane:
+                waiter = lane.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)  # hand the slot over; _active is unchanged
+                    self._update_gauges()
+                    return
+        self._active -= 1
+        self._update_gauges()
+
+    def _update_gauges(self):
+        IN_FLIGHT.labels(self.name).set(self._active)
+        QUEUED.labels(self.name).set(self.queued)
+
+
+def _limiter(name: str, max_concurrency: int, max_queue: int) -> AdmissionLimiter:
+    return AdmissionLimiter(
+        name,
+        max_concurrency=max_concurrency,
+        max_queue=max_queue,
+        max_wait=settings.ADMISSION_MAX_WAIT,
+        retry_after=settings.ADMISSION_RETRY_AFTER,
+        enabled=settings.ADMISSION_CONTROL,
+    )
+
+
+request_limiter = _limiter("request", settings.ADMISSION_MAX_IN_FLIGHT, settings.ADMISSION_MAX_QUEUE)
+vit_limiter = _limiter("vit", settings.ADMISSION_VIT_CONCURRENCY, settings.ADMISSION_VIT_MAX_QUEUE)
+vlm_limiter = _limiter("vlm", settings.ADMISSION_VLM_CONCURRENCY, settings.ADMISSION_VLM_MAX_QUEUE)
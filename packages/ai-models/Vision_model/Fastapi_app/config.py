@@ -0,0 +1,90 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Settings:
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+
+    # ViT guard models: directory with the four .pt files ("" = Fastapi_app/models) and
+    # the HF model id or local directory their architecture (config.json) comes from
+    MODEL_DIR: str = os.getenv("MODEL_DIR", "")
+    VIT_BASE_MODEL: str = os.getenv("VIT_BASE_MODEL", "google/vit-base-patch16-224-in21k")
+
+    # ViT guard inference backend: eager | int8 | onnx | compile
+    VIT_BACKEND: str = os.getenv("VIT_BACKEND", "eager").strip().lower()
+    # Intra-op threads for torch / ONNX Runtime (0 = library default)
+    VIT_NUM_THREADS: int = int(os.getenv("VIT_NUM_THREADS", "0"))
+    # Max images per ViT forward pass
+    VIT_BATCH_SIZE: int = int(os.getenv("VIT_BATCH_SIZE", "16"))
+
+    # Image sent to the Groq VLM: longest side, JPEG quality and byte cap
+    VLM_MAX_SIDE: int = int(os.getenv("VLM_MAX_SIDE", "1024"))
+    VLM_JPEG_QUALITY: int = int(os.getenv("VLM_JPEG_QUALITY", "85"))
+    VLM_MAX_BYTES: int = int(os.getenv("VLM_MAX_BYTES", str(1024 * 1024)))
+    # call_vlm prompt: v1 = original key-listing prompt, v2 = compact coded taxonomy
+    VLM_PROMPT_VERSION: str = os.getenv("VLM_PROMPT_VERSION", "v2")
+
+    # Result cache: in-memory LRU entries (0 = off), SQLite file for the disk tier
+    # ("" = off), and max dHash Hamming distance for near-duplicates (-1 = exact only)
+    IMAGE_CACHE_SIZE: int = int(os.getenv("IMAGE_CACHE_SIZE", "1024"))
+    IMAGE_CACHE_PATH: str = os.getenv("IMAGE_CACHE_PATH", "")
+    IMAGE_CACHE_DISK_MAX_ENTRIES: int = int(os.getenv("IMAGE_CACHE_DISK_MAX_ENTRIES", "100000"))
+    IMAGE_CACHE_PHASH_DISTANCE: int = int(os.getenv("IMAGE_CACHE_PHASH_DISTANCE", "-1"))
+
+    # ViT-first cascade: skip the VLM when the ViTs are confident (opt-in)
+    VIT_CASCADE: bool = os.getenv("VIT_CASCADE", "false").lower() in ("1", "true", "yes")
+    VIT_CASCADE_SECTOR_CONF: float = float(os.getenv("VIT_CASCADE_SECTOR_CONF", "0.9"))
+    VIT_CASCADE_CATEGORY_CONF: float = float(os.getenv("VIT_CASCADE_CATEGORY_CONF", "0.9"))
+    VIT_CASCADE_INVALID_CONF: float = float(os.getenv("VIT_CASCADE_INVALID_CONF", "0.95"))
+
+    # /predict/batch: max items per request, concurrent Groq calls per batch
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "32"))
+    VLM_CONCURRENCY: int = int(os.getenv("VLM_CONCURRENCY", "8"))
+
+    # /predict/complaint: photos per complaint (Groq accepts up to 5 images per
+    # request) and the longest side each photo is downscaled to
+    COMPLAINT_MAX_IMAGES: int = int(os.getenv("COMPLAINT_MAX_IMAGES", "5"))
+    COMPLAINT_VLM_MAX_SIDE: int = int(os.getenv("COMPLAINT_VLM_MAX_SIDE", "768"))
+
+    # CDN image downloads: byte cap, total timeout (s), pool size, per-host concurrency,
+    # and an optional ETag cache directory ("" = off)
+    FETCH_MAX_BYTES: int = int(os.getenv("FETCH_MAX_BYTES", str(15 * 1024 * 1024)))
+    FETCH_TIMEOUT: float = float(os.getenv("FETCH_TIMEOUT", "15"))
+    FETCH_MAX_CONNECTIONS: int = int(os.getenv("FETCH_MAX_CONNECTIONS", "64"))
+    FETCH_PER_HOST_LIMIT: int = int(os.getenv("FETCH_PER_HOST_LIMIT", "8"))
+    FETCH_CACHE_DIR: str = os.getenv("FETCH_CACHE_DIR", "")
+    FETCH_CACHE_MAX_ENTRIES: int = int(os.getenv("FETCH_CACHE_MAX_ENTRIES", "2000"))
+
+    # Multi-worker launcher (Fastapi_app.serve): worker processes and intra-op
+    # threads per worker (0 = cpus / workers)
+    WEB_WORKERS: int = int(os.getenv("WEB_WORKERS", "2"))
+    WEB_THREADS_PER_WORKER: int = int(os.getenv("WEB_THREADS_PER_WORKER", "0"))
+
+    # Admission control (per worker process): max requests in flight, max queued
+    # behind them, longest wait (s) before a 503, and the Retry-After (s) sent back.
+    # Stage limits: concurrent decode + ViT passes and concurrent Groq calls.
+    # Retried requests (X-Retry-Attempt >= 1) get a priority lane when enabled.
+    ADMISSION_CONTROL: bool = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+    ADMISSION_MAX_IN_FLIGHT: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32"))
+    ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+    ADMISSION_MAX_WAIT: float = float(os.getenv("ADMISSION_MAX_WAIT", "10"))
+    ADMISSION_RETRY_AFTER: float = float(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+    ADMISSION_VIT_CONCURRENCY: int = int(os.getenv("ADMISSION_VIT_CONCURRENCY", "2"))
+    ADMISSION_VIT_MAX_QUEUE: int = int(os.getenv("ADMISSION_VIT_MAX_QUEUE", "64"))
+    ADMISSION_VLM_CONCURRENCY: int = int(os.getenv("ADMISSION_VLM_CONCURRENCY", "32"))
+    ADMISSION_VLM_MAX_QUEUE: int = int(os.getenv("ADMISSION_VLM_MAX_QUEUE", "128"))
+    ADMISSION_PRIORITY_RETRIES: bool = os.getenv("ADMISSION_PRIORITY_RETRIES", "true").lower() in ("1", "true", "yes")
+
+    # Telemetry: Server-Timing response header with per-stage durations, admin token
+    # for /admin/profile ("" = profiling endpoints off), where captures are written
+    # and the stack-sampling interval
+    SERVER_TIMING: bool = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_MAX_REQUESTS: int = int(os.getenv("PROFILE_MAX_REQUESTS", "200"))
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
+
+settings = Settings()
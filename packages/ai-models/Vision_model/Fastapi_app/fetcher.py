@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+
+from .config import settings
+from .telemetry import stage
+
+# ========= IMAGE FETCHER (CDN URLs) =========
+#
+# - one shared httpx.AsyncClient (connection pool + keep-alive) for every download
+# - at most FETCH_PER_HOST_LIMIT concurrent downloads per host (a host's semaphore is
+#   dropped when its last download ends, so arbitrary URLs do not grow the table)
+# - FETCH_MAX_BYTES enforced from Content-Length and again while streaming
+# - the first bytes are sniffed, so non-images are rejected before the rest is downloaded
+# - optional ETag cache on disk (FETCH_CACHE_DIR): repeat URLs are revalidated with
+#   If-None-Match and served locally on 304
+#
+# Every failure is raised as ValueError (turned into a 400 by the API).
+
+# Formats PIL can decode without plugins
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+)
+SNIFF_BYTES = 16
+
+# Content types that may still carry an image; anything else non-image/* is rejected
+GENERIC_CONTENT_TYPES = ("", "application/octet-stream", "binary/octet-stream")
+
+
+def sniff_image(head: bytes) -> str | None:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, kind in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    return None
+
+
+class _HostSlot:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0      # downloads holding or waiting for the semaphore
+
+
+class ImageFetcher:
+    def __init__(self, max_bytes: int, timeout: float, max_connections: int, per_host_limit: int,
+                 cache_dir: str = "", cache_max_entries: int = 2000):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.cache_dir = cache_dir
+        self.cache_max_entries = cache_max_entries
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self._client: httpx.AsyncClient | None = None
+        # only hosts with a download in progress or queued
+        self._host_slots: dict[str, _HostSlot] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections // 2,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, url: str) -> bytes:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Invalid image URL: {url}")
+
+        with stage("download"):
+            async with self._host_slot(parts.hostname):
+                try:
+                    # httpx timeouts are per operation; cap the whole download as well
+                    return await asyncio.wait_for(self._fetch(url), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    raise ValueError(f"Failed to download image from URL: timed out after {self.timeout:g}s")
+                except httpx.HTTPError as e:
+                    raise ValueError(f"Failed to download image from URL: {str(e)}")
+
+    @asynccontextmanager
+    async def _host_slot(self, hostname: str):
+        slot = self._host_slots.get(hostname)
+        if slot is None:
+            slot = self._host_slots[hostname] = _HostSlot(self.per_host_limit)
+        slot.users += 1
+        try:
+            async with slot.semaphore:
+                yield
+        finally:
+            slot.users -= 1
+            if slot.users == 0:
+                del self._host_slots[hostname]
+
+    async def _fetch(self, url: str) -> bytes:
+        cached = await asyncio.to_thread(self._cache_read, url) if self.cache_dir else None
+        headers = {"If-None-Match": cached[0]} if cached else {}
+
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached:
+                return cached[1]
+            response.raise_for_status()
+
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            if not content_type.startswith("image/") and content_type not in GENERIC_CONTENT_TYPES:
+                raise ValueError(f"URL does not point to an image. Content-Type: {content_type}")
+
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                raise ValueError(f"Image too large: {declared} bytes (max {self.max_bytes})")
+
+            body = bytearray()
+            sniffed = False
+            async for chunk in response.aiter_bytes():
+                body.extend(chunk)
+                if len(body) > self.max_bytes:
+                    raise ValueError(f"Image too large: more than {self.max_bytes} bytes")
+                if not sniffed and len(body) >= SNIFF_BYTES:
+                    if sniff_image(bytes(body[:SNIFF_BYTES])) is None:
+                        raise ValueError("URL content is not a supported image (jpeg, png, webp, gif, bmp, tiff)")
+                    sniffed = True
+
+            if not sniffed and sniff_image(bytes(body)) is None:
+                raise ValueError("URL content is not a supported image (jpeg, png, webp, gif, bmp, tiff)")
+
+            data = bytes(body)
+            etag = response.headers.get("etag")
+            if self.cache_dir and etag:
+                await asyncio.to_thread(self._cache_write, url, etag, data)
+            return data
+
+    # ----- ETag cache -----
+
+    def _cache_paths(self, url: str) -> tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".json"), os.path.join(self.cache_dir, key + ".bin")
+
+    def _cache_read(self, url: str) -> tuple[str, bytes] | None:
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or len(body) != meta.get("size"):
+            return None
+        os.utime(body_path)  # prune evicts least recently used first
+        return meta["etag"], body
+
+    def _cache_write(self, url: str, etag: str, body: bytes):
+        meta_path, body_path = self._cache_paths(url)
+        # Body first, metadata last: a reader never sees metadata for a partial body
+        for path, payload in (
+            (body_path, body),
+            (meta_path, json.dumps({"url": url, "etag": etag, "size": len(body)}).encode("utf-8")),
+        ):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        self._cache_prune()
+
+    def _cache_prune(self):
+        bodies = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".bin")]
+        if len(bodies) <= self.cache_max_entries:
+            return
+        bodies.sort(key=lambda e: e.stat().st_mtime)
+        for entry in bodies[:len(bodies) - self.cache_max_entries]:
+            for path in (entry.path, entry.path[:-len(".bin")] + ".json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+image_fetcher = ImageFetcher(
+    max_bytes=settings.FETCH_MAX_BYTES,
+    timeout=settings.FETCH_TIMEOUT,
+    max_connections=settings.FETCH_MAX_CONNECTIONS,
+    per_host_limit=settings.FETCH_PER_HOST_LIMIT,
+    cache_dir=settings.FETCH_CACHE_DIR,
+    cache_max_entries=settings.FETCH_CACHE_MAX_ENTRIES,
+)
@@ -1,25 +1,39 @@
 import os
+import asyncio
 import base64
+import hashlib
 import json
+import logging
 from io import BytesIO
 
 import torch
-from transformers import ViTForImageClassification
+from PIL import UnidentifiedImageError
+from transformers import ViTConfig, ViTForImageClassification
 from groq import Groq
 
-from .utils import load_image, get_top_class
+from .admission import vit_limiter, vlm_limiter
+from .config import settings
+from .result_cache import ImageResultCache
+from .telemetry import stage
+from .utils import PreparedImage, load_image, prepare_image
+from .vit_backends import build_vit_runner
 
 # ========= CORE CONFIG =========
 
-MODEL_DIR = os.path.join(os.path.dirname(__file__), "models")
+MODEL_DIR = settings.MODEL_DIR or os.path.join(os.path.dirname(__file__), "models")
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
+if settings.VIT_NUM_THREADS > 0:
+    torch.set_num_threads(settings.VIT_NUM_THREADS)
+
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise RuntimeError("GROQ_API_KEY environment variable is not set")
 
 groq_client = Groq(api_key=GROQ_API_KEY)
 
+logger = logging.getLogger(__name__)
+
 
 def normalize_key(text: str | None) -> str | None:
     if text is None:
@@ -284,92 +298,138 @@ VIT_SUPPORTED_SECTORS = {"infrastructure", "education", "environment"}
 
 # ========= VIT MODELS (GUARD FOR 3 SECTORS) =========
 
-def load_vit_model(model_path, id2label):
-    model = ViTForImageClassification.from_pretrained(
-        "google/vit-base-patch16-224-in21k",
+def load_vit_model(model_path, id2label, backend=settings.VIT_BACKEND):
+    # Only the architecture comes from VIT_BASE_MODEL: every weight is overwritten by
+    # the fine-tuned state dict, so the pretrained weights are never downloaded
+    config = ViTConfig.from_pretrained(
+        settings.VIT_BASE_MODEL,
         num_labels=len(id2label),
         id2label=id2label,
         label2id={v: k for k, v in id2label.items()},
     )
+    model = ViTForImageClassification(config)
     state_dict = torch.load(model_path, map_location=device)
     model.load_state_dict(state_dict)
     model.to(device)
     model.eval()
-    return model
+    return build_vit_runner(model, backend, model_path, device, settings.VIT_NUM_THREADS)
 
 
 sector_id2label = {0: "infrastructure", 1: "education", 2: "environment", 3: "invalid"}
-sector_model = load_vit_model(os.path.join(MODEL_DIR, "sector_model.pt"), sector_id2label)
-
 infra_id2label = {0: "collapsed_bridge", 1: "fallen_electric_pole", 2: "potholes", 3: "invalid"}
-infra_model = load_vit_model(os.path.join(MODEL_DIR, "infra_model.pt"), infra_id2label)
-
 edu_id2label = {
     0: "broken_blackboard",
     1: "broken_classroom_bench",
     2: "dirty_drinking_water",
     3: "invalid",
 }
-education_model = load_vit_model(os.path.join(MODEL_DIR, "education_model.pt"), edu_id2label)
-
 env_id2label = {
     0: "air_pollution",
     1: "water_pollution",
     2: "plastic_waste_accumulation",
     3: "invalid",
 }
+
+# name -> (weights file, id2label); shared with the offline backend report
+VIT_MODEL_SPECS = {
+    "sector": ("sector_model.pt", sector_id2label),
+    "infrastructure": ("infra_model.pt", infra_id2label),
+    "education": ("education_model.pt", edu_id2label),
+    "environment": ("environment_model.pt", env_id2label),
+}
+
+sector_model = load_vit_model(os.path.join(MODEL_DIR, "sector_model.pt"), sector_id2label)
+infra_model = load_vit_model(os.path.join(MODEL_DIR, "infra_model.pt"), infra_id2label)
+education_model = load_vit_model(os.path.join(MODEL_DIR, "education_model.pt"), edu_id2label)
 environment_model = load_vit_model(os.path.join(MODEL_DIR, "environment_model.pt"), env_id2label)
 
 
 def vit_predict(image_bytes: bytes) -> dict:
     """Run ViT sector + subclass models (only for the 3 supported sectors)."""
-    tensor = load_image(BytesIO(image_bytes)).to(device)
-
-    sector_logits = sector_model(tensor).logits
-    sector_idx, sector_conf = get_top_class(sector_logits)
-    sector = sector_id2label[sector_idx]
-
-    category = None
-    cat_conf = None
-
-    if sector == "infrastructure":
-        logits = infra_model(tensor).logits
-        idx, conf = get_top_class(logits)
-        category = infra_id2label[idx]
-        cat_conf = conf
-    elif sector == "education":
-        logits = education_model(tensor).logits
-        idx, conf = get_top_class(logits)
-        category = edu_id2label[idx]
-        cat_conf = conf
-    elif sector == "environment":
-        logits = environment_model(tensor).logits
-        idx, conf = get_top_class(logits)
-        category = env_id2label[idx]
-        cat_conf = conf
-    else:
-        category = None
-        cat_conf = sector_conf
+    return vit_predict_tensor(load_image(BytesIO(image_bytes)))
 
-    return {
-        "sector": sector,
-        "category": category,
-        "sector_confidence": round(sector_conf, 3),
-        "category_confidence": round(cat_conf, 3) if cat_conf is not None else None,
-    }
 
+def vit_predict_tensor(tensor: torch.Tensor) -> dict:
+    """Same as vit_predict, on an already transformed (1, 3, 224, 224) tensor."""
+    return vit_predict_batch(tensor)[0]
+
+
+VIT_SUBCLASS_MODELS = {
+    "infrastructure": (infra_model, infra_id2label),
+    "education": (education_model, edu_id2label),
+    "environment": (environment_model, env_id2label),
+}
+
+
+def _top_classes(runner, tensor: torch.Tensor, stage_name: str) -> tuple[list[int], list[float]]:
+    """Top class index + confidence per row, running at most VIT_BATCH_SIZE images per forward pass."""
+    indices, confidences = [], []
+    for start in range(0, len(tensor), settings.VIT_BATCH_SIZE):
+        with stage(stage_name, torch_ops=True):
+            logits = runner(tensor[start:start + settings.VIT_BATCH_SIZE])
+        probs = torch.softmax(logits.float(), dim=1)
+        confidence, predicted = torch.max(probs, dim=1)
+        indices.extend(predicted.tolist())
+        confidences.extend(confidence.tolist())
+    return indices, confidences
 
-# ========= VLM (GROQ) — PRIMARY BRAIN =========
 
-def call_vlm(image_bytes: bytes) -> dict:
+def vit_predict_batch(tensor: torch.Tensor) -> list[dict]:
     """
-    Groq Vision (LLaMA) classifier for all 20 sectors.
-    Returns sector_key, problem_key, is_valid.
+    ViT sector + subclass models for a (N, 3, 224, 224) batch: one sector-model pass
+    over all N images, then one pass per subclass model over the images routed to it.
     """
-    base64_image = base64.b64encode(image_bytes).decode("utf-8")
+    sector_indices, sector_confs = _top_classes(sector_model, tensor, "vit_sector")
+    sectors = [sector_id2label[idx] for idx in sector_indices]
+
+    categories: list[str | None] = [None] * len(sectors)
+    # Non-ViT sectors (invalid) report the sector confidence as category confidence
+    cat_confs: list[float | None] = list(sector_confs)
+
+    for sector, (model, id2label) in VIT_SUBCLASS_MODELS.items():
+        rows = [i for i, s in enumerate(sectors) if s == sector]
+        if not rows:
+            continue
+        indices, confs = _top_classes(model, tensor[rows], f"vit_{sector}")
+        for row, idx, conf in zip(rows, indices, confs):
+            categories[row] = id2label[idx]
+            cat_confs[row] = conf
+
+    return [
+        {
+            "sector": sector,
+            "category": category,
+            "sector_confidence": round(sector_conf, 3),
+            "category_confidence": round(cat_conf, 3) if cat_conf is not None else None,
+        }
+        for sector, category, sector_conf, cat_conf in zip(sectors, categories, sector_confs, cat_confs)
+    ]
+
+
+# ========= VLM (GROQ) — PRIMARY BRAIN =========
+
+VLM_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
 
+# Both prompts are compiled once at import. PROMPT_VERSION is part of the result-cache
+# version, so switching prompts invalidates cached predictions.
+#   v1: original prompt, every category key listed as a Python list, answers with keys
+#   v2: compact numbered taxonomy in plain words, answers with sector / category codes
+PROMPT_VERSION = settings.VLM_PROMPT_VERSION
+
+# Codes are 1-based positions in SECTOR_CATEGORIES; 0 means invalid / none
+SECTOR_CODES: dict[int, str] = {i: sector for i, sector in enumerate(SECTOR_CATEGORIES, 1)}
+CATEGORY_CODES: dict[str, dict[int, str]] = {
+    sector: {j: category for j, category in enumerate(categories, 1)}
+    for sector, categories in SECTOR_CATEGORIES.items()
+}
+
+
+def _build_prompt_v1() -> str:
     sectors_list = sorted(list(ALL_SECTORS))
-    prompt = f"""
+    sector_lines = "\n".join(
+        f"{i}) {sector}: {categories}" for i, (sector, categories) in enumerate(SECTOR_CATEGORIES.items(), 1)
+    )
+    return f"""
 You are an image classifier for government civic complaints in India.
 
 You MUST output a JSON object with EXACTLY these keys:
@@ -379,26 +439,7 @@ You MUST output a JSON object with EXACTLY these keys:
 
 Sectors and their allowed problem category keys are:
 
-1) infrastructure: {SECTOR_CATEGORIES["infrastructure"]}
-2) education: {SECTOR_CATEGORIES["education"]}
-3) environment: {SECTOR_CATEGORIES["environment"]}
-4) health: {SECTOR_CATEGORIES["health"]}
-5) water_supply_and_sanitation: {SECTOR_CATEGORIES["water_supply_and_sanitation"]}
-6) electricity_and_power: {SECTOR_CATEGORIES["electricity_and_power"]}
-7) transportation: {SECTOR_CATEGORIES["transportation"]}
-8) municipal_services: {SECTOR_CATEGORIES["municipal_services"]}
-9) police_services: {SECTOR_CATEGORIES["police_services"]}
-10) revenue: {SECTOR_CATEGORIES["revenue"]}
-11) housing_and_urban_development: {SECTOR_CATEGORIES["housing_and_urban_development"]}
-12) social_welfare: {SECTOR_CATEGORIES["social_welfare"]}
-13) public_grievances: {SECTOR_CATEGORIES["public_grievances"]}
-14) tourism_and_culture: {SECTOR_CATEGORIES["tourism_and_culture"]}
-15) agriculture: {SECTOR_CATEGORIES["agriculture"]}
-16) rural_development: {SECTOR_CATEGORIES["rural_development"]}
-17) women_and_child_development: {SECTOR_CATEGORIES["women_and_child_development"]}
-18) sports_and_youth_affairs: {SECTOR_CATEGORIES["sports_and_youth_affairs"]}
-19) fire_and_emergency: {SECTOR_CATEGORIES["fire_and_emergency"]}
-20) transport_safety: {SECTOR_CATEGORIES["transport_safety"]}
+{sector_lines}
 
 Rules:
 - If the image clearly shows one of the civic issues above, choose the correct "sector" and "category" and set "is_valid": true.
@@ -408,57 +449,294 @@ Rules:
 Return ONLY a JSON object, no explanation.
 """
 
-    completion = groq_client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct",
-        temperature=0,
-        max_completion_tokens=256,
-        response_format={"type": "json_object"},
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}",
-                        },
-                    },
-                ],
-            }
-        ],
-    )
 
-    content = completion.choices[0].message.content
-    if isinstance(content, str):
-        data = json.loads(content)
-    else:
-        data = content
+TAXONOMY_TEXT = "\n".join(
+    f"{i} {sector.replace('_', ' ')}: "
+    + ", ".join(f"{j} {category.replace('_', ' ')}" for j, category in CATEGORY_CODES[sector].items())
+    for i, sector in SECTOR_CODES.items()
+)
+
+
+def _build_prompt_v2() -> str:
+    return f"""Classify the photo for an Indian civic complaint portal.
+Taxonomy: sector code + name, then its numbered problem categories.
+{TAXONOMY_TEXT}
+Reply with JSON only: {{"s": sector code, "c": category code, "v": true}}
+If it shows none of these issues (selfie, random object, scenery, animals, unrelated scene) reply {{"s": 0, "c": 0, "v": false}}."""
+
+
+def build_complaint_prompt(num_images: int) -> str:
+    """Coded taxonomy prompt for several photos of one complaint (one decision + validity per photo)."""
+    return f"""The {num_images} photos belong to ONE civic complaint on an Indian complaint portal and should show the same issue.
+Taxonomy: sector code + name, then its numbered problem categories.
+{TAXONOMY_TEXT}
+Reply with JSON only: {{"s": sector code, "c": category code, "v": [one true/false per photo, in order]}}
+"v" is true for photos that actually show that issue, false for irrelevant ones (selfie, random object, scenery, animals, unrelated scene).
+If no photo shows any of these issues reply {{"s": 0, "c": 0, "v": [false, ...]}}."""
+
+
+VLM_PROMPTS = {"v1": _build_prompt_v1(), "v2": _build_prompt_v2()}
+VLM_MAX_COMPLETION_TOKENS = {"v1": 256, "v2": 32}
+
+if PROMPT_VERSION not in VLM_PROMPTS:
+    raise RuntimeError(f"Unknown VLM_PROMPT_VERSION '{PROMPT_VERSION}'. Expected one of {sorted(VLM_PROMPTS)}")
 
+
+def _as_int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _as_flag(value) -> bool:
+    """Strict JSON boolean: true, 1 and "true"/"1"/"yes" count; "false", "0", lists, null do not."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value == 1
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes")
+    return False
+
+
+def decode_vlm_codes(data: dict) -> dict:
+    """Map a v2 answer {"s", "c", "v"} back to sector / category keys, rejecting unknown codes."""
+    sector_key = SECTOR_CODES.get(_as_int(data.get("s")), "invalid")
+    category_key = None
+    if sector_key != "invalid":
+        category_key = CATEGORY_CODES[sector_key].get(_as_int(data.get("c")))
+    return {
+        "sector_key": sector_key,
+        "category_key": category_key,
+        "is_valid": _as_flag(data.get("v")) and sector_key != "invalid",
+    }
+
+
+def decode_vlm_keys(data: dict) -> dict:
+    """Normalize a v1 answer {"sector", "category", "is_valid"}."""
     sector_key = normalize_key(data.get("sector", "invalid"))
     category_key = data.get("category", None)
     if isinstance(category_key, str):
         category_key = normalize_key(category_key)
-    is_valid = bool(data.get("is_valid", False))
-
     return {
         "sector_key": sector_key,
         "category_key": category_key,
-        "is_valid": is_valid,
+        "is_valid": _as_flag(data.get("is_valid")),
     }
 
 
+def request_vlm(jpeg_bytes: bytes, prompt_version: str = PROMPT_VERSION):
+    """Raw Groq completion for one image (the prompt comparison tool reads its usage)."""
+    with stage("vlm_base64"):
+        base64_image = base64.b64encode(jpeg_bytes).decode("utf-8")
+    with stage("vlm"):
+        return groq_client.chat.completions.create(
+            model=VLM_MODEL,
+            temperature=0,
+            max_completion_tokens=VLM_MAX_COMPLETION_TOKENS[prompt_version],
+            response_format={"type": "json_object"},
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": VLM_PROMPTS[prompt_version]},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{base64_image}",
+                            },
+                        },
+                    ],
+                }
+            ],
+        )
+
+
+def parse_vlm_response(completion, prompt_version: str = PROMPT_VERSION) -> dict:
+    content = completion.choices[0].message.content
+    if isinstance(content, str):
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError as e:
+            # Not a ValueError for callers: bad input images are reported as ValueError
+            raise RuntimeError(f"VLM returned invalid JSON: {e}") from e
+    else:
+        data = content
+    return decode_vlm_codes(data) if prompt_version == "v2" else decode_vlm_keys(data)
+
+
+def call_vlm(jpeg_bytes: bytes) -> dict:
+    """
+    Groq Vision (LLaMA) classifier for all 20 sectors.
+    Expects JPEG bytes (see utils.prepare_image for the size-capped copy).
+    Returns sector_key, problem_key, is_valid.
+    """
+    return parse_vlm_response(request_vlm(jpeg_bytes))
+
+
+def call_vlm_complaint(jpeg_images: list[bytes]) -> dict:
+    """
+    One Groq request for all photos of a complaint (each as its own image_url part).
+    Returns sector_key, category_key, is_valid plus image_valid (one bool per photo).
+    """
+    content = [{"type": "text", "text": build_complaint_prompt(len(jpeg_images))}]
+    with stage("vlm_base64"):
+        for jpeg_bytes in jpeg_images:
+            base64_image = base64.b64encode(jpeg_bytes).decode("utf-8")
+            content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}})
+
+    with stage("vlm"):
+        completion = groq_client.chat.completions.create(
+            model=VLM_MODEL,
+            temperature=0,
+            max_completion_tokens=64,
+            response_format={"type": "json_object"},
+            messages=[{"role": "user", "content": content}],
+        )
+    try:
+        data = json.loads(completion.choices[0].message.content)
+    except json.JSONDecodeError as e:
+        # Not a ValueError for callers: bad input images are reported as ValueError
+        raise RuntimeError(f"VLM returned invalid JSON: {e}") from e
+
+    flags = data.get("v")
+    flags = list(flags) if isinstance(flags, list) else [flags] * len(jpeg_images)
+    flags = [_as_flag(f) for f in flags[:len(jpeg_images)]]
+    flags += [False] * (len(jpeg_images) - len(flags))
+
+    decoded = decode_vlm_codes({"s": data.get("s"), "c": data.get("c"), "v": any(flags)})
+    decoded["image_valid"] = flags if decoded["is_valid"] else [False] * len(jpeg_images)
+    return decoded
+
+
 # ========= HYBRID DECISION (VLM PRIMARY + ViT GUARD FOR 3 SECTORS) =========
 
+def _model_version() -> str:
+    """Fingerprint of everything that can change a prediction: weights, backend, VLM, prompt, cascade."""
+    parts = [VLM_MODEL, PROMPT_VERSION, settings.VIT_BACKEND]
+    if settings.VIT_CASCADE:
+        parts.append(
+            f"cascade:{settings.VIT_CASCADE_SECTOR_CONF}:{settings.VIT_CASCADE_CATEGORY_CONF}"
+            f":{settings.VIT_CASCADE_INVALID_CONF}"
+        )
+    for filename, _ in VIT_MODEL_SPECS.values():
+        stat = os.stat(os.path.join(MODEL_DIR, filename))
+        parts.append(f"{filename}:{stat.st_size}:{int(stat.st_mtime)}")
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+
+result_cache = ImageResultCache(
+    version=_model_version(),
+    max_entries=settings.IMAGE_CACHE_SIZE,
+    disk_path=settings.IMAGE_CACHE_PATH,
+    phash_distance=settings.IMAGE_CACHE_PHASH_DISTANCE,
+    disk_max_entries=settings.IMAGE_CACHE_DISK_MAX_ENTRIES,
+)
+
+
 def predict_issue_hybrid(image_bytes: bytes) -> dict:
+    """
+    Cached front of the hybrid pipeline:
+    exact SHA-256 hit -> near-duplicate dHash hit (if enabled) -> full VLM + ViT run.
+    """
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    cached = result_cache.get(digest)
+    if cached is not None:
+        return cached
+
+    # Decode once: ViT tensor + downscaled JPEG for the VLM
+    prepared = prepare_image(image_bytes)
+    logger.info(
+        "image prepared: %d bytes in, %d bytes to VLM, decode %.1f ms",
+        prepared.bytes_in, len(prepared.vlm_jpeg), prepared.decode_ms,
+    )
+
+    cached = result_cache.get_near(prepared.phash)
+    if cached is not None:
+        result_cache.put(digest, prepared.phash, cached)
+        return cached
+
+    result = predict_prepared(prepared)
+    result_cache.put(digest, prepared.phash, result)
+    return result
+
+
+def predict_prepared(prepared: PreparedImage) -> dict:
+    """
+    Default: VLM + ViT guard on every image (see combine_vlm_vit).
+    Cascade (VIT_CASCADE=true): the ViTs run first and the VLM is skipped when they are
+    confident enough (see cascade_shortcut).
+    """
+    vit = vit_predict_tensor(prepared.tensor)
+
+    if settings.VIT_CASCADE:
+        shortcut = cascade_shortcut(vit)
+        if shortcut is not None:
+            return shortcut
+
+    vlm = call_vlm(prepared.vlm_jpeg)
+    return combine_vlm_vit(vlm, vit)
+
+
+def cascade_shortcut(
+    vit: dict,
+    sector_threshold: float | None = None,
+    category_threshold: float | None = None,
+    invalid_threshold: float | None = None,
+) -> dict | None:
+    """
+    Final result straight from the ViTs, or None when the VLM is still needed.
+    - confident in-domain: sector and subclass confidences clear their thresholds
+      (a subclass "invalid", or one outside that sector's SECTOR_CATEGORIES such as the
+      infrastructure model's "fallen_electric_pole", never short-circuits)
+    - confident rejection: sector model says "invalid" above the invalid threshold
+    Thresholds default to the VIT_CASCADE_* settings; the replay tool passes its own.
+    """
+    sector_threshold = settings.VIT_CASCADE_SECTOR_CONF if sector_threshold is None else sector_threshold
+    category_threshold = settings.VIT_CASCADE_CATEGORY_CONF if category_threshold is None else category_threshold
+    invalid_threshold = settings.VIT_CASCADE_INVALID_CONF if invalid_threshold is None else invalid_threshold
+
+    vit_sector = vit["sector"]
+    vit_category = vit["category"]
+    vit_sector_conf = vit["sector_confidence"]
+    vit_cat_conf = vit["category_confidence"]
+
+    if vit_sector == "invalid":
+        if vit_sector_conf < invalid_threshold:
+            return None
+        return {
+            "sector": "Invalid",
+            "category": None,
+            "is_valid": False,
+            "source": "vit_cascade_invalid",
+            "confidence_vlm": None,
+            "confidence_vit": vit_sector_conf,
+        }
+
+    if (
+        vit_category is None
+        or vit_category not in SECTOR_CATEGORIES.get(vit_sector, ())
+        or vit_sector_conf < sector_threshold
+        or vit_cat_conf < category_threshold
+    ):
+        return None
+    return {
+        "sector": key_to_display(vit_sector),
+        "category": vit_category,
+        "is_valid": True,
+        "source": "vit_cascade_accept",
+        "confidence_vlm": None,
+        "confidence_vit": vit_cat_conf,
+    }
+
+
+def combine_vlm_vit(vlm: dict, vit: dict) -> dict:
     """
     1) VLM decides sector + category for 20 sectors.
     2) ViT validates only infra/education/environment and can override to invalid.
     3) Returns a rich JSON with is_valid_issue boolean.
     """
-
-    # 1) VLM classification
-    vlm = call_vlm(image_bytes)
     vlm_sector_key = vlm["sector_key"]
     vlm_category_key = vlm["category_key"]
     vlm_is_valid = vlm["is_valid"]
@@ -475,8 +753,7 @@ def predict_issue_hybrid(image_bytes: bytes) -> dict:
             # if VLM gives weird category, null it out
             vlm_category_key = None
 
-    # 2) ViT guard (only for infra / education / environment)
-    vit = vit_predict(image_bytes)
+    # ViT guard (only for infra / education / environment)
     vit_sector = vit["sector"]
     vit_category = vit["category"]
     vit_sector_conf = vit["sector_confidence"]
@@ -526,8 +803,170 @@ def predict_issue_hybrid(image_bytes: bytes) -> dict:
         "sector": key_to_display(final_sector_key) if final_sector_key != "invalid" else "Invalid",
         "category": final_problem_key,
         "is_valid": is_valid_issue,
-        "source": source,  # VLM_primary, VLM_primary_ViT_guard, vit_override_invalid, etc.
+        "source": source,  # vlm_invalid, vlm_primary_vit_guard, vit_override_invalid, vlm_primary_no_vit_needed
         "confidence_vlm": 1.0 if vlm_is_valid else 0.0,
         "confidence_vit": vit_cat_conf if is_supported_by_vit else None
     }
 
+
+# ========= BATCH (ONE ViT PASS, CONCURRENT VLM CALLS) =========
+
+def _prepare_or_error(image_bytes: bytes) -> PreparedImage | Exception:
+    try:
+        return prepare_image(image_bytes)
+    except UnidentifiedImageError:
+        return ValueError("Unsupported or corrupt image data")
+    except Exception as e:
+        return e
+
+
+async def predict_issue_hybrid_batch(images: list[bytes]) -> list[dict | Exception]:
+    """
+    Batched predict_issue_hybrid, same results per image:
+    1) cache lookups (identical bytes within the batch are classified once)
+    2) one batched ViT pass over every cache miss
+    3) VLM calls for the images that still need one, at most VLM_CONCURRENCY at a time
+    A failing image gets its exception in its slot instead of failing the whole batch.
+    The cache can hit SQLite, so every cache call runs in a thread, off the event loop.
+    """
+    results: list[dict | Exception | None] = [None] * len(images)
+
+    def lookup_exact() -> list[tuple[str, dict | None]]:
+        digests = [hashlib.sha256(image_bytes).hexdigest() for image_bytes in images]
+        return [(digest, result_cache.get(digest)) for digest in digests]
+
+    todo: dict[str, list[int]] = {}
+    for i, (digest, cached) in enumerate(await asyncio.to_thread(lookup_exact)):
+        if cached is not None:
+            results[i] = cached
+        else:
+            todo.setdefault(digest, []).append(i)
+
+    async with vit_limiter.slot():
+        decoded = await asyncio.to_thread(
+            lambda: [_prepare_or_error(images[indices[0]]) for indices in todo.values()]
+        )
+
+    def lookup_near() -> list[dict | None]:
+        nears = []
+        for digest, item in zip(todo, decoded):
+            near = result_cache.get_near(item.phash) if isinstance(item, PreparedImage) else None
+            if near is not None:
+                result_cache.put(digest, item.phash, near)
+            nears.append(near)
+        return nears
+
+    prepared: dict[str, PreparedImage] = {}
+    nears = await asyncio.to_thread(lookup_near) if todo else []
+    for (digest, indices), item, near in zip(todo.items(), decoded, nears):
+        outcome = item
+        if isinstance(item, PreparedImage):
+            if near is None:
+                prepared[digest] = item
+                continue
+            outcome = near
+        for i in indices:
+            results[i] = dict(outcome) if isinstance(outcome, dict) else outcome
+
+    if prepared:
+        async with vit_limiter.slot():
+            vits = await asyncio.to_thread(
+                vit_predict_batch, torch.cat([item.tensor for item in prepared.values()])
+            )
+        semaphore = asyncio.Semaphore(settings.VLM_CONCURRENCY)
+
+        async def finish(digest: str, vit: dict) -> dict:
+            item = prepared[digest]
+            result = cascade_shortcut(vit) if settings.VIT_CASCADE else None
+            if result is None:
+                async with semaphore, vlm_limiter.slot():
+                    vlm = await asyncio.to_thread(call_vlm, item.vlm_jpeg)
+                result = combine_vlm_vit(vlm, vit)
+            await asyncio.to_thread(result_cache.put, digest, item.phash, result)
+            return result
+
+        outcomes = await asyncio.gather(
+            *(finish(digest, vit) for digest, vit in zip(prepared, vits)), return_exceptions=True
+        )
+        for digest, outcome in zip(prepared, outcomes):
+            for i in todo[digest]:
+                results[i] = dict(outcome) if isinstance(outcome, dict) else outcome
+
+    return results
+
+
+async def predict_issue_hybrid_async(image_bytes: bytes) -> dict:
+    """predict_issue_hybrid for the API: decode, ViT and VLM run in threads under their admission limits."""
+    (result,) = await predict_issue_hybrid_batch([image_bytes])
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+# ========= MULTI-IMAGE COMPLAINT (ONE VLM REQUEST FOR ALL PHOTOS) =========
+
+def predict_complaint(images: list[bytes]) -> dict:
+    """
+    One sector/category decision for all photos of a complaint:
+    1) every photo is decoded once and downscaled to COMPLAINT_VLM_MAX_SIDE
+    2) one batched ViT pass + one VLM request carrying all photos
+    3) per photo, the usual VLM + ViT guard decision (combine_vlm_vit)
+    4) the complaint is valid when at least one photo is
+    Raises ValueError naming the photo that could not be decoded.
+    """
+    prepared, vits = _complaint_vit(images)
+    vlm = call_vlm_complaint([item.vlm_jpeg for item in prepared])
+    return combine_complaint(vlm, vits)
+
+
+async def predict_complaint_async(images: list[bytes]) -> dict:
+    """predict_complaint for the API: the ViT and VLM steps run under their admission limits."""
+    async with vit_limiter.slot():
+        prepared, vits = await asyncio.to_thread(_complaint_vit, images)
+    async with vlm_limiter.slot():
+        vlm = await asyncio.to_thread(call_vlm_complaint, [item.vlm_jpeg for item in prepared])
+    return combine_complaint(vlm, vits)
+
+
+def _complaint_vit(images: list[bytes]) -> tuple[list[PreparedImage], list[dict]]:
+    prepared = []
+    for i, image_bytes in enumerate(images):
+        try:
+            prepared.append(prepare_image(image_bytes, vlm_max_side=settings.COMPLAINT_VLM_MAX_SIDE))
+        except UnidentifiedImageError:
+            raise ValueError(f"Image {i}: unsupported or corrupt image data")
+    return prepared, vit_predict_batch(torch.cat([item.tensor for item in prepared]))
+
+
+def combine_complaint(vlm: dict, vits: list[dict]) -> dict:
+    per_image = []
+    for i, (vit, image_valid) in enumerate(zip(vits, vlm["image_valid"])):
+        decision = combine_vlm_vit({**vlm, "is_valid": image_valid}, vit)
+        per_image.append({
+            "index": i,
+            "is_valid": decision["is_valid"],
+            "source": decision["source"],
+            "vit_sector": vit["sector"],
+            "confidence_vit": decision["confidence_vit"],
+        })
+
+    is_valid = any(image["is_valid"] for image in per_image)
+    if is_valid:
+        sector = key_to_display(vlm["sector_key"])
+        category = vlm["category_key"]
+        if vlm["sector_key"] in VIT_SUPPORTED_SECTORS:
+            source = "vlm_multi_image_vit_guard"
+        else:
+            source = "vlm_multi_image_no_vit_needed"
+    else:
+        sector, category = "Invalid", None
+        source = "vlm_invalid" if not vlm["is_valid"] else "vit_override_invalid"
+
+    return {
+        "sector": sector,
+        "category": category,
+        "is_valid": is_valid,
+        "source": source,
+        "confidence_vlm": 1.0 if vlm["is_valid"] else 0.0,
+        "images": per_image,
+    }
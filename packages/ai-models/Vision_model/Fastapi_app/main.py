@@ -1,4 +1,5 @@
 import os
+import logging
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -12,14 +13,33 @@ os.environ["LANGCHAIN_TRACING_V2"]="true"
 os.environ["LANGCHAIN_PROJECT"]="You_current_project_name"
 
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+import asyncio
+import hmac
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
-from typing import Optional
-from .inference import predict_issue_hybrid
+from typing import List, Optional
+from .inference import predict_issue_hybrid_async, predict_issue_hybrid_batch, predict_complaint_async
 from .utils import download_image_from_url
+from .fetcher import image_fetcher
+from .config import settings
+from .admission import Overloaded, request_limiter, set_priority
+from .telemetry import REQUEST_SECONDS, render_metrics, request_profiler, start_request_timings
+
+logging.basicConfig(level=settings.LOG_LEVEL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await image_fetcher.aclose()
+
 
-app = FastAPI(title="SwarajDesk_CV_API (Hybrid VLM + ViT)", version="3.0")
+app = FastAPI(title="SwarajDesk_CV_API (Hybrid VLM + ViT)", version="3.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,9 +49,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def stage_timing(request: Request, call_next):
+    """Request histogram, optional Server-Timing header, and the armed profile capture."""
+    path = request.url.path
+    if path == "/metrics" or path.startswith("/admin/"):
+        return await call_next(request)
+
+    timings = start_request_timings()
+    profiled = request_profiler.request_started()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        if profiled:
+            # The last profiled request writes the capture to PROFILE_DIR
+            await asyncio.to_thread(request_profiler.request_finished)
+    elapsed = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    REQUEST_SECONDS.labels(getattr(route, "path", "unmatched")).observe(elapsed)
+    if settings.SERVER_TIMING:
+        response.headers["Server-Timing"] = timings.server_timing(elapsed)
+    return response
+
+
+def overloaded_response(e: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(e)},
+        headers={"Retry-After": str(max(1, round(e.retry_after)))},
+    )
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Shed /predict* requests with 503 before their upload is read when this worker is saturated."""
+    if not request.url.path.startswith("/predict"):
+        return await call_next(request)
+
+    if settings.ADMISSION_PRIORITY_RETRIES:
+        attempt = request.headers.get("x-retry-attempt", "")
+        set_priority(attempt.isdigit() and int(attempt) > 0)
+    try:
+        async with request_limiter.slot():
+            return await call_next(request)
+    except Overloaded as e:
+        return overloaded_response(e)
+
+
+@app.exception_handler(Overloaded)
+async def stage_overloaded(request: Request, e: Overloaded):
+    # A ViT / VLM stage limit was hit after the request was admitted
+    return overloaded_response(e)
+
+
 class ImageUrlRequest(BaseModel):
     image_url: str
 
+
+class ProfileRequest(BaseModel):
+    mode: str = "stack"    # stack | torch
+    requests: int = 20
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
 @app.get("/")
 def home():
     return {"status": "API Running", "mode": "hybrid_vlm_vit_20_sectors"}
@@ -59,7 +147,7 @@ async def predict(
     # Check if URL is provided
     elif image_url:
         try:
-            image_bytes = download_image_from_url(image_url)
+            image_bytes = await download_image_from_url(image_url)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
     else:
@@ -71,8 +159,10 @@ async def predict(
     if not image_bytes:
         raise HTTPException(status_code=400, detail="Failed to load image data")
     
-    result = predict_issue_hybrid(image_bytes)
-    return result
+    try:
+        return await predict_issue_hybrid_async(image_bytes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/predict-from-url")
 async def predict_from_url(request: ImageUrlRequest):
@@ -81,10 +171,138 @@ async def predict_from_url(request: ImageUrlRequest):
     Accepts JSON: {"image_url": "https://..."}
     """
     try:
-        image_bytes = download_image_from_url(request.image_url)
+        image_bytes = await download_image_from_url(request.image_url)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
-    result = predict_issue_hybrid(image_bytes)
-    return result
+    try:
+        return await predict_issue_hybrid_async(image_bytes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/predict/batch")
+async def predict_batch(
+    images: Optional[List[UploadFile]] = File(None),
+    image_urls: Optional[List[str]] = Form(None)
+):
+    """
+    Classify many images in one request.
+    Accepts any mix of (multipart/form-data, repeat the key per item):
+    - images: file uploads
+    - image_urls: CDN image URLs (downloaded concurrently)
+
+    URLs are fetched concurrently (see fetcher.py), the ViT stage runs as one batched forward pass and
+    Groq calls run concurrently (VLM_CONCURRENCY). Results come back in input order
+    (uploads first, then URLs), each with either "result" or "error".
+    """
+    images = images or []
+    image_urls = image_urls or []
+    total = len(images) + len(image_urls)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="Provide at least one 'images' file or 'image_urls' entry")
+    if total > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many items: {total} (max {settings.BATCH_MAX_ITEMS} per request)"
+        )
+
+    items = [{"index": i, "input": "file", "name": f.filename} for i, f in enumerate(images)]
+    items += [{"index": len(images) + i, "input": "url", "name": url} for i, url in enumerate(image_urls)]
+
+    payloads = [await f.read() for f in images]
+    payloads += await asyncio.gather(
+        *(download_image_from_url(url) for url in image_urls), return_exceptions=True
+    )
+
+    # Only non-empty downloads/uploads go to the model; the rest already failed
+    runnable = [i for i, p in enumerate(payloads) if isinstance(p, bytes) and p]
+    predictions = await predict_issue_hybrid_batch([payloads[i] for i in runnable])
+    outcomes = dict(zip(runnable, predictions))
+
+    for i, item in enumerate(items):
+        outcome = outcomes.get(i, payloads[i])
+        if isinstance(outcome, dict):
+            item["result"] = outcome
+        elif isinstance(outcome, Exception):
+            item["error"] = str(outcome) or type(outcome).__name__
+        else:
+            item["error"] = "Failed to load image data"
+
+    return {"count": total, "results": items}
+
+
+@app.post("/predict/complaint")
+async def predict_complaint_images(
+    images: Optional[List[UploadFile]] = File(None),
+    image_urls: Optional[List[str]] = Form(None)
+):
+    """
+    Classify all photos of ONE complaint with a single VLM request.
+    Accepts up to COMPLAINT_MAX_IMAGES photos as repeated 'images' uploads and/or
+    'image_urls' (multipart/form-data). Returns one sector/category decision for the
+    complaint plus per-photo validity under "images" (uploads first, then URLs).
+    """
+    images = images or []
+    image_urls = image_urls or []
+    total = len(images) + len(image_urls)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="Provide at least one 'images' file or 'image_urls' entry")
+    if total > settings.COMPLAINT_MAX_IMAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many images: {total} (max {settings.COMPLAINT_MAX_IMAGES} per complaint)"
+        )
+
+    payloads = [await f.read() for f in images]
+    try:
+        payloads += await asyncio.gather(*(download_image_from_url(url) for url in image_urls))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not all(payloads):
+        raise HTTPException(status_code=400, detail="Failed to load image data")
+
+    try:
+        return await predict_complaint_async(payloads)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/metrics")
+def metrics():
+    data, content_type = render_metrics()
+    return Response(content=data, media_type=content_type)
+
+
+@app.post("/admin/profile", status_code=202, dependencies=[Depends(require_admin)])
+def start_profile(request: ProfileRequest):
+    """
+    Profile the next N requests handled by this worker process.
+    Poll GET /admin/profile until "state" is "idle", then download the listed files.
+    """
+    if not 1 <= request.requests <= settings.PROFILE_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"requests must be between 1 and {settings.PROFILE_MAX_REQUESTS}"
+        )
+    try:
+        request_profiler.arm(request.mode, request.requests)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"pid": os.getpid(), **request_profiler.status()}
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+def profile_status():
+    return {"pid": os.getpid(), **request_profiler.status()}
+
 
+@app.get("/admin/profile/{filename}", dependencies=[Depends(require_admin)])
+def download_profile(filename: str):
+    # Only files written by the last capture, never arbitrary paths
+    for path in request_profiler.last_outputs:
+        if os.path.basename(path) == filename:
+            return FileResponse(path, filename=filename)
+    raise HTTPException(status_code=404, detail="Profile file not found")
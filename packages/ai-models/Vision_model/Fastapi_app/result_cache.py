@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# ========= IMAGE RESULT CACHE =========
+#
+# Two tiers, both keyed on the SHA-256 of the raw image bytes:
+#   - in-memory LRU (IMAGE_CACHE_SIZE entries)
+#   - SQLite file on disk (IMAGE_CACHE_PATH), survives restarts
+#
+# Optional near-duplicate lookup: every entry also stores a 64-bit dHash, and a
+# miss on the exact key falls back to the closest stored hash within
+# IMAGE_CACHE_PHASH_DISTANCE bits (Hamming distance).
+#
+# The hashes are indexed by band (multi-index hashing): the 64 bits are split into
+# distance + 1 bands, and a hash within `distance` bits of the query matches it
+# exactly on at least one band. Only the hashes sharing a band with the query are
+# compared, and that comparison runs outside the lock on a snapshot of the buckets.
+#
+# Entries carry the model/prompt version they were computed with; entries from
+# any other version are ignored and purged from disk on startup.
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def band_layout(distance: int) -> list[tuple[int, int]]:
+    """(shift, mask) of each band: distance + 1 near-equal slices of the 64 bits."""
+    count = min(distance + 1, 64)
+    layout, shift = [], 0
+    for i in range(count):
+        width = 64 // count + (1 if i < 64 % count else 0)
+        layout.append((shift, (1 << width) - 1))
+        shift += width
+    return layout
+
+
+class ImageResultCache:
+    def __init__(self, version: str, max_entries: int = 1024, disk_path: str = "",
+                 phash_distance: int = -1, disk_max_entries: int = 100_000):
+        self.version = version
+        self.max_entries = max_entries
+        self.phash_distance = phash_distance
+        self.disk_max_entries = disk_max_entries
+
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        # sha256 -> dHash for every entry in either tier (used for near-duplicate lookups),
+        # and per band: band value -> sha256s of the hashes with that value
+        self._phashes: dict[str, int] = {}
+        self._band_layout = band_layout(phash_distance) if phash_distance >= 0 else []
+        self._bands: list[dict[int, set[str]]] = [{} for _ in self._band_layout]
+        self._lock = threading.Lock()
+        self._disk_path = disk_path
+        self._db_conn: sqlite3.Connection | None = None
+        self._db_pid: int | None = None
+        if disk_path:
+            self._load_disk_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or bool(self._disk_path)
+
+    @property
+    def _db(self) -> sqlite3.Connection | None:
+        # SQLite connections must not cross fork(): each worker process opens its own
+        if not self._disk_path:
+            return None
+        if self._db_conn is None or self._db_pid != os.getpid():
+            self._db_conn = sqlite3.connect(self._disk_path, check_same_thread=False)
+            self._db_conn.execute("PRAGMA journal_mode=WAL")
+            self._db_pid = os.getpid()
+        return self._db_conn
+
+    def _load_disk_index(self):
+        db = self._db
+        db.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                   sha256 TEXT PRIMARY KEY,
+                   phash TEXT,
+                   version TEXT NOT NULL,
+                   result TEXT NOT NULL,
+                   created_at REAL NOT NULL
+               )"""
+        )
+        db.execute("DELETE FROM results WHERE version != ?", (self.version,))
+        db.commit()
+        for sha, phash in db.execute("SELECT sha256, phash FROM results WHERE phash IS NOT NULL"):
+            self._add_phash(sha, int(phash, 16))
+
+    def get(self, sha256: str) -> dict | None:
+        with self._lock:
+            result = self._memory.get(sha256)
+            if result is not None:
+                self._memory.move_to_end(sha256)
+                return dict(result)
+
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT result FROM results WHERE sha256 = ? AND version = ?", (sha256, self.version)
+            ).fetchone()
+            if row is None:
+                return None
+            result = json.loads(row[0])
+            self._remember(sha256, result)
+            return dict(result)
+
+    def get_near(self, phash: int | None) -> dict | None:
+        """Closest cached result whose dHash is within phash_distance bits, if any."""
+        if phash is None or self.phash_distance < 0:
+            return None
+        keys = self._band_keys(phash)
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._bands, keys):
+                candidates.update(bucket.get(key, ()))
+        best_sha, best_distance = None, self.phash_distance + 1
+        for sha in candidates:
+            other = self._phashes.get(sha)      # None: evicted since the snapshot
+            if other is None:
+                continue
+            distance = hamming(phash, other)
+            if distance < best_distance:
+                best_sha, best_distance = sha, distance
+                if distance == 0:
+                    break
+        return self.get(best_sha) if best_sha is not None else None
+
+    def put(self, sha256: str, phash: int | None, result: dict) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remember(sha256, result)
+            if phash is not None:
+                self._add_phash(sha256, phash)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (sha256, f"{phash:016x}" if phash is not None else None, self.version,
+                     json.dumps(result), time.time()),
+                )
+                self._prune_disk()
+                self._db.commit()
+
+    def _remember(self, sha256: str, result: dict) -> None:
+        if self.max_entries <= 0:
+            return
+        self._memory[sha256] = dict(result)
+        self._memory.move_to_end(sha256)
+        while len(self._memory) > self.max_entries:
+            evicted, _ = self._memory.popitem(last=False)
+            if self._db is None:
+                self._drop_phash(evicted)
+
+    def _prune_disk(self) -> None:
+        (count,) = self._db.execute("SELECT COUNT(*) FROM results").fetchone()
+        if count <= self.disk_max_entries:
+            return
+        # Drop the oldest 10% in one go instead of one row per insert
+        overflow = count - self.disk_max_entries + self.disk_max_entries // 10
+        evicted = [sha for (sha,) in self._db.execute(
+            "SELECT sha256 FROM results ORDER BY created_at LIMIT ?", (overflow,)
+        )]
+        self._db.executemany("DELETE FROM results WHERE sha256 = ?", [(sha,) for sha in evicted])
+        for sha in evicted:
+            self._memory.pop(sha, None)
+            self._drop_phash(sha)
+
+    def _band_keys(self, phash: int) -> list[int]:
+        return [(phash >> shift) & mask for shift, mask in self._band_layout]
+
+    def _add_phash(self, sha256: str, phash: int) -> None:
+        if self._phashes.get(sha256) == phash:
+            return
+        self._drop_phash(sha256)
+        self._phashes[sha256] = phash
+        for bucket, key in zip(self._bands, self._band_keys(phash)):
+            bucket.setdefault(key, set()).add(sha256)
+
+    def _drop_phash(self, sha256: str) -> None:
+        phash = self._phashes.pop(sha256, None)
+        if phash is None:
+            return
+        for bucket, key in zip(self._bands, self._band_keys(phash)):
+            shas = bucket.get(key)
+            if shas is not None:
+                shas.discard(sha256)
+                if not shas:
+                    del bucket[key]
@@ -0,0 +1,112 @@
+"""
+Multi-worker launcher for the vision API.
+
+The four ViT models are loaded once in the gunicorn master (preload_app) and the
+workers are forked from it, so the weight tensors are shared copy-on-write instead
+of being loaded again by every worker. Each worker pins its torch / ONNX Runtime
+intra-op threads so N workers do not oversubscribe the CPU.
+
+Run from the Vision_model directory:
+
+    python -m Fastapi_app.serve --workers 4
+    python -m Fastapi_app.serve --workers 4 --independent   # every worker loads its own models
+"""
+import argparse
+import gc
+import logging
+import os
+
+from gunicorn.app.base import BaseApplication
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def threads_per_worker(workers: int) -> int:
+    if settings.WEB_THREADS_PER_WORKER > 0:
+        return settings.WEB_THREADS_PER_WORKER
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def when_ready(server):
+    # Everything allocated so far (models, taxonomy, prompts) lives as long as the
+    # process: move it out of the GC's reach so collections in the workers never
+    # write to those pages and un-share them.
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import torch
+
+    threads = server.cfg.vit_threads
+    torch.set_num_threads(threads)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    logger.info("worker %s: %s intra-op threads", worker.pid, threads)
+
+
+def child_exit(server, worker):
+    # Multi-process Prometheus metrics: drop the exited worker's live gauges
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # First forward pass builds thread pools / the ONNX session in this process
+    import torch
+    from .inference import vit_predict_batch
+
+    vit_predict_batch(torch.zeros(1, 3, 224, 224))
+
+
+class VisionServer(BaseApplication):
+    def __init__(self, options: dict, vit_threads: int):
+        self.options = options
+        self.vit_threads = vit_threads
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        # Read back by post_fork (gunicorn hooks only receive the arbiter / worker)
+        self.cfg.vit_threads = self.vit_threads
+
+    def load(self):
+        from .main import app
+
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS)
+    parser.add_argument("--threads-per-worker", type=int, default=0,
+                        help="intra-op threads per worker (default: WEB_THREADS_PER_WORKER or cpus / workers)")
+    parser.add_argument("--independent", action="store_true",
+                        help="no preload: every worker loads its own copy of the models (baseline)")
+    parser.add_argument("--timeout", type=int, default=120)
+    args = parser.parse_args()
+
+    vit_threads = args.threads_per_worker or threads_per_worker(args.workers)
+    options = {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": not args.independent,
+        "timeout": args.timeout,
+        "loglevel": settings.LOG_LEVEL.lower(),
+        "when_ready": when_ready,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+        "post_worker_init": post_worker_init,
+    }
+    VisionServer(options, vit_threads).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest
+
+from .config import settings
+
+# ========= PIPELINE TELEMETRY =========
+#
+# - stage timers: every `with stage("..."):` block is observed in the Prometheus
+#   histogram vision_stage_seconds{stage=...} and, while a request is being timed,
+#   summed per stage for its Server-Timing header (SERVER_TIMING=true)
+# - request profiler: armed through /admin/profile, captures the next N requests
+#     stack : samples every thread's Python stack (py-spy style), written as a
+#             folded-stack file for flamegraph.pl / speedscope
+#     torch : torch.profiler around every ViT forward pass, written as an op table
+#             plus the first few Chrome traces
+#
+# Stages: download, decode, vlm_jpeg, vlm_base64, vlm, vit_sector, vit_<sector>
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "vision_stage_seconds", "Time spent in one stage of the vision pipeline", ["stage"], buckets=LATENCY_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "vision_request_seconds", "End-to-end time of a vision API request", ["endpoint"], buckets=LATENCY_BUCKETS
+)
+
+# Number of Chrome traces a torch capture writes (the op table covers every pass)
+TORCH_TRACE_LIMIT = 3
+
+
+class RequestTimings:
+    """Per-request stage totals; stages may run concurrently in worker threads."""
+
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        with self._lock:
+            parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_request_timings: ContextVar[RequestTimings | None] = ContextVar("vision_request_timings", default=None)
+
+
+def start_request_timings() -> RequestTimings:
+    # asyncio.to_thread copies the context, so stages run in worker threads land here too
+    timings = RequestTimings()
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage(name: str, torch_ops: bool = False):
+    """Time a pipeline stage; torch_ops=True marks blocks the torch profiler should capture."""
+    capture = request_profiler.torch_capture() if torch_ops else None
+    start = time.perf_counter()
+    try:
+        with capture.profile(name) if capture is not None else nullcontext():
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Prometheus exposition; aggregates all gunicorn workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+# ----- on-demand profiling -----
+
+class ProfileCapture:
+    def __init__(self, mode: str, output_prefix: str, sample_interval: float):
+        self.mode = mode
+        self.output_prefix = output_prefix
+        self.sample_interval = sample_interval
+        self.outputs: list[str] = []
+
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+        self._stacks: Counter[str] = Counter()
+
+        # torch.profiler is per thread and cannot be nested: one ViT pass at a time
+        self._torch_lock = threading.Lock()
+        self._ops: dict[str, list[float]] = {}
+        self._traces = 0
+
+    def start(self):
+        if self.mode == "stack":
+            self._sampler = threading.Thread(target=self._sample, name="stack-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop(self) -> list[str]:
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._write_stacks()
+        if self.mode == "torch":
+            with self._torch_lock:
+                self._write_ops()
+        return self.outputs
+
+    # stack mode
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(names.get(ident, f"thread-{ident}"))
+                self._stacks[";".join(reversed(frames))] += 1
+
+    def _write_stacks(self):
+        path = f"{self.output_prefix}-stack.folded"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.outputs.append(path)
+
+    # torch mode
+
+    @contextmanager
+    def profile(self, name: str):
+        from torch.profiler import ProfilerActivity, profile
+
+        with self._torch_lock:
+            with profile(activities=[ProfilerActivity.CPU], record_shapes=True) as prof:
+                yield
+            for event in prof.key_averages():
+                row = self._ops.setdefault(event.key, [0, 0.0, 0.0])
+                row[0] += event.count
+                row[1] += event.self_cpu_time_total
+                row[2] += event.cpu_time_total
+            if self._traces < TORCH_TRACE_LIMIT:
+                self._traces += 1
+                path = f"{self.output_prefix}-{name}-{self._traces}.trace.json"
+                prof.export_chrome_trace(path)
+                self.outputs.append(path)
+
+    def _write_ops(self):
+        path = f"{self.output_prefix}-torch-ops.txt"
+        total_self = sum(row[1] for row in self._ops.values()) or 1.0
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"{'op':<48}{'calls':>8}{'self ms':>12}{'self %':>8}{'total ms':>12}\n")
+            for key, (count, self_us, total_us) in sorted(self._ops.items(), key=lambda kv: -kv[1][1]):
+                f.write(f"{key[:47]:<48}{count:>8}{self_us / 1000:>12.2f}"
+                        f"{100 * self_us / total_self:>8.1f}{total_us / 1000:>12.2f}\n")
+        self.outputs.append(path)
+
+
+class RequestProfiler:
+    """
+    One capture spanning the next N requests: it starts with the first of them and
+    stops once all N have finished (requests overlapping that window are included).
+    Only profiles the worker process that received the /admin/profile call.
+    """
+
+    MODES = ("stack", "torch")
+
+    def __init__(self, output_dir: str, sample_interval_ms: float):
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval_ms / 1000
+        self.mode: str | None = None
+        self.requests = 0
+        self.last_outputs: list[str] = []
+
+        self._lock = threading.Lock()
+        self._to_start = 0
+        self._in_flight = 0
+        self._capture: ProfileCapture | None = None
+        self._captures = 0
+
+    @property
+    def state(self) -> str:
+        if self._capture is not None:
+            return "running"
+        return "armed" if self._to_start else "idle"
+
+    def arm(self, mode: str, requests: int):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Expected one of {self.MODES}")
+        with self._lock:
+            if self.state != "idle":
+                raise RuntimeError(f"A profile capture is already {self.state}")
+            self.mode = mode
+            self.requests = requests
+            self._to_start = requests
+
+    def request_started(self) -> bool:
+        """True when this request is one of the N being profiled."""
+        with self._lock:
+            if not self._to_start:
+                return False
+            if self._capture is None:
+                os.makedirs(self.output_dir, exist_ok=True)
+                self._captures += 1
+                prefix = os.path.join(
+                    self.output_dir,
+                    f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._captures}",
+                )
+                self._capture = ProfileCapture(self.mode, prefix, self.sample_interval)
+                self._capture.start()
+            self._to_start -= 1
+            self._in_flight += 1
+            return True
+
+    def request_finished(self):
+        with self._lock:
+            self._in_flight -= 1
+            if self._to_start or self._in_flight:
+                return
+            capture, self._capture = self._capture, None
+        self.last_outputs = capture.stop()
+
+    def torch_capture(self) -> ProfileCapture | None:
+        capture = self._capture
+        return capture if capture is not None and capture.mode == "torch" else None
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "mode": self.mode,
+            "requests": self.requests,
+            "remaining": self._to_start + self._in_flight,
+            "files": [os.path.basename(path) for path in self.last_outputs],
+        }
+
+
+request_profiler = RequestProfiler(settings.PROFILE_DIR, settings.PROFILE_SAMPLE_INTERVAL_MS)
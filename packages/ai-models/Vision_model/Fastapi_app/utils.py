@@ -1,9 +1,15 @@
+import time
+from dataclasses import dataclass
+
 import torch
-from PIL import Image
+from PIL import Image, ImageOps
 from torchvision import transforms
-import requests
 from io import BytesIO
 
+from .config import settings
+from .fetcher import image_fetcher
+from .telemetry import stage
+
 # Image transform for ViT
 image_transforms = transforms.Compose([
     transforms.Resize((224, 224)),
@@ -11,26 +17,89 @@ image_transforms = transforms.Compose([
     transforms.Normalize([0.5, 0.5, 0.5], [0.5, 0.5, 0.5])
 ])
 
-def download_image_from_url(url: str) -> bytes:
-    """Download image from CDN URL and return as bytes"""
-    try:
-        response = requests.get(url, timeout=30, stream=True)
-        response.raise_for_status()
-        
-        # Check if content type is an image
-        content_type = response.headers.get('content-type', '')
-        if not content_type.startswith('image/'):
-            raise ValueError(f"URL does not point to an image. Content-Type: {content_type}")
-        
-        return response.content
-    except requests.exceptions.RequestException as e:
-        raise ValueError(f"Failed to download image from URL: {str(e)}")
+async def download_image_from_url(url: str) -> bytes:
+    """Download image from CDN URL and return as bytes (streaming, size-capped; see fetcher.py)"""
+    return await image_fetcher.fetch(url)
 
 def load_image(image_file):
     """Convert uploaded file to tensor for model"""
     image = Image.open(image_file).convert("RGB")
     return image_transforms(image).unsqueeze(0)  # shape: (1, 3, 224, 224)
 
+@dataclass
+class PreparedImage:
+    tensor: torch.Tensor    # (1, 3, 224, 224) input for the ViT models
+    vlm_jpeg: bytes         # size-capped JPEG sent to the Groq VLM
+    bytes_in: int           # size of the original upload / download
+    decode_ms: float        # decode + resize + re-encode time
+    phash: int | None       # 64-bit dHash, only when near-duplicate caching is on
+
+
+def _encode_jpeg(image: Image.Image, quality: int) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: is each pixel of a 9x8 grayscale thumbnail brighter than its right neighbour."""
+    pixels = list(image.convert("L").resize((9, 8), Image.BILINEAR, reducing_gap=2.0).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | int(pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def prepare_image(image_bytes: bytes, vlm_max_side: int | None = None) -> PreparedImage:
+    """
+    Decode the image once and derive both model inputs from it:
+    - the ViT tensor (same transform as load_image)
+    - a JPEG capped at VLM_MAX_SIDE (or vlm_max_side) / VLM_MAX_BYTES for the VLM
+
+    JPEGs are decoded in draft mode, i.e. scaled down by 1/2, 1/4 or 1/8 inside the
+    decoder, so a 12 MP phone photo is never fully decompressed.
+    """
+    start = time.perf_counter()
+    max_side = vlm_max_side or settings.VLM_MAX_SIDE
+
+    with stage("decode"):
+        image = Image.open(BytesIO(image_bytes))
+        original_format = image.format
+        original_size = image.size
+        if original_format == "JPEG":
+            image.draft("RGB", (max_side, max_side))
+        image = image.convert("RGB")
+
+        tensor = image_transforms(image).unsqueeze(0)
+        phash = dhash(image) if settings.IMAGE_CACHE_PHASH_DISTANCE >= 0 else None
+
+    if (
+        original_format == "JPEG"
+        and max(original_size) <= max_side
+        and len(image_bytes) <= settings.VLM_MAX_BYTES
+    ):
+        # Already small enough: send the original bytes untouched (keeps EXIF for the VLM)
+        vlm_jpeg = image_bytes
+    else:
+        with stage("vlm_jpeg"):
+            # Re-encoding drops EXIF, so bake the orientation into the pixels first
+            vlm_image = ImageOps.exif_transpose(image)
+            vlm_image.thumbnail((max_side, max_side), Image.BILINEAR)
+            quality = settings.VLM_JPEG_QUALITY
+            vlm_jpeg = _encode_jpeg(vlm_image, quality)
+            while len(vlm_jpeg) > settings.VLM_MAX_BYTES and quality > 40:
+                quality -= 15
+                vlm_jpeg = _encode_jpeg(vlm_image, quality)
+
+    return PreparedImage(
+        tensor=tensor,
+        vlm_jpeg=vlm_jpeg,
+        bytes_in=len(image_bytes),
+        decode_ms=(time.perf_counter() - start) * 1000,
+        phash=phash,
+    )
+
 def get_top_class(logits):
     """Get class name & confidence from logits"""
     probs = torch.softmax(logits, dim=1)
@@ -0,0 +1,126 @@
+import os
+
+import torch
+
+# ========= ViT INFERENCE BACKENDS =========
+#
+# Every backend wraps a loaded ViTForImageClassification and is called the same way:
+#   runner(pixel_values)  ->  logits
+# with pixel_values of shape (N, 3, 224, 224) and logits of shape (N, num_labels).
+#
+# - eager   : fp32 PyTorch under torch.inference_mode()
+# - int8    : dynamic int8 quantization of the nn.Linear layers (CPU only)
+# - onnx    : exported once to models/onnx/<name>.onnx and run with ONNX Runtime (CPU)
+# - compile : torch.compile'd module (first call pays the compilation cost)
+
+VIT_BACKENDS = ("eager", "int8", "onnx", "compile")
+
+ONNX_OPSET = 17
+
+
+class _LogitsOnly(torch.nn.Module):
+    """HF models return a ModelOutput; export/compile a module that returns plain logits."""
+
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        return self.model(pixel_values=pixel_values).logits
+
+
+class TorchRunner:
+    def __init__(self, module: torch.nn.Module, backend: str, device: torch.device):
+        self.module = module
+        self.backend = backend
+        self.device = device
+
+    def __call__(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        with torch.inference_mode():
+            return self.module(pixel_values.to(self.device))
+
+
+class OnnxRunner:
+    backend = "onnx"
+    device = torch.device("cpu")
+
+    def __init__(self, onnx_path: str, num_threads: int = 0):
+        self.onnx_path = onnx_path
+        self.num_threads = num_threads
+        self._session = None
+        self._pid = None
+
+    @property
+    def session(self):
+        # ONNX Runtime thread pools do not survive fork(): every process builds its own session
+        if self._session is None or self._pid != os.getpid():
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.intra_op_num_threads = self.num_threads or torch.get_num_threads()
+            self._session = ort.InferenceSession(
+                self.onnx_path, options, providers=["CPUExecutionProvider"]
+            )
+            self._pid = os.getpid()
+        return self._session
+
+    def __call__(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        inputs = {"pixel_values": pixel_values.detach().cpu().numpy()}
+        (logits,) = self.session.run(["logits"], inputs)
+        return torch.from_numpy(logits)
+
+
+def onnx_path_for(model_path: str) -> str:
+    model_dir, filename = os.path.split(model_path)
+    return os.path.join(model_dir, "onnx", os.path.splitext(filename)[0] + ".onnx")
+
+
+def export_onnx(model: torch.nn.Module, model_path: str) -> str:
+    """Export once next to the .pt weights; re-export when the weights are newer."""
+    onnx_path = onnx_path_for(model_path)
+    if os.path.exists(onnx_path) and os.path.getmtime(onnx_path) >= os.path.getmtime(model_path):
+        return onnx_path
+
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    tmp_path = onnx_path + ".tmp"
+    dummy = torch.zeros(1, 3, 224, 224)
+    torch.onnx.export(
+        _LogitsOnly(model).cpu().eval(),
+        (dummy,),
+        tmp_path,
+        input_names=["pixel_values"],
+        output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=ONNX_OPSET,
+        dynamo=False,
+    )
+    os.replace(tmp_path, onnx_path)
+    return onnx_path
+
+
+def build_vit_runner(model: torch.nn.Module, backend: str, model_path: str, device: torch.device,
+                     num_threads: int = 0):
+    """Wrap an fp32 eval-mode ViT into the requested inference backend."""
+    if backend == "eager":
+        return TorchRunner(_LogitsOnly(model), backend, device)
+
+    if backend == "int8":
+        cpu = torch.device("cpu")
+        quantized = torch.ao.quantization.quantize_dynamic(
+            model.to(cpu), {torch.nn.Linear}, dtype=torch.qint8
+        )
+        return TorchRunner(_LogitsOnly(quantized), backend, cpu)
+
+    if backend == "compile":
+        return TorchRunner(torch.compile(_LogitsOnly(model)), backend, device)
+
+    if backend == "onnx":
+        try:
+            runner = OnnxRunner(export_onnx(model, model_path), num_threads)
+            runner.session  # fail fast at startup if onnxruntime is missing
+            return runner
+        except ImportError as e:
+            raise RuntimeError("VIT_BACKEND=onnx requires the 'onnx' and 'onnxruntime' packages") from e
+
+    raise ValueError(f"Unknown VIT_BACKEND '{backend}'. Expected one of {VIT_BACKENDS}")
@@ -0,0 +1,140 @@
+"""
+Replay a labeled image set through the ViT-first cascade and measure, for a grid of
+thresholds, how many VLM calls it saves against how often its answers still agree
+with the labels (and with the full VLM + ViT hybrid).
+
+Labels are a CSV with a header row and columns: image, sector, category
+  - image    : path relative to the CSV file
+  - sector   : sector key from SECTOR_CATEGORIES, or "invalid"
+  - category : problem key (may be empty; then only the sector is compared)
+
+Every image is classified once by the ViTs and once by the VLM; VLM answers are kept in
+--vlm-cache (JSONL keyed by SHA-256), so re-running with other thresholds costs nothing.
+
+Run from the Vision_model directory (GROQ_API_KEY must be set):
+
+    python -m benchmarks.cascade_replay --labels /data/labeled/labels.csv
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+
+from Fastapi_app.inference import (
+    call_vlm,
+    cascade_shortcut,
+    combine_vlm_vit,
+    normalize_key,
+    vit_predict_tensor,
+)
+from Fastapi_app.utils import prepare_image
+
+
+def load_vlm_cache(path: str | None) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {row["sha256"]: row["vlm"] for row in map(json.loads, f)}
+
+
+def classify_all(labels_path: str, vlm_cache_path: str | None) -> list[dict]:
+    base_dir = os.path.dirname(os.path.abspath(labels_path))
+    vlm_cache = load_vlm_cache(vlm_cache_path)
+    cache_out = open(vlm_cache_path, "a", encoding="utf-8") if vlm_cache_path else None
+
+    samples = []
+    with open(labels_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            with open(os.path.join(base_dir, row["image"]), "rb") as img:
+                image_bytes = img.read()
+            digest = hashlib.sha256(image_bytes).hexdigest()
+            prepared = prepare_image(image_bytes)
+
+            vlm = vlm_cache.get(digest)
+            if vlm is None:
+                vlm = call_vlm(prepared.vlm_jpeg)
+                if cache_out:
+                    cache_out.write(json.dumps({"sha256": digest, "vlm": vlm}) + "\n")
+                    cache_out.flush()
+
+            samples.append({
+                "image": row["image"],
+                "label_sector": normalize_key(row["sector"]),
+                "label_category": normalize_key(row.get("category") or "") or None,
+                "vit": vit_predict_tensor(prepared.tensor),
+                "vlm": vlm,
+            })
+
+    if cache_out:
+        cache_out.close()
+    return samples
+
+
+def same_answer(result: dict, sector: str, category: str | None) -> bool:
+    if normalize_key(result["sector"]) != sector:
+        return False
+    return category is None or result["category"] == category
+
+
+def replay(samples: list[dict], sector_t: float, category_t: float, invalid_t: float) -> dict:
+    skipped = correct = hybrid_correct = agree_with_hybrid = 0
+    for sample in samples:
+        hybrid = combine_vlm_vit(sample["vlm"], sample["vit"])
+        shortcut = cascade_shortcut(sample["vit"], sector_t, category_t, invalid_t)
+        final = shortcut or hybrid
+
+        label = (sample["label_sector"], sample["label_category"])
+        correct += same_answer(final, *label)
+        hybrid_correct += same_answer(hybrid, *label)
+        if shortcut is not None:
+            skipped += 1
+            agree_with_hybrid += same_answer(shortcut, normalize_key(hybrid["sector"]), hybrid["category"])
+
+    n = len(samples)
+    return {
+        "sector_t": sector_t,
+        "category_t": category_t,
+        "invalid_t": invalid_t,
+        "vlm_calls_saved": round(skipped / n, 4),
+        "cascade_accuracy": round(correct / n, 4),
+        "hybrid_accuracy": round(hybrid_correct / n, 4),
+        "skipped_agree_with_hybrid": round(agree_with_hybrid / skipped, 4) if skipped else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", required=True, help="labeled CSV (image, sector, category)")
+    parser.add_argument("--vlm-cache", default="cascade_replay_vlm.jsonl", help="JSONL memo of VLM answers")
+    parser.add_argument("--sector-thresholds", type=float, nargs="+", default=[0.8, 0.85, 0.9, 0.95])
+    parser.add_argument("--category-thresholds", type=float, nargs="+", default=[0.8, 0.85, 0.9, 0.95])
+    parser.add_argument("--invalid-thresholds", type=float, nargs="+", default=[0.9, 0.95, 0.99])
+    parser.add_argument("--json", help="also write every grid row to this file")
+    args = parser.parse_args()
+
+    samples = classify_all(args.labels, args.vlm_cache)
+    if not samples:
+        raise SystemExit("No labeled images")
+
+    rows = [
+        replay(samples, s, c, i)
+        for s, c, i in itertools.product(args.sector_thresholds, args.category_thresholds, args.invalid_thresholds)
+    ]
+
+    print(f"{len(samples)} labeled images\n")
+    print(f"{'sector':>7}{'category':>9}{'invalid':>8}{'VLM saved':>11}{'cascade acc':>13}"
+          f"{'hybrid acc':>12}{'skip=hybrid':>13}")
+    for row in rows:
+        agree = "-" if row["skipped_agree_with_hybrid"] is None else row["skipped_agree_with_hybrid"]
+        print(f"{row['sector_t']:>7}{row['category_t']:>9}{row['invalid_t']:>8}{row['vlm_calls_saved']:>11}"
+              f"{row['cascade_accuracy']:>13}{row['hybrid_accuracy']:>12}{agree:>13}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Offline CPU benchmark of the vision inference path: no GROQ_API_KEY, no real weights,
+no network.
+
+  - ViT checkpoints : randomly initialized, same architecture and label counts as the
+                      real ones (--vit-size base matches google/vit-base-patch16-224),
+                      or the real .pt files with --model-dir
+  - VLM             : benchmarks.stub_groq answering after --vlm-latency-ms
+  - images          : synthetic photo-like images in realistic sizes and formats
+
+Scenarios (each reports images/sec, p50 / p99 latency and peak RSS):
+  vit_predict          ViT sector + subclass models on raw bytes, one image at a time
+  vit_batch_<n>        vit_predict_batch on pre-transformed tensors, per --batch-sizes
+  predict_hybrid       predict_issue_hybrid (decode + ViT + stub VLM), result cache off
+  api_predict          POST /predict through the ASGI app, --concurrency clients
+  api_batch            POST /predict/batch with --api-batch images per request
+
+Peak RSS is reset before every scenario where the kernel allows it (/proc/self/clear_refs),
+otherwise it is the process high-water mark so far. For worker counts, see benchmarks.workers.
+
+Run from the Vision_model directory:
+
+    python -m benchmarks.offline_suite --vit-size base --batch-sizes 1 4 8 16 32
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from benchmarks.stub_groq import StubGroqServer
+
+# (name, width, height, PIL format, save options): what the API actually receives
+IMAGE_PROFILES = (
+    ("phone_12mp_jpeg", 4032, 3024, "JPEG", {"quality": 90}),
+    ("fhd_jpeg", 1920, 1080, "JPEG", {"quality": 85}),
+    ("whatsapp_jpeg", 1600, 1200, "JPEG", {"quality": 70}),
+    ("screenshot_png", 1280, 960, "PNG", {}),
+    ("square_webp", 1080, 1080, "WEBP", {"quality": 80}),
+)
+
+UPLOAD_TYPES = {"JPEG": ("jpg", "image/jpeg"), "PNG": ("png", "image/png"), "WEBP": ("webp", "image/webp")}
+
+VIT_SIZES = {
+    "base": dict(hidden_size=768, num_hidden_layers=12, num_attention_heads=12, intermediate_size=3072),
+    "small": dict(hidden_size=384, num_hidden_layers=12, num_attention_heads=6, intermediate_size=1536),
+    "tiny": dict(hidden_size=192, num_hidden_layers=12, num_attention_heads=3, intermediate_size=768),
+}
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+# ----- fixtures -----
+
+def synthetic_photo(width: int, height: int, rng: random.Random) -> Image.Image:
+    """Gradient sky, random shapes and sensor noise: compresses like a photo, unlike pure noise."""
+    image = Image.merge("RGB", [
+        Image.linear_gradient("L").rotate(rng.uniform(0, 360)).resize((width, height)) for _ in range(3)
+    ])
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        w, h = rng.randrange(width // 20, width // 3), rng.randrange(height // 20, height // 3)
+        fill = tuple(rng.randrange(256) for _ in range(3))
+        shape = draw.ellipse if rng.random() < 0.5 else draw.rectangle
+        shape((x, y, x + w, y + h), fill=fill)
+    image = image.filter(ImageFilter.GaussianBlur(2))
+    noise = Image.effect_noise((width, height), 24).convert("RGB")
+    return Image.blend(image, noise, 0.12)
+
+
+def synthetic_images(per_profile: int, seed: int = 0) -> list[tuple[str, str, bytes]]:
+    """(profile name, PIL format, encoded bytes) for every image."""
+    rng = random.Random(seed)
+    images = []
+    for name, width, height, fmt, options in IMAGE_PROFILES:
+        for _ in range(per_profile):
+            buffer = io.BytesIO()
+            synthetic_photo(width, height, rng).save(buffer, format=fmt, **options)
+            images.append((name, fmt, buffer.getvalue()))
+    return images
+
+
+def write_random_checkpoints(model_dir: str, vit_size: str) -> str:
+    """Random-weight .pt files for the four guard models plus a local base config; returns the config dir."""
+    import torch
+    from transformers import ViTConfig, ViTForImageClassification
+
+    base_dir = os.path.join(model_dir, "vit-base-config")
+    ViTConfig(image_size=224, patch_size=16, **VIT_SIZES[vit_size]).save_pretrained(base_dir)
+
+    # Label counts only; inference.py supplies the real id2label
+    for filename in ("sector_model.pt", "infra_model.pt", "education_model.pt", "environment_model.pt"):
+        torch.manual_seed(len(filename))
+        config = ViTConfig.from_pretrained(base_dir, num_labels=4)
+        torch.save(ViTForImageClassification(config).state_dict(), os.path.join(model_dir, filename))
+    return base_dir
+
+
+# ----- measurement -----
+
+def reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def summarize(name: str, latencies_ms: list[float], images: int, elapsed_s: float, **extra) -> dict:
+    return {
+        "scenario": name,
+        "images": images,
+        "images_per_s": round(images / elapsed_s, 2),
+        "p50_ms": round(statistics.median(latencies_ms), 1) if latencies_ms else None,
+        "p99_ms": round(percentile(latencies_ms, 0.99), 1) if latencies_ms else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        **extra,
+    }
+
+
+def run_sync(name: str, fn, inputs: list, images_per_call: int = 1, **extra) -> dict:
+    fn(inputs[0])  # warm-up (thread pools, lazy sessions, compile)
+    reset_peak_rss()
+    latencies = []
+    started = time.perf_counter()
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append((time.perf_counter() - start) * 1000)
+    elapsed = time.perf_counter() - started
+    return summarize(name, latencies, len(inputs) * images_per_call, elapsed, **extra)
+
+
+async def run_api(name: str, app, requests: list[dict], concurrency: int, images_per_request: int) -> dict:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        first = requests[0]
+        await client.post(first["path"], files=first["files"])  # warm-up
+        reset_peak_rss()
+
+        queue = list(requests)
+        latencies, errors = [], 0
+
+        async def client_loop():
+            nonlocal errors
+            while queue:
+                request = queue.pop()
+                start = time.perf_counter()
+                response = await client.post(request["path"], files=request["files"])
+                if response.status_code == 200:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(name, latencies, len(latencies) * images_per_request, elapsed,
+                     concurrency=concurrency, errors=errors)
+
+
+# ----- suite -----
+
+def configure_environment(args, stub: StubGroqServer, workdir: str):
+    """Must run before anything from Fastapi_app is imported (settings are read at import)."""
+    if args.model_dir:
+        os.environ["MODEL_DIR"] = os.path.abspath(args.model_dir)
+    else:
+        model_dir = os.path.join(workdir, "models")
+        os.environ["MODEL_DIR"] = model_dir
+        os.environ["VIT_BASE_MODEL"] = write_random_checkpoints(model_dir, args.vit_size)
+        os.environ["HF_HUB_OFFLINE"] = "1"
+
+    os.environ.update(
+        GROQ_BASE_URL=stub.base_url,
+        IMAGE_CACHE_SIZE="0",
+        IMAGE_CACHE_PATH="",
+        VIT_CASCADE="false",
+        VIT_BACKEND=args.backend,
+    )
+    if args.threads:
+        os.environ["VIT_NUM_THREADS"] = str(args.threads)
+    # inference.py / main.py read these at import time
+    for name in ("GROQ_API_KEY", "HUGGINGFACEHUB_API_TOKEN", "LANGCHAIN_API_KEY"):
+        os.environ.setdefault(name, "unused-by-offline-suite")
+
+
+def run_suite(args, images: list[tuple[str, str, bytes]]) -> list[dict]:
+    import torch
+
+    from Fastapi_app import inference
+    from Fastapi_app.main import app
+    from Fastapi_app.utils import prepare_image
+
+    payloads = [data for _, _, data in images]
+    rows = [run_sync("vit_predict", inference.vit_predict, payloads)]
+
+    tensors = [prepare_image(data).tensor for data in payloads]
+    for batch_size in args.batch_sizes:
+        batches = [
+            torch.cat([tensors[(start + i) % len(tensors)] for i in range(batch_size)])
+            for start in range(0, max(len(tensors), batch_size * 4), batch_size)
+        ]
+        rows.append(run_sync(f"vit_batch_{batch_size}", inference.vit_predict_batch, batches,
+                             images_per_call=batch_size, batch_size=batch_size))
+
+    rows.append(run_sync("predict_hybrid", inference.predict_issue_hybrid, payloads))
+
+    def upload(i: int, fmt: str, data: bytes):
+        extension, content_type = UPLOAD_TYPES[fmt]
+        return f"{i}.{extension}", data, content_type
+
+    predict_requests = [
+        {"path": "/predict", "files": {"image": upload(i, fmt, data)}}
+        for i, (_, fmt, data) in enumerate(images * args.api_rounds)
+    ]
+    rows.append(asyncio.run(run_api("api_predict", app, predict_requests, args.concurrency, 1)))
+
+    batch_requests = []
+    flat = images * args.api_rounds
+    for start in range(0, len(flat), args.api_batch):
+        chunk = flat[start:start + args.api_batch]
+        if len(chunk) == args.api_batch:
+            batch_requests.append({
+                "path": "/predict/batch",
+                "files": [("images", upload(start + i, fmt, data)) for i, (_, fmt, data) in enumerate(chunk)],
+            })
+    if batch_requests:
+        rows.append(asyncio.run(run_api("api_batch", app, batch_requests, args.concurrency, args.api_batch)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vit-size", default="base", choices=sorted(VIT_SIZES), help="random checkpoint size")
+    parser.add_argument("--model-dir", help="benchmark the real .pt files in this directory instead")
+    parser.add_argument("--backend", default="eager", help="VIT_BACKEND for the run")
+    parser.add_argument("--threads", type=int, default=0, help="VIT_NUM_THREADS (0 = library default)")
+    parser.add_argument("--images-per-format", type=int, default=4)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--vlm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent API clients")
+    parser.add_argument("--api-rounds", type=int, default=2, help="passes over the image set per API scenario")
+    parser.add_argument("--api-batch", type=int, default=8, help="images per /predict/batch request")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    images = synthetic_images(args.images_per_format)
+    stub = StubGroqServer(latency_ms=args.vlm_latency_ms).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="vision-bench-") as workdir:
+            configure_environment(args, stub, workdir)
+            rows = run_suite(args, images)
+    finally:
+        stub.shutdown()
+
+    sizes = {name: len(data) for name, _, data in images}
+    print(f"\n{len(images)} synthetic images: "
+          + ", ".join(f"{name} ({size / 1024:.0f} KiB)" for name, size in sizes.items()))
+    print(f"checkpoints: {args.model_dir or 'random ' + args.vit_size}, backend {args.backend}, "
+          f"stub VLM {args.vlm_latency_ms:g} ms\n")
+    print(f"{'scenario':<16}{'images':>8}{'img/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'peak RSS MB':>13}")
+    for row in rows:
+        print(f"{row['scenario']:<16}{row['images']:>8}{row['images_per_s']:>9}"
+              f"{row['p50_ms'] or '-':>10}{row['p99_ms'] or '-':>10}{row['peak_rss_mb']:>13}")
+    print("\np50/p99 are per call: one image, one batch, or one HTTP request.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Local stand-in for the Groq chat-completions API, so load tests exercise the whole
+pipeline without network calls or rate limits. Every request sleeps --latency-ms and
+answers with one fixed classification (valid for both prompt versions).
+
+Point the API at it with GROQ_BASE_URL=http://127.0.0.1:<port> (read by the Groq SDK).
+
+    python -m benchmarks.stub_groq --port 8089 --latency-ms 400
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# v2 reads s/c/v, v1 reads sector/category/is_valid, complaints also read image_valid
+ANSWER = {
+    "s": 1, "c": 1, "v": True,
+    "sector": "infrastructure", "category": "potholes", "is_valid": True,
+}
+
+
+class StubGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.requests = 0
+        super().__init__(("127.0.0.1", port), _Handler)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "StubGroqServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        self.server.requests += 1
+        time.sleep(self.server.latency_ms / 1000)
+
+        images = sum(
+            part.get("type") == "image_url"
+            for message in body.get("messages", [])
+            if isinstance(message.get("content"), list)
+            for part in message["content"]
+        )
+        answer = dict(ANSWER, image_valid=[True] * images)
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps(answer)},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubGroqServer(args.port, args.latency_ms)
+    print(f"stub Groq API on {server.base_url} ({args.latency_ms:g} ms per request)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Accuracy-parity and latency/throughput report for the ViT guard inference backends.
+
+Every backend is compared against eager fp32 on a held-out image folder:
+  - top-1 agreement per model (all 4 models are run on every image)
+  - max absolute softmax difference
+  - batch-1 latency of the sector model (p50 / p95)
+  - batched throughput of the sector model (images/sec)
+
+Run from the Vision_model directory on the target (CPU-only) node:
+
+    python -m benchmarks.vit_backends --images /data/heldout --backends eager int8 onnx compile
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# inference.py refuses to import without a key; the report never calls the VLM.
+os.environ.setdefault("GROQ_API_KEY", "unused-by-vit-report")
+os.environ["VIT_BACKEND"] = "eager"
+
+import torch
+
+from Fastapi_app import inference
+from Fastapi_app.utils import load_image
+from Fastapi_app.vit_backends import VIT_BACKENDS
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def load_heldout(folder: str, limit: int) -> torch.Tensor:
+    paths = []
+    for root, _, files in os.walk(folder):
+        paths.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(IMAGE_EXTENSIONS))
+    paths = paths[:limit]
+    if not paths:
+        sys.exit(f"No images found under {folder}")
+    return torch.cat([load_image(p) for p in paths])
+
+
+def load_runners(backend: str) -> dict:
+    return {
+        name: inference.load_vit_model(os.path.join(inference.MODEL_DIR, filename), id2label, backend)
+        for name, (filename, id2label) in inference.VIT_MODEL_SPECS.items()
+    }
+
+
+def run_batched(runner, images: torch.Tensor, batch_size: int) -> torch.Tensor:
+    return torch.cat([runner(images[i:i + batch_size]).float().cpu() for i in range(0, len(images), batch_size)])
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def measure(runner, images: torch.Tensor, batch_size: int, warmup: int) -> dict:
+    for i in range(min(warmup, len(images))):
+        runner(images[i:i + 1])
+
+    latencies = []
+    for i in range(len(images)):
+        start = time.perf_counter()
+        runner(images[i:i + 1])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    run_batched(runner, images, batch_size)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "latency_p50_ms": round(statistics.median(latencies), 2),
+        "latency_p95_ms": round(percentile(latencies, 0.95), 2),
+        "throughput_img_s": round(len(images) / elapsed, 2),
+    }
+
+
+def parity(reference: dict, candidate: dict) -> dict:
+    result = {}
+    for name, ref_logits in reference.items():
+        ref_probs = torch.softmax(ref_logits, dim=1)
+        cand_probs = torch.softmax(candidate[name], dim=1)
+        agreement = (ref_probs.argmax(dim=1) == cand_probs.argmax(dim=1)).float().mean().item()
+        result[name] = {
+            "top1_agreement": round(agreement, 4),
+            "max_abs_prob_diff": round((ref_probs - cand_probs).abs().max().item(), 4),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="held-out image folder (searched recursively)")
+    parser.add_argument("--backends", nargs="+", default=list(VIT_BACKENDS), choices=VIT_BACKENDS)
+    parser.add_argument("--limit", type=int, default=500, help="max images to load")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args()
+
+    images = load_heldout(args.images, args.limit)
+    print(f"{len(images)} images, torch threads={torch.get_num_threads()}, device={inference.device}")
+
+    eager = load_runners("eager")
+    reference = {name: run_batched(runner, images, args.batch_size) for name, runner in eager.items()}
+
+    report = {}
+    for backend in args.backends:
+        runners = eager if backend == "eager" else load_runners(backend)
+        outputs = {name: run_batched(runner, images, args.batch_size) for name, runner in runners.items()}
+        report[backend] = {
+            **measure(runners["sector"], images, args.batch_size, args.warmup),
+            "parity": parity(reference, outputs),
+        }
+
+    print(f"\n{'backend':<10}{'p50 ms':>10}{'p95 ms':>10}{'img/s':>10}{'min top-1 agree':>18}{'max |dp|':>10}")
+    for backend, row in report.items():
+        min_agree = min(p["top1_agreement"] for p in row["parity"].values())
+        max_diff = max(p["max_abs_prob_diff"] for p in row["parity"].values())
+        print(f"{backend:<10}{row['latency_p50_ms']:>10}{row['latency_p95_ms']:>10}"
+              f"{row['throughput_img_s']:>10}{min_agree:>18}{max_diff:>10}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"images": len(images), "batch_size": args.batch_size, "backends": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
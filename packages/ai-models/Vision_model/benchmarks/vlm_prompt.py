@@ -0,0 +1,90 @@
+"""
+Compare call_vlm prompt versions on the same images: wall latency, Groq-reported
+prompt / completion tokens and timings, and how often the versions agree.
+
+Run from the Vision_model directory (GROQ_API_KEY must be set):
+
+    python -m benchmarks.vlm_prompt --images /data/sample --versions v1 v2
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from Fastapi_app.inference import VLM_PROMPTS, parse_vlm_response, request_vlm
+from Fastapi_app.utils import prepare_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="image folder")
+    parser.add_argument("--versions", nargs="+", default=sorted(VLM_PROMPTS), choices=sorted(VLM_PROMPTS))
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--json", help="also write per-image results to this file")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.images, f) for f in os.listdir(args.images) if f.lower().endswith(IMAGE_EXTENSIONS)
+    )[:args.limit]
+
+    rows = []
+    for path in paths:
+        with open(path, "rb") as f:
+            prepared = prepare_image(f.read())
+        row = {"image": os.path.basename(path)}
+        # Alternate the order per image so neither version always hits a warm connection
+        versions = args.versions if len(rows) % 2 == 0 else list(reversed(args.versions))
+        for version in versions:
+            start = time.perf_counter()
+            completion = request_vlm(prepared.vlm_jpeg, version)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            usage = completion.usage
+            row[version] = {
+                "latency_ms": round(elapsed_ms, 1),
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "groq_prompt_time_ms": round((getattr(usage, "prompt_time", None) or 0) * 1000, 1),
+                "groq_total_time_ms": round((getattr(usage, "total_time", None) or 0) * 1000, 1),
+                "answer": parse_vlm_response(completion, version),
+            }
+        rows.append(row)
+
+    if not rows:
+        raise SystemExit(f"No images found in {args.images}")
+
+    print(f"{len(rows)} images\n")
+    print(f"{'version':<9}{'p50 ms':>9}{'p95 ms':>9}{'prompt tok':>12}{'compl tok':>11}{'groq prompt ms':>16}")
+    for version in args.versions:
+        latencies = [r[version]["latency_ms"] for r in rows]
+        print(
+            f"{version:<9}{statistics.median(latencies):>9.1f}{percentile(latencies, 0.95):>9.1f}"
+            f"{statistics.mean(r[version]['prompt_tokens'] for r in rows):>12.0f}"
+            f"{statistics.mean(r[version]['completion_tokens'] for r in rows):>11.1f}"
+            f"{statistics.mean(r[version]['groq_prompt_time_ms'] for r in rows):>16.1f}"
+        )
+
+    if len(args.versions) > 1:
+        base = args.versions[0]
+        for version in args.versions[1:]:
+            same = sum(
+                (r[base]["answer"]["sector_key"], r[base]["answer"]["category_key"])
+                == (r[version]["answer"]["sector_key"], r[version]["answer"]["category_key"])
+                for r in rows
+            )
+            print(f"\n{version} agrees with {base} on sector+category for {same}/{len(rows)} images")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Memory and throughput of the multi-worker launcher: N workers forked from a parent
+that loaded the models once (copy-on-write) against N workers that each load their
+own copy (--independent).
+
+For every mode the report starts `python -m Fastapi_app.serve`, waits until all
+workers answer, drives POST /predict at a fixed concurrency and then reads
+/proc/<pid>/smaps_rollup for the master and every worker:
+  - RSS : counts shared pages once per process (overstates shared weights)
+  - PSS : shared pages divided among the processes sharing them (real footprint)
+
+The VLM is replaced by benchmarks.stub_groq (fixed --vlm-latency-ms) and the result
+cache is off, so every request runs the full decode + ViT path. Linux only.
+
+Run from the Vision_model directory:
+
+    python -m benchmarks.workers --workers 4 --concurrency 16 --duration 30
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from PIL import Image
+
+from benchmarks.offline_suite import VIT_SIZES, write_random_checkpoints
+from benchmarks.stub_groq import StubGroqServer
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def synthetic_images(count: int, seed: int = 0) -> list[bytes]:
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        image = Image.effect_noise((1280, 960), rng.uniform(20, 80)).convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def folder_images(folder: str, limit: int) -> list[bytes]:
+    paths = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+    images = []
+    for path in paths[:limit]:
+        with open(path, "rb") as f:
+            images.append(f.read())
+    return images
+
+
+def process_tree(pid: int) -> list[int]:
+    pids = [pid]
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                for child in f.read().split():
+                    pids.extend(process_tree(int(child)))
+        except OSError:
+            pass
+    return pids
+
+
+def memory_kb(pid: int) -> dict[str, int]:
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                usage[key.lower()] = int(value.split()[0])
+    return usage
+
+
+def tree_memory_mb(master_pid: int) -> dict:
+    per_process = {pid: memory_kb(pid) for pid in process_tree(master_pid)}
+    return {
+        "processes": len(per_process),
+        "master_rss_mb": round(per_process[master_pid]["rss"] / 1024, 1),
+        "total_rss_mb": round(sum(m["rss"] for m in per_process.values()) / 1024, 1),
+        "total_pss_mb": round(sum(m["pss"] for m in per_process.values()) / 1024, 1),
+    }
+
+
+async def wait_ready(base_url: str, master: subprocess.Popen, workers: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=5) as client:
+        while time.monotonic() < deadline:
+            if master.poll() is not None:
+                raise SystemExit(f"server exited with code {master.returncode}")
+            try:
+                if (await client.get(base_url + "/")).status_code == 200 \
+                        and len(process_tree(master.pid)) >= workers + 1:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"server not ready after {timeout:g}s")
+
+
+async def drive_load(base_url: str, images: list[bytes], concurrency: int, duration: float) -> dict:
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client: httpx.AsyncClient, worker_id: int):
+        nonlocal errors
+        i = worker_id
+        while time.monotonic() < deadline:
+            files = {"image": (f"{i}.jpg", images[i % len(images)], "image/jpeg")}
+            start = time.perf_counter()
+            try:
+                response = await client.post(base_url + "/predict", files=files)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+            i += concurrency
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(client_loop(client, n) for n in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies), 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99), 1) if latencies else None,
+    }
+
+
+async def run_mode(args, independent: bool, images: list[bytes], stub: StubGroqServer,
+                   model_env: dict) -> dict:
+    env = dict(
+        os.environ,
+        **model_env,
+        GROQ_BASE_URL=stub.base_url,
+        IMAGE_CACHE_SIZE="0",
+        IMAGE_CACHE_PATH="",
+        VIT_CASCADE="false",
+    )
+    # main.py copies these into os.environ at import time
+    for name in ("GROQ_API_KEY", "HUGGINGFACEHUB_API_TOKEN", "LANGCHAIN_API_KEY"):
+        env.setdefault(name, "unused-by-workers-report")
+
+    command = [sys.executable, "-m", "Fastapi_app.serve", "--host", "127.0.0.1", "--port", str(args.port),
+               "--workers", str(args.workers)]
+    if args.threads_per_worker:
+        command += ["--threads-per-worker", str(args.threads_per_worker)]
+    if independent:
+        command.append("--independent")
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    started = time.monotonic()
+    master = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL,
+                              stderr=None if args.verbose else subprocess.DEVNULL)
+    try:
+        await wait_ready(base_url, master, args.workers, args.startup_timeout)
+        startup_s = time.monotonic() - started
+        await asyncio.sleep(args.settle)
+        idle = tree_memory_mb(master.pid)
+        load = await drive_load(base_url, images, args.concurrency, args.duration)
+        loaded = tree_memory_mb(master.pid)
+    finally:
+        master.send_signal(signal.SIGTERM)
+        try:
+            master.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            master.kill()
+
+    return {
+        "mode": "independent" if independent else "shared",
+        "workers": args.workers,
+        "startup_s": round(startup_s, 1),
+        "idle": idle,
+        "after_load": loaded,
+        **load,
+    }
+
+
+async def run(args) -> list[dict]:
+    images = folder_images(args.images, args.limit) if args.images else synthetic_images(args.limit)
+    if not images:
+        raise SystemExit(f"No images found in {args.images}")
+    stub = StubGroqServer(latency_ms=args.vlm_latency_ms).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="vision-workers-") as workdir:
+            model_env = {}
+            if args.random_vit:
+                model_dir = os.path.join(workdir, "models")
+                model_env = {
+                    "MODEL_DIR": model_dir,
+                    "VIT_BASE_MODEL": write_random_checkpoints(model_dir, args.random_vit),
+                    "HF_HUB_OFFLINE": "1",
+                }
+            return [
+                await run_mode(args, mode == "independent", images, stub, model_env) for mode in args.modes
+            ]
+    finally:
+        stub.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads-per-worker", type=int, default=0, help="default: cpus / workers")
+    parser.add_argument("--modes", nargs="+", default=["shared", "independent"], choices=["shared", "independent"])
+    parser.add_argument("--random-vit", choices=sorted(VIT_SIZES),
+                        help="use randomly initialized checkpoints of this size instead of Fastapi_app/models")
+    parser.add_argument("--images", help="image folder (default: synthetic 1280x960 JPEGs)")
+    parser.add_argument("--limit", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load per mode")
+    parser.add_argument("--vlm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait after startup")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args))
+
+    print(f"\n{'mode':<13}{'workers':>8}{'startup s':>10}{'RSS idle':>10}{'PSS idle':>10}"
+          f"{'RSS load':>10}{'PSS load':>10}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for row in rows:
+        print(f"{row['mode']:<13}{row['workers']:>8}{row['startup_s']:>10}"
+              f"{row['idle']['total_rss_mb']:>10}{row['idle']['total_pss_mb']:>10}"
+              f"{row['after_load']['total_rss_mb']:>10}{row['after_load']['total_pss_mb']:>10}"
+              f"{row['req_per_s']:>8}{row['p50_ms'] or '-':>9}{row['p99_ms'] or '-':>9}{row['errors']:>8}")
+    print("\nMemory in MB summed over the master and all workers.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Fastapi_app is imported as a package, as by `uvicorn Fastapi_app.main:app`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# importing inference builds the Groq client; these tests never call it
+os.environ.setdefault("GROQ_API_KEY", "unused-in-tests")
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+from io import BytesIO
+
+from PIL import Image
+
+from Fastapi_app import inference
+
+
+class ThreadRecordingCache:
+    """Answers every exact lookup with a miss and every near lookup with a hit."""
+
+    def __init__(self):
+        self.threads = set()
+
+    def _record(self):
+        self.threads.add(threading.current_thread())
+
+    def get(self, sha256):
+        self._record()
+        return None
+
+    def get_near(self, phash):
+        self._record()
+        return {"sector": "Infrastructure", "category": "potholes"}
+
+    def put(self, sha256, phash, result):
+        self._record()
+
+
+def png(color) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (32, 32), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_batch_cache_calls_run_off_the_event_loop(monkeypatch):
+    cache = ThreadRecordingCache()
+    monkeypatch.setattr(inference, "result_cache", cache)
+
+    async def run():
+        return threading.current_thread(), await inference.predict_issue_hybrid_batch([png("red"), png("blue")])
+
+    loop_thread, results = asyncio.run(run())
+    assert [result["category"] for result in results] == ["potholes", "potholes"]
+    assert cache.threads and loop_thread not in cache.threads
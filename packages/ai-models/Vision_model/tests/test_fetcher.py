@@ -0,0 +1,39 @@
+import asyncio
+from io import BytesIO
+
+import httpx
+from PIL import Image
+
+from Fastapi_app.fetcher import ImageFetcher
+
+
+def png() -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_host_slots_limit_downloads_and_are_dropped_when_idle():
+    body = png()
+    active, peak = {}, {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.01)
+        active[host] -= 1
+        return httpx.Response(200, headers={"content-type": "image/png"}, content=body)
+
+    fetcher = ImageFetcher(max_bytes=1 << 20, timeout=5, max_connections=20, per_host_limit=2)
+
+    async def run():
+        fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        urls = [f"https://cdn{i % 3}.example.com/{i}.png" for i in range(12)]
+        results = await asyncio.gather(*(fetcher.fetch(url) for url in urls))
+        await fetcher.aclose()
+        return results
+
+    assert asyncio.run(run()) == [body] * 12
+    assert max(peak.values()) == 2
+    assert fetcher._host_slots == {}
@@ -0,0 +1,41 @@
+"""
+Pure decision logic of inference.py. Importing the module loads the ViT weights from
+Fastapi_app/models (see the README), but no test runs a model or calls Groq.
+"""
+import pytest
+
+from Fastapi_app.inference import SECTOR_CODES, cascade_shortcut, decode_vlm_codes, decode_vlm_keys
+
+
+def vit_result(sector, category, sector_confidence=0.99, category_confidence=0.99):
+    return {"sector": sector, "category": category,
+            "sector_confidence": sector_confidence, "category_confidence": category_confidence}
+
+
+def test_cascade_accepts_a_confident_in_taxonomy_prediction():
+    result = cascade_shortcut(vit_result("infrastructure", "potholes"), 0.9, 0.9, 0.9)
+    assert result["source"] == "vit_cascade_accept"
+    assert (result["sector"], result["category"]) == ("Infrastructure", "potholes")
+
+
+def test_cascade_defers_a_category_outside_the_sector():
+    # infra_id2label[1]: only exists under electricity_and_power in SECTOR_CATEGORIES
+    assert cascade_shortcut(vit_result("infrastructure", "fallen_electric_pole"), 0.9, 0.9, 0.9) is None
+
+
+def test_cascade_defers_an_invalid_subclass():
+    assert cascade_shortcut(vit_result("infrastructure", "invalid"), 0.9, 0.9, 0.9) is None
+
+
+@pytest.mark.parametrize("flag", [False, 0, "false", "False", "0", "no", "", None, [], [False]])
+def test_vlm_false_flags_are_not_valid(flag):
+    code = next(iter(SECTOR_CODES))
+    assert decode_vlm_codes({"s": code, "c": 1, "v": flag})["is_valid"] is False
+    assert decode_vlm_keys({"sector": SECTOR_CODES[code], "category": None, "is_valid": flag})["is_valid"] is False
+
+
+@pytest.mark.parametrize("flag", [True, 1, "true", " TRUE ", "1", "yes"])
+def test_vlm_true_flags_are_valid(flag):
+    code = next(iter(SECTOR_CODES))
+    assert decode_vlm_codes({"s": code, "c": 1, "v": flag})["is_valid"] is True
+    assert decode_vlm_codes({"s": 0, "c": 0, "v": flag})["is_valid"] is False
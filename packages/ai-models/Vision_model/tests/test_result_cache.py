@@ -0,0 +1,40 @@
+import random
+
+from Fastapi_app.result_cache import ImageResultCache, hamming
+
+
+def flip(phash: int, bits: list[int]) -> int:
+    for bit in bits:
+        phash ^= 1 << bit
+    return phash
+
+
+def test_near_lookup_matches_a_full_scan():
+    rng = random.Random(0)
+    cache = ImageResultCache("v", max_entries=10_000, phash_distance=5)
+    stored = {}
+    for i in range(500):
+        base = rng.getrandbits(64)
+        # clusters of near-duplicates, so there is something within the distance
+        for j in range(3):
+            phash = flip(base, rng.sample(range(64), rng.randint(0, 8)))
+            stored[f"{i}-{j}"] = phash
+            cache.put(f"{i}-{j}", phash, {"sha": f"{i}-{j}"})
+
+    for _ in range(300):
+        query = flip(rng.choice(list(stored.values())), rng.sample(range(64), rng.randint(0, 7)))
+        best = min(hamming(query, phash) for phash in stored.values())
+        result = cache.get_near(query)
+        if best > 5:
+            assert result is None
+        else:
+            assert hamming(query, stored[result["sha"]]) == best
+
+
+def test_evicted_entries_leave_the_band_index():
+    cache = ImageResultCache("v", max_entries=1, phash_distance=4)
+    cache.put("a", 0, {"sha": "a"})
+    cache.put("b", 2 ** 64 - 1, {"sha": "b"})
+    assert cache.get_near(1) is None
+    assert cache.get_near(2 ** 64 - 2) == {"sha": "b"}
+    assert all(all(shas == {"b"} for shas in bucket.values()) for bucket in cache._bands)
@@ -1,107 +1,269 @@
 ## importing necessary tokens and environement keys
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, NamedTuple
 from dotenv import load_dotenv
 load_dotenv()
-import json
 
 ## importing necessay modules and library to build gen AI application
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser   
-from langchain_groq import ChatGroq
-from langchain_community.embeddings import HuggingFaceEmbeddings
-import chromadb
-from chromadb import PersistentClient
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+# Only light imports here: importing this module must not load models or touch the
+# network. The heavy objects are built by init_resources() (FastAPI lifespan in main.py).
 import warnings
 warnings.filterwarnings('ignore')
 
+from config import settings
+from context_packer import pack_context
+from faq import faq_table
+from llm_stats import llm_usage, response_usage
+from retrievers import ChromaRetriever
+from semantic_cache import answer_cache
+from tokens import count_tokens
+
 
 ## Groq api key and setting hugging face environment
 Groq_api_key = os.getenv('GROQ_API_KEY')
-client = os.getenv("HUGGINGFACEHUB_API_TOKEN")
-
-## Langsmith tracking
-os.environ["LANGCHAIN_API_KEY"]= os.getenv("LANGCHAIN_API_KEY")
-os.environ["LANGCHAIN_TRACING_V2"]= "true"
-os.environ["LANGCHAIN_PROJECT"]= "Swaraj Desk interactive multi-lingual RAG chatbot"
-
-## Importing the JSON data
-with open("SwarajDesk_vectorDB.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
-
-# print(len(data)) #original JSON length
-
-
-## Vector embeddings using Hugging face sentence transformer
-embeddings_list = []   # to store all embeddings + metadata
-
-embedding_model = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-)
-
-
-for record in data:
-    content = record["content"]
-    embedding = embedding_model.embed_query(content)
-    
-    embeddings_list.append({
-        "embedding": embedding,
-        "title": record["title"],
-        "content": record["content"],
-        "tags": record["tags"]
-    })
-
-# print(len(embeddings_list))  # should match original JSON length 
-
+hf_token = os.getenv("HUGGINGFACEHUB_API_TOKEN")
+
+## Langsmith tracking (only when a key is configured)
+if os.getenv("LANGCHAIN_API_KEY"):
+    os.environ["LANGCHAIN_TRACING_V2"]= "true"
+    os.environ["LANGCHAIN_PROJECT"]= "Swaraj Desk interactive multi-lingual RAG chatbot"
+
+IMPORTED_AT = time.perf_counter()
+
+# Semantic cache lookup and retrieval are CPU-bound: they run here, off the event loop, at
+# most RAG_WORKERS at a time (threads are only started on first use). Query embedding has
+# its own batching thread (embedding_service.QueryEmbedder).
+rag_executor = ThreadPoolExecutor(max_workers=settings.RAG_WORKERS, thread_name_prefix="rag")
+
+
+## Shared RAG resources: embedding model, Chroma collection and LLM client
+
+class RAGResources:
+    def __init__(self):
+        self.embedding_model = None
+        self.query_embedder = None
+        self.client = None
+        self.collection = None
+        self.retriever = None
+        self.llm = None
+        self.ingest_stats = None
+        self.corpus_hash: str | None = None
+        self.last_reload: dict | None = None
+        self.startup_timings: dict[str, float] = {}
+        self.error: str | None = None
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def status(self) -> dict:
+        if self.ready.is_set():
+            status = {"status": "ready", "startup_s": self.startup_timings, "ingest": self.ingest_stats}
+            if self.last_reload:
+                status["last_reload"] = self.last_reload
+            return status
+        if self.error:
+            return {"status": "failed", "error": self.error}
+        return {"status": "starting"}
+
+
+resources = RAGResources()
+
+
+def init_resources() -> RAGResources:
+    """
+    Build every heavy object once (idempotent, thread-safe). Stage timings end up in
+    resources.startup_timings and /ready.
+    """
+    with resources._lock:
+        if resources.ready.is_set():
+            return resources
+        resources.error = None
+        timings = {}
+
+        def timed(name, fn):
+            start = time.perf_counter()
+            result = fn()
+            timings[name] = round(time.perf_counter() - start, 3)
+            return result
+
+        try:
+            start = time.perf_counter()
+            from chromadb import PersistentClient
+            from langchain_groq import ChatGroq
+            from ingest import hold_collection, sync_collection
+            timings["imports"] = round(time.perf_counter() - start, 3)
+
+            from embedding_backends import load_embedding_model, model_id
+            from embedding_service import build_query_embedder
+
+            # numpy backend + bundle: the prebuilt matrix is enough, Chroma is not opened at all
+            use_chroma = not (settings.BUNDLE_DIR and settings.RETRIEVER_BACKEND == "numpy")
+            if settings.BUNDLE_DIR:
+                # Prebuilt model + index (bundle.py): nothing to download or embed
+                from bundle import prepare_bundle
+
+                artifacts = timed("bundle", lambda: prepare_bundle(settings.BUNDLE_DIR, copy_chroma=use_chroma))
+                model_path, chroma_path = artifacts["embedding_model"], artifacts["chroma_path"]
+                numpy_index_dir, onnx_dir = artifacts["numpy_index"], artifacts["onnx_model"]
+                if artifacts["manifest"]["embedding_model"] != model_id(onnx_dir=onnx_dir):
+                    raise RuntimeError(f"Bundle was built for {artifacts['manifest']['embedding_model']!r}, "
+                                       f"not {model_id(onnx_dir=onnx_dir)!r} (EMBEDDING_MODEL / EMBEDDING_BACKEND)")
+            else:
+                model_path, chroma_path = settings.EMBEDDING_MODEL, settings.CHROMA_PATH
+                numpy_index_dir, onnx_dir = settings.NUMPY_INDEX_DIR, settings.ONNX_MODEL_DIR
+
+            ## Vector embeddings using Hugging face sentence transformer: PyTorch or the int8
+            ## ONNX export (EMBEDDING_BACKEND), here or in the shared embedding service
+            if settings.EMBEDDING_SERVICE_URL:
+                embedding_model = timed("embedding_model", lambda: connect_embedding_service(
+                    settings.EMBEDDING_SERVICE_URL))
+            else:
+                embedding_model = timed("embedding_model", lambda: load_embedding_model(model_path, onnx_dir))
+            # first encode builds the tokenizer / thread pools
+            timed("embedding_warmup", lambda: embedding_model.embed_query("warmup"))
+            query_embedder = build_query_embedder(embedding_model)
+
+            ## storing embedding vectors in chromaDB (only new or changed records, see ingest.py)
+            client = collection = None
+            if use_chroma:
+                client = timed("chroma_client", lambda: PersistentClient(path=chroma_path))
+            if settings.BUNDLE_DIR:
+                if use_chroma:
+                    collection = timed("chroma_open", lambda: client.get_collection(
+                        artifacts["manifest"].get("collection", settings.COLLECTION_NAME)))
+                ingest_stats = {"prebuilt": True, "records": artifacts["manifest"]["records"],
+                                "corpus_hash": artifacts["manifest"]["corpus_hash"]}
+                corpus_hash = artifacts["manifest"]["corpus_hash"]
+            else:
+                collection, ingest_stats = timed("ingest", lambda: sync_collection(client, embedding_model))
+                # promotions by other workers' hot reloads must not drop it (ingest.py)
+                hold_collection(client, settings.COLLECTION_NAME, collection)
+                corpus_hash = (collection.metadata or {}).get("corpus_hash")
+
+            # the bundle's NumPy index is read-only and already current: never re-export it
+            retriever = build_search_index(collection, numpy_index_dir, export=not settings.BUNDLE_DIR, timed=timed)
+
+            llm = timed("llm_client", lambda: build_llm(ChatGroq))
+            # precomputed FAQ answers (faq.py); only served while they match corpus_hash
+            timed("faq_table", lambda: faq_table.load(settings.FAQ_TABLE_DIR, model_id()))
+        except Exception as e:
+            resources.error = f"{type(e).__name__}: {e}"
+            print(f"RAG startup failed: {resources.error}")
+            raise
+
+        timings["total"] = round(sum(timings.values()), 3)
+        timings["import_to_ready"] = round(time.perf_counter() - IMPORTED_AT, 3)
+        resources.embedding_model = embedding_model
+        resources.query_embedder = query_embedder
+        resources.client = client
+        resources.collection = collection
+        resources.retriever = retriever
+        resources.llm = llm
+        resources.ingest_stats = ingest_stats
+        resources.corpus_hash = corpus_hash
+        # cached answers were generated from the previous corpus
+        answer_cache.set_corpus(corpus_hash)
+        resources.startup_timings = timings
+        resources.ready.set()
+
+    print(f"ChromaDB collection synced: {ingest_stats} (retriever: {retriever.name})")
+    print(f"RAG resources ready in {timings['total']}s: {timings}")
+    return resources
+
+
+def build_search_index(collection, numpy_index_dir: str, export: bool = True, timed=None):
+    """The configured retriever over `collection` (RETRIEVER_BACKEND, RETRIEVER_HYBRID)."""
+    from retrievers import build_retriever
+
+    timed = timed or (lambda name, fn: fn())
+    retriever = timed("retriever", lambda: build_retriever(
+        settings.RETRIEVER_BACKEND, collection, numpy_index_dir, export=export))
+    if settings.RETRIEVER_HYBRID:
+        from hybrid import HybridRetriever
+
+        retriever = timed("bm25_index", lambda: HybridRetriever(
+            retriever, alpha=settings.HYBRID_ALPHA, candidates=settings.HYBRID_CANDIDATES,
+            tag_filter=settings.HYBRID_TAG_FILTER))
+    return retriever
+
+
+def connect_embedding_service(url: str):
+    from embedding_service import RemoteEmbeddings
+
+    remote = RemoteEmbeddings(url)
+    from embedding_backends import model_id
+
+    # the index was built with this model and backend; other query vectors would not match
+    served = remote.info().get("embedding_model")
+    if served != model_id():
+        raise RuntimeError(f"Embedding service at {url} serves {served!r}, expected {model_id()!r}")
+    return remote
+
+
+def build_llm(chat_model_class):
+    """
+    The one Groq client of the process. Its HTTP clients keep a pool of connections to
+    the API, so requests reuse TLS connections instead of opening one each.
+    """
+    import httpx
+
+    limits = httpx.Limits(max_connections=settings.LLM_MAX_CONNECTIONS,
+                          max_keepalive_connections=settings.LLM_MAX_CONNECTIONS)
+    timeout = httpx.Timeout(settings.LLM_TIMEOUT, connect=10.0)
+    return chat_model_class(
+        model=settings.LLM_MODEL,
+        groq_api_key=Groq_api_key,
+        request_timeout=settings.LLM_TIMEOUT,
+        max_retries=settings.LLM_MAX_RETRIES,
+        http_client=httpx.Client(limits=limits, timeout=timeout),
+        http_async_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+    )
 
-## storing embedding vectors in chromaDB
 
-# initialize chroma client
-client = PersistentClient(path="./chroma_store")
+def require_ready():
+    """
+    FastAPI dependency: 503 instead of a crash while the resources are still loading.
+    With LAZY_INIT the first request builds them (sync dependency: runs in the threadpool).
+    """
+    if resources.ready.is_set():
+        return
+    from fastapi import HTTPException
 
+    if settings.LAZY_INIT:
+        try:
+            init_resources()
+            return
+        except Exception:
+            raise HTTPException(status_code=503, detail=f"Chat backend failed to start: {resources.error}")
+    raise HTTPException(status_code=503, detail="Chat backend is starting, retry shortly",
+                        headers={"Retry-After": "5"})
 
-# create / load collection
-collection = client.get_or_create_collection(
-    name="swarajdesk_chroma_db",       # changed for better naming
-    metadata={"hnsw:space": "cosine"}   # similarity metric
-)
 
-# store embeddings + metadata in chroma
-for idx, item in enumerate(embeddings_list):
-    collection.add(
-    ids=[str(idx)],
-    embeddings=[item["embedding"]],
-    documents=[item["content"]],
-    metadatas=[
-        {
-            "title": item["title"],
-            "content": item["content"],
-            "tags": ", ".join(item["tags"])    # FIX: convert list → string
-        }
-    ]
-)
 
-print("Embeddings stored successfully in ChromaDB!")
-# number of stored records.
-print(collection.count())                     
+## Function to retrieve context from ChromaDB based on user query
 
+def retrieve_hits(user_query: str, collection=None, k: int | None = None, query_embedding=None, tags=None):
+    # 1) Embed the user query using HuggingFace embeddings model (unless the caller already did)
+    if query_embedding is None:
+        query_embedding = resources.query_embedder.embed(user_query)
 
+    # 2) Similarity search: configured backend (RETRIEVER_BACKEND / RETRIEVER_HYBRID),
+    #    or an explicit Chroma collection. Hits are best first, with their scores.
+    if collection is None or collection is resources.collection:
+        retriever = resources.retriever
+    else:
+        retriever = ChromaRetriever(collection)
+    return retriever.search_one(query_embedding, k or settings.RETRIEVAL_TOP_K, query_text=user_query, tags=tags)
 
-## Function to retrieve context from ChromaDB based on user query
 
-def retrieve_context(user_query: str, collection, k: int = 5):
-    # 1) Embed the user query using HuggingFace embeddings model
-    query_embedding = embedding_model.embed_query(user_query)
+def retrieve_context(user_query: str, collection=None, k: int | None = None, query_embedding=None, tags=None):
+    hits = retrieve_hits(user_query, collection, k, query_embedding, tags)
 
-    # 2) Query ChromaDB for similarity
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=k
-    )
-
-    metadatas = results["metadatas"][0]
-    documents = results.get("documents", [[]])[0]
+    metadatas = [hit.metadata for hit in hits]
+    documents = [hit.document for hit in hits]
 
     return metadatas, documents
 
@@ -191,13 +353,53 @@ Supported output modes:
 """
 
 
-def answer_user_query(user_query: str, collection, language: str = "english"):
-    # 1) Retrieve context
-    metadatas, _ = retrieve_context(user_query, collection, k=5)
+class PreparedQuery(NamedTuple):
+    """Everything before the LLM call; cached_answer set means there is nothing left to do."""
+    cache_key: str
+    query_embedding: list
+    cached_answer: str | None
+    messages: list[dict]
+    context_text: str
+    packing: dict
+    started: float
+    corpus_hash: str | None = None      # corpus the context came from (see finish_answer)
+
+
+def prepare_query(user_query: str, collection=None, language: str = "english", tags=None,
+                  query_embedding=None, started: float | None = None, use_cache: bool = True) -> PreparedQuery:
+    """use_cache=False always builds the messages (no FAQ table, no semantic cache)."""
+    started = started or time.perf_counter()
+    lang = language.lower()
+    # unknown languages get the English instruction below, so they share its cache entries;
+    # a tag filter changes the context, so it is part of the key as well
+    answer_language = lang if lang in ("hindi", "hinglish", "odia") else "english"
+    cache_language = answer_language
+    if tags:
+        cache_language += "|" + ",".join(sorted(tag.strip().lower() for tag in tags))
+
+    # read before retrieval: a hot reload swaps the retriever first, then the corpus hash
+    corpus = answer_cache.corpus_hash
+
+    # 0) Precomputed FAQ answer (faq.py, not with a tag filter), then the semantic cache:
+    #    a near-identical question in the same language was answered already
+    if query_embedding is None:
+        query_embedding = resources.query_embedder.embed(user_query)
+    if use_cache:
+        cached = None if tags else faq_table.lookup(query_embedding, answer_language, corpus)
+        if cached is None:
+            cached = answer_cache.lookup(query_embedding, cache_language)
+        if cached is not None:
+            return PreparedQuery(cache_language, query_embedding, cached, [], "", {}, started)
+
+    # 1) Retrieve context, packed into CONTEXT_TOKEN_BUDGET (context_packer.py)
+    hits = retrieve_hits(user_query, collection, query_embedding=query_embedding, tags=tags)
+    if settings.CONTEXT_TOKEN_BUDGET > 0:
+        metadatas, packing = pack_context(hits, user_query, settings.CONTEXT_TOKEN_BUDGET, settings.CONTEXT_MIN_SCORE)
+    else:
+        metadatas, packing = [hit.metadata for hit in hits], {"retrieved": len(hits), "packed": len(hits)}
     context_text = build_context_text(metadatas)
 
     # 2) Language instruction (target output language)
-    lang = language.lower()
 
     if lang == "hindi":
         language_instruction = (
@@ -249,13 +451,79 @@ Always follow these extra rules:
         },
     ]
 
-    # 5) Call Groq model
-    model = ChatGroq(model="openai/gpt-oss-120b", groq_api_key=Groq_api_key)
-    response = model.invoke(messages)
+    return PreparedQuery(cache_language, query_embedding, None, messages, context_text, packing, started, corpus)
+
+
+def finish_answer(prepared: PreparedQuery, response, final_answer: str, llm_started: float, first_token_at=None):
+    """Token usage and timings for /stats, then the semantic cache."""
+    now = time.perf_counter()
+    usage = response_usage(response)
+    if usage.get("prompt_tokens") is None:
+        usage = {"prompt_tokens": sum(count_tokens(m["content"]) for m in prepared.messages),
+                 "completion_tokens": count_tokens(final_answer)}
+    timings = {
+        "latency_ms": round((now - llm_started) * 1000, 1),         # LLM call
+        "total_ms": round((now - prepared.started) * 1000, 1),      # embedding + retrieval + LLM
+    }
+    if first_token_at is not None:
+        timings["first_token_ms"] = round((first_token_at - llm_started) * 1000, 1)
+        timings["ttfb_ms"] = round((first_token_at - prepared.started) * 1000, 1)
+    llm_usage.record(**usage, context_tokens=count_tokens(prepared.context_text),
+                     chunks_packed=prepared.packing["packed"], **timings)
+    print(f"LLM call: {usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion tokens, "
+          f"context {prepared.packing['packed']}/{prepared.packing['retrieved']} chunks, {timings}")
+    # not cached if the corpus was reloaded while this answer was being generated
+    answer_cache.store(prepared.query_embedding, prepared.cache_key, final_answer, corpus_hash=prepared.corpus_hash)
+
+
+async def prepare_query_async(user_query: str, collection=None, language: str = "english", tags=None) -> PreparedQuery:
+    started = time.perf_counter()
+    # micro-batched with the other requests' queries (embedding_service.py), no thread held
+    query_embedding = await resources.query_embedder.aembed(user_query)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(rag_executor, prepare_query, user_query, collection, language, tags,
+                                      query_embedding, started)
+
+
+async def answer_user_query(user_query: str, collection=None, language: str = "english", tags=None):
+    prepared = await prepare_query_async(user_query, collection, language, tags)
+    if prepared.cached_answer is not None:
+        return prepared.cached_answer
+
+    # 5) Call Groq model (client built once by init_resources), without blocking the event loop
+    llm_started = time.perf_counter()
+    response = await resources.llm.ainvoke(prepared.messages)
     final_answer = response.content.strip()
+
+    # 6) Token usage for this request (provider's count when it reports one)
+    finish_answer(prepared, response, final_answer, llm_started)
     return final_answer
 
 
+async def stream_user_query(user_query: str, collection=None, language: str = "english",
+                            tags=None) -> AsyncIterator[str]:
+    """
+    Same pipeline as answer_user_query, but yields the answer as the model produces it
+    (ChatGroq.astream). A cached answer comes back as a single piece.
+    """
+    prepared = await prepare_query_async(user_query, collection, language, tags)
+    if prepared.cached_answer is not None:
+        yield prepared.cached_answer
+        return
+
+    llm_started = time.perf_counter()
+    first_token_at = None
+    message, parts = None, []
+    async for chunk in resources.llm.astream(prepared.messages):
+        # chunks add up to the full message, usage included (Groq sends it with the last one)
+        message = chunk if message is None else message + chunk
+        if chunk.content:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(chunk.content)
+            yield chunk.content
+
+    finish_answer(prepared, message, "".join(parts).strip(), llm_started, first_token_at)
 
 
 ## adding a voice bot 
@@ -267,38 +535,47 @@ Always follow these extra rules:
 
 
 
-## TESTING 
+## TESTING (manual smoke test: python app.py)
 
-# Interact in English with user
+if __name__ == "__main__":
+    init_resources()
+    collection = resources.collection
 
-# reply = answer_user_query(
-#     "How can I reset my password?",
-#     collection,
-#     language="english"
-# )
-# print(reply)
+    # answer_user_query is async; one event loop for the whole test (the LLM client's
+    # connection pool belongs to it)
+    async def smoke_test():
+        # Interact in English with user
 
+        # reply = await answer_user_query(
+        #     "How can I reset my password?",
+        #     collection,
+        #     language="english"
+        # )
+        # print(reply)
 
-# Interact in hindi with user
 
-reply = answer_user_query(
-    "शिकायत कैसे दर्ज करें",
-    collection,
-    language="hindi"
-)
-print(reply)
+        # Interact in hindi with user
+
+        reply = await answer_user_query(
+            "शिकायत कैसे दर्ज करें",
+            collection,
+            language="hindi"
+        )
+        print(reply)
+
+        # reply = await answer_user_query(
+        #     "Password reset karne ka tarika kya hai?",
+        #     collection,
+        #     language="hinglish"
+        # )
+        # print(reply)
 
-# reply = answer_user_query(
-#     "Password reset karne ka tarika kya hai?",
-#     collection,
-#     language="hinglish"
-# )
-# print(reply)
 
+        ## FINAL TESTING
+        user_question = "How can I reset my password?"
+        reply = await answer_user_query(user_question, collection)
 
-## FINAL TESTING
-user_question = "How can I reset my password?"
-reply = answer_user_query(user_question, collection)
+        print("User:", user_question)
+        print("Bot :", reply)
 
-print("User:", user_question)
-print("Bot :", reply)
\ No newline at end of file
+    asyncio.run(smoke_test())
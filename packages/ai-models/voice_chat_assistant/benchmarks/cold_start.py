@@ -0,0 +1,232 @@
+"""
+Cold start of the Lambda (Mangum) entrypoint: time from a fresh runtime to the first
+answered /chat_swaraj request, then the warm latency of the following ones.
+
+Variants:
+  bundle   BUNDLE_DIR points at a prebuilt bundle (bundle.py): model loaded from disk,
+           index copied from the package, nothing embedded
+  source   no bundle: model from EMBEDDING_MODEL (Hub download unless cached) and the
+           corpus embedded into an empty Chroma store, like a container with an empty /tmp
+
+Runtimes:
+  process  a fresh Python process per run calls main.handler with an API Gateway event
+           (AWS_LAMBDA_FUNCTION_NAME is set, so the Lambda defaults apply)
+  rie      a fresh container per run of the image built from Dockerfile.lambda, invoked
+           through the Lambda Runtime Interface Emulator that the AWS base image ships
+
+Groq is replaced by benchmarks.stub_groq in both runtimes.
+
+Run from the voice_chat_assistant directory:
+
+    python bundle.py --out bundle
+    python -m benchmarks.cold_start --runtime process --variants bundle source --runs 5
+    docker build -f Dockerfile.lambda -t swaraj-chat-lambda .
+    python -m benchmarks.cold_start --runtime rie --image swaraj-chat-lambda --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from benchmarks.stub_groq import StubGroqServer
+
+QUERY = {"user_query": "How can I reset my password?", "language": "english"}
+RIE_PATH = "/2015-03-31/functions/function/invocations"
+
+
+def api_gateway_event(path: str, body: dict | None = None, method: str = "POST") -> dict:
+    """API Gateway HTTP API (payload v2) event, as Lambda hands it to Mangum."""
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {"content-type": "application/json", "host": "localhost", "user-agent": "cold-start-bench"},
+        "requestContext": {
+            "accountId": "000000000000",
+            "apiId": "local",
+            "domainName": "localhost",
+            "domainPrefix": "localhost",
+            "http": {"method": method, "path": path, "protocol": "HTTP/1.1",
+                     "sourceIp": "127.0.0.1", "userAgent": "cold-start-bench"},
+            "requestId": str(uuid.uuid4()),
+            "routeKey": "$default",
+            "stage": "$default",
+            "time": time.strftime("%d/%b/%Y:%H:%M:%S +0000", time.gmtime()),
+            "timeEpoch": int(time.time() * 1000),
+        },
+        "body": json.dumps(body) if body is not None else None,
+        "isBase64Encoded": False,
+    }
+
+
+# Runs inside the fresh process: import, first (cold) invocation, then warm ones
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+event, warm = json.loads(sys.argv[1]), int(sys.argv[2])
+
+class Context:
+    function_name = "cold-start-bench"
+    aws_request_id = "bench"
+
+response = main.handler(event, Context())
+first = time.perf_counter()
+warm_ms = []
+for _ in range(warm):
+    t = time.perf_counter()
+    main.handler(event, Context())
+    warm_ms.append((time.perf_counter() - t) * 1000)
+print("RESULT " + json.dumps({
+    "status": response["statusCode"],
+    "import_ms": (imported - start) * 1000,
+    "first_invoke_ms": (first - imported) * 1000,
+    "warm_ms": warm_ms,
+    "startup": main.resources.startup_timings,
+}))
+"""
+
+
+def run_process(args, env: dict) -> dict:
+    event = api_gateway_event("/chat_swaraj", QUERY)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", CHILD, json.dumps(event), str(args.warm)],
+                            env=env, capture_output=True, text=True, timeout=args.timeout)
+    total_ms = (time.perf_counter() - started) * 1000
+    lines = [line for line in result.stdout.splitlines() if line.startswith("RESULT ")]
+    if result.returncode or not lines:
+        raise SystemExit(f"cold start run failed:\n{result.stderr[-3000:]}")
+    row = json.loads(lines[-1][len("RESULT "):])
+    # process start -> first response (interpreter start + import + init + request),
+    # minus the warm invocations that ran afterwards
+    row["cold_ms"] = total_ms - sum(row["warm_ms"])
+    return row
+
+
+def run_rie(args, env: dict) -> dict:
+    name = f"cold-start-{uuid.uuid4().hex[:8]}"
+    command = ["docker", "run", "-d", "--rm", "--name", name, "--network", "host"]
+    for key in ("BUNDLE_DIR", "GROQ_BASE_URL", "GROQ_API_KEY", "CHROMA_PATH"):
+        if key in env:
+            command += ["-e", f"{key}={env[key]}"]
+    command.append(args.image)
+
+    url = f"http://127.0.0.1:{args.rie_port}{RIE_PATH}"
+    event = api_gateway_event("/chat_swaraj", QUERY)
+    started = time.perf_counter()
+    subprocess.run(command, check=True, capture_output=True)
+    try:
+        with httpx.Client(timeout=args.timeout) as client:
+            deadline = time.monotonic() + args.timeout
+            while True:
+                # the emulator runs the function's init on the first invocation
+                try:
+                    invoke_start = time.perf_counter()
+                    response = client.post(url, json=event)
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline:
+                        raise SystemExit("emulator did not come up")
+                    time.sleep(0.05)
+            first = time.perf_counter()
+            warm_ms = []
+            for _ in range(args.warm):
+                t = time.perf_counter()
+                client.post(url, json=event)
+                warm_ms.append((time.perf_counter() - t) * 1000)
+    finally:
+        subprocess.run(["docker", "stop", name], capture_output=True)
+
+    return {
+        "status": response.json().get("statusCode"),
+        "cold_ms": (first - started) * 1000,
+        "first_invoke_ms": (first - invoke_start) * 1000,
+        "warm_ms": warm_ms,
+    }
+
+
+def summarize(variant: str, rows: list[dict]) -> dict:
+    warm = [ms for row in rows for ms in row["warm_ms"]]
+    summary = {
+        "variant": variant,
+        "runs": len(rows),
+        "errors": sum(row["status"] != 200 for row in rows),
+        "cold_p50_ms": round(statistics.median(row["cold_ms"] for row in rows), 1),
+        "cold_max_ms": round(max(row["cold_ms"] for row in rows), 1),
+        "first_invoke_p50_ms": round(statistics.median(row["first_invoke_ms"] for row in rows), 1),
+        "warm_p50_ms": round(statistics.median(warm), 1) if warm else None,
+    }
+    if rows[0].get("startup"):
+        stages = rows[0]["startup"].keys()
+        summary["startup_p50_s"] = {
+            stage: round(statistics.median(row["startup"][stage] for row in rows), 3) for stage in stages
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runtime", choices=["process", "rie"], default="process")
+    parser.add_argument("--variants", nargs="+", choices=["bundle", "source"], default=["bundle", "source"])
+    parser.add_argument("--bundle", default="bundle", help="bundle directory (process runtime)")
+    parser.add_argument("--image", default="swaraj-chat-lambda", help="image built from Dockerfile.lambda (rie)")
+    parser.add_argument("--rie-port", type=int, default=8080)
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per variant")
+    parser.add_argument("--warm", type=int, default=5, help="warm invocations after each cold start")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    stub = StubGroqServer(latency_ms=args.llm_latency_ms).start()
+    results = []
+    try:
+        for variant in args.variants:
+            rows = []
+            for _ in range(args.runs):
+                with tempfile.TemporaryDirectory(prefix="chat-cold-") as scratch:
+                    env = dict(
+                        os.environ,
+                        AWS_LAMBDA_FUNCTION_NAME="cold-start-bench",
+                        GROQ_BASE_URL=stub.base_url,
+                        GROQ_API_KEY=os.environ.get("GROQ_API_KEY", "unused-by-stub"),
+                        BUNDLE_SCRATCH_DIR=scratch,
+                        STATIC_DIR=os.path.join(scratch, "static"),
+                        CHROMA_PATH=os.path.join(scratch, "chroma_store"),
+                        BUNDLE_DIR=os.path.abspath(args.bundle) if variant == "bundle" else "",
+                    )
+                    if args.runtime == "rie":
+                        if variant == "bundle":
+                            env.pop("BUNDLE_DIR")   # keep the image's own BUNDLE_DIR
+                        env["CHROMA_PATH"] = "/tmp/chroma_store"
+                        rows.append(run_rie(args, env))
+                    else:
+                        rows.append(run_process(args, env))
+            results.append(summarize(variant, rows))
+    finally:
+        stub.shutdown()
+
+    print(f"\n{'variant':<10}{'runs':>6}{'errors':>8}{'cold p50 ms':>13}{'cold max ms':>13}"
+          f"{'1st invoke ms':>15}{'warm p50 ms':>13}")
+    for row in results:
+        print(f"{row['variant']:<10}{row['runs']:>6}{row['errors']:>8}{row['cold_p50_ms']:>13}"
+              f"{row['cold_max_ms']:>13}{row['first_invoke_p50_ms']:>15}{row['warm_p50_ms'] or '-':>13}")
+        if row.get("startup_p50_s"):
+            print(f"{'':<10}init stages (s): {row['startup_p50_s']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Query-embedding throughput under concurrent load: the per-query path (one
+embed_query call per request) against embedding_service.QueryEmbedder (micro-batching,
+optionally the LRU) in process, and against the shared embedding service over HTTP, on
+the configured EMBEDDING_BACKEND.
+
+--concurrency threads each embed --queries / concurrency queries back to back, like
+requests arriving from that many users. Queries are the labeled retrieval questions
+with a counter appended, so every one is new, except for the --hot share, which is
+drawn from 10 recurring questions (the LRU only helps those).
+
+Reported per mode and concurrency: queries/sec, p50 / p95 latency of one query, and for
+the batched modes the mean batch size.
+
+Run from the voice_chat_assistant directory:
+
+    python -m benchmarks.embedding_throughput --concurrency 1 8 32 --queries 512
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+
+from config import settings
+
+SERVICE_PORT = 8096
+
+
+def make_queries(count: int, hot: float, seed: int = 0) -> list[str]:
+    with open("benchmarks/retrieval_queries.json", "r", encoding="utf-8") as f:
+        base = [item["query"] for item in json.load(f)]
+    rng = random.Random(seed)
+    hot_set = base[:10]
+    return [rng.choice(hot_set) if rng.random() < hot else f"{rng.choice(base)} ({i})" for i in range(count)]
+
+
+def run_load(embed, queries: list[str], concurrency: int) -> dict:
+    latencies, lock = [], threading.Lock()
+    shares = [queries[i::concurrency] for i in range(concurrency)]
+
+    def worker(share):
+        local = []
+        for text in share:
+            t = time.perf_counter()
+            embed(text)
+            local.append((time.perf_counter() - t) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(share,)) for share in shares]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "qps": round(len(queries) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 2),
+    }
+
+
+def start_service(model: str, timeout: float) -> subprocess.Popen:
+    service = subprocess.Popen([sys.executable, "embedding_service.py", "--port", str(SERVICE_PORT), "--model", model],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{SERVICE_PORT}/info", timeout=2).status_code == 200:
+                return service
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    service.terminate()
+    raise SystemExit("embedding service did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--queries", type=int, default=512, help="per mode and concurrency")
+    parser.add_argument("--hot", type=float, default=0.3, help="share of queries from the 10 recurring ones")
+    parser.add_argument("--wait-ms", type=float, default=settings.EMBED_BATCH_WAIT_MS)
+    parser.add_argument("--max-batch", type=int, default=settings.EMBED_MAX_BATCH)
+    parser.add_argument("--no-service", action="store_true", help="skip the separate-process mode")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    from embedding_backends import load_embedding_model
+    from embedding_service import QueryEmbedder, RemoteEmbeddings
+
+    model = load_embedding_model()
+    model.embed_query("warmup")
+    service = None if args.no_service else start_service(settings.EMBEDDING_MODEL, timeout=600)
+
+    rows = []
+    service_seen = [0, 0]
+    if service:
+        served = httpx.get(f"http://127.0.0.1:{SERVICE_PORT}/stats").json()
+        service_seen = [served["batches"], served["embedded"]]
+    try:
+        for concurrency in args.concurrency:
+            queries = make_queries(args.queries, args.hot, seed=concurrency)
+            modes = {
+                "per-query": (lambda: None, None),
+                "batched": (lambda: QueryEmbedder(model, args.max_batch, args.wait_ms, cache_size=0), None),
+                "batched+lru": (lambda: QueryEmbedder(model, args.max_batch, args.wait_ms), None),
+            }
+            if service:
+                remote = RemoteEmbeddings(f"http://127.0.0.1:{SERVICE_PORT}")
+                modes["service"] = (lambda: None, remote)
+            for name, (make_embedder, remote_model) in modes.items():
+                embedder = make_embedder()
+                if remote_model is not None:
+                    embed = remote_model.embed_query
+                elif embedder is None:
+                    embed = model.embed_query
+                else:
+                    embed = embedder.embed
+                row = {"mode": name, "concurrency": concurrency, **run_load(embed, queries, concurrency)}
+                if embedder is not None:
+                    row["mean_batch"] = embedder.stats()["mean_batch"]
+                elif remote_model is not None:
+                    # batching happens in the service; its counters are cumulative, so take the delta
+                    served = httpx.get(f"http://127.0.0.1:{SERVICE_PORT}/stats").json()
+                    batches, embedded = served["batches"] - service_seen[0], served["embedded"] - service_seen[1]
+                    service_seen[:] = [served["batches"], served["embedded"]]
+                    row["mean_batch"] = round(embedded / batches, 2) if batches else None
+                rows.append(row)
+                print(f"{name} x{concurrency}: {row}", file=sys.stderr)
+    finally:
+        if service:
+            service.terminate()
+            service.wait()
+
+    print(f"\n{args.queries} queries per run, {args.hot:.0%} recurring, wait {args.wait_ms:g} ms, "
+          f"max batch {args.max_batch}, {os.cpu_count()} CPU")
+    print(f"{'mode':<13}{'conc':>6}{'q/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'batch':>7}")
+    for row in rows:
+        print(f"{row['mode']:<13}{row['concurrency']:>6}{row['qps']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+              f"{row.get('mean_batch') or '-':>7}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
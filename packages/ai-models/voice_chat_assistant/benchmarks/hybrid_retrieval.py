@@ -0,0 +1,128 @@
+"""
+Retrieval quality, latency and context size: dense-only against hybrid BM25 + dense
+(hybrid.py), with client tags and with the automatic tag prefilter, on a labeled
+query set.
+
+benchmarks/retrieval_queries.json holds questions (English, Hinglish, Hindi) with the
+title of the record that answers them and, for some, the tags a client would send.
+The corpus is embedded once with EMBEDDING_MODEL (EMBEDDING_BACKEND) into a temporary
+exact NumPy index, so every configuration sees the same dense scores.
+
+For each configuration and k = 1..--max-k it reports hit@k (expected record in the
+top k), MRR, the size of the context sent to the LLM (build_context_text, tokens), the
+size after context_packer.pack_context of the top --k with --budget, and the retrieval
+latency (query embedding excluded). The last table shows the smallest k that matches
+dense-only hit@--k, and how many context tokens that saves.
+
+Run from the voice_chat_assistant directory:
+
+    python -m benchmarks.hybrid_retrieval --k 5
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from config import settings
+from tokens import count_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", default="benchmarks/retrieval_queries.json")
+    parser.add_argument("--k", type=int, default=5, help="dense-only baseline k")
+    parser.add_argument("--max-k", type=int, default=5)
+    parser.add_argument("--alpha", type=float, default=settings.HYBRID_ALPHA)
+    parser.add_argument("--budget", type=int, default=settings.CONTEXT_TOKEN_BUDGET or 800,
+                        help="context_packer budget for the packed column (top --k hits)")
+    parser.add_argument("--repeat", type=int, default=20, help="latency: searches per query")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    from app import build_context_text
+    from context_packer import pack_context
+    from embedding_backends import load_embedding_model, model_id
+    from hybrid import HybridRetriever
+    from ingest import load_corpus, record_id, record_metadata, record_hash
+    from retrievers import NumpyRetriever, write_numpy_index
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        labeled = json.load(f)
+
+    embedding_model = load_embedding_model()
+    records = load_corpus(settings.CORPUS_PATH)
+    embeddings = embedding_model.embed_documents([record["content"] for record in records])
+    query_embeddings = embedding_model.embed_documents([item["query"] for item in labeled])
+
+    with tempfile.TemporaryDirectory(prefix="chat-hybrid-") as index_dir:
+        write_numpy_index(index_dir, [record_id(r) for r in records], embeddings,
+                          [record_metadata(r, record_hash(r)) for r in records],
+                          [r["content"] for r in records], {"embedding_model": model_id()})
+        dense = NumpyRetriever(index_dir)
+        hybrid = HybridRetriever(dense, alpha=args.alpha)
+        auto_tags = HybridRetriever(dense, alpha=args.alpha, tag_filter=True)
+        configs = {
+            "dense": lambda emb, item, k: dense.search_one(emb, k),
+            "hybrid": lambda emb, item, k: hybrid.search_one(emb, k, query_text=item["query"]),
+            # tags sent by the client (only some queries have them)
+            "hybrid+tags": lambda emb, item, k: hybrid.search_one(emb, k, query_text=item["query"],
+                                                                   tags=item.get("tags")),
+            # HYBRID_TAG_FILTER: tag words found in the query
+            "hybrid+auto": lambda emb, item, k: auto_tags.search_one(emb, k, query_text=item["query"]),
+        }
+
+        rows = []
+        for name, search in configs.items():
+            ranks, tokens, packed, latencies = [], {k: [] for k in range(1, args.max_k + 1)}, [], []
+            for emb, item in zip(query_embeddings, labeled):
+                hits = search(emb, item, args.max_k)
+                titles = [hit.metadata["title"] for hit in hits]
+                ranks.append(titles.index(item["expected"]) + 1 if item["expected"] in titles else None)
+                for k in tokens:
+                    tokens[k].append(count_tokens(build_context_text([hit.metadata for hit in hits[:k]])))
+                metadatas, _ = pack_context(hits[:args.k], item["query"], args.budget, settings.CONTEXT_MIN_SCORE)
+                packed.append(count_tokens(build_context_text(metadatas)))
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    search(emb, item, args.k)
+                    latencies.append((time.perf_counter() - start) * 1000)
+            rows.append({
+                "config": name,
+                "hit_at": {k: round(sum(r is not None and r <= k for r in ranks) / len(ranks), 3) for k in tokens},
+                "mrr": round(statistics.mean(1 / r if r else 0 for r in ranks), 3),
+                "context_tokens_at": {k: round(statistics.mean(values), 1) for k, values in tokens.items()},
+                "packed_tokens": round(statistics.mean(packed), 1),
+                "p50_ms": round(statistics.median(latencies), 3),
+            })
+
+    ks = range(1, args.max_k + 1)
+    print(f"\n{len(labeled)} queries, {len(records)} records, alpha={args.alpha}")
+    print(f"{'config':<13}" + "".join(f"{f'hit@{k}':>8}" for k in ks) + f"{'MRR':>7}"
+          + "".join(f"{f'tok@{k}':>8}" for k in ks) + f"{'packed':>8}{'p50 ms':>9}")
+    for row in rows:
+        print(f"{row['config']:<13}" + "".join(f"{row['hit_at'][k]:>8}" for k in ks) + f"{row['mrr']:>7}"
+              + "".join(f"{row['context_tokens_at'][k]:>8}" for k in ks) + f"{row['packed_tokens']:>8}"
+              + f"{row['p50_ms']:>9}")
+
+    baseline = rows[0]
+    target = baseline["hit_at"][args.k]
+    base_tokens = baseline["context_tokens_at"][args.k]
+    print(f"\nSmallest k reaching dense hit@{args.k} = {target} ({base_tokens} context tokens):")
+    for row in rows:
+        k = next((k for k in ks if row["hit_at"][k] >= target), None)
+        if k is None:
+            print(f"  {row['config']:<13} never reaches it within k <= {args.max_k}")
+            continue
+        saved = 1 - row["context_tokens_at"][k] / base_tokens
+        row["k_for_baseline_hit"] = k
+        row["context_token_reduction"] = round(saved, 3)
+        print(f"  {row['config']:<13} k={k}  {row['context_tokens_at'][k]} tokens  ({saved:.0%} fewer)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Latency and memory of the retriever backends (retrievers.py): the Chroma collection
+against the exact, memory-mapped NumPy index, on the same vectors.
+
+For every corpus size both indexes are built from the same synthetic, clustered
+384-dim embeddings with metadata shaped like SwarajDesk_vectorDB.json records. Each
+backend is then measured in a fresh process:
+  - open_ms     : opening the index (client + collection / mapping the matrix)
+  - single      : p50 / p99 of one query at a time (what retrieve_context does)
+  - batched     : queries/sec with --batch queries per call
+  - rss_mb      : resident memory added by opening and querying the index
+  - recall@k    : overlap of Chroma's (approximate, HNSW) top-k with the exact top-k
+
+Run from the voice_chat_assistant directory:
+
+    python -m benchmarks.retrievers --sizes 24 1000 10000 50000 --queries 500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+COLLECTION = "bench"
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def synthetic_corpus(size: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, size // 20), dim)).astype(np.float32)
+    embeddings = centers[rng.integers(0, len(centers), size)] + 0.35 * rng.standard_normal((size, dim), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    with open("SwarajDesk_vectorDB.json", "r", encoding="utf-8") as f:
+        records = json.load(f)
+    ids, metadatas, documents = [], [], []
+    for i in range(size):
+        record = records[i % len(records)]
+        ids.append(f"doc-{i}")
+        metadatas.append({"title": f"{record['title']} #{i}", "content": record["content"],
+                          "tags": ", ".join(record["tags"])})
+        documents.append(record["content"])
+    return ids, embeddings, metadatas, documents
+
+
+def queries_for(embeddings: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    queries = embeddings[rng.integers(0, len(embeddings), count)] \
+        + 0.5 * rng.standard_normal((count, embeddings.shape[1]), dtype=np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def build_indexes(workdir: str, size: int, dim: int):
+    from chromadb import PersistentClient
+
+    from retrievers import write_numpy_index
+
+    ids, embeddings, metadatas, documents = synthetic_corpus(size, dim)
+    client = PersistentClient(path=os.path.join(workdir, "chroma"))
+    collection = client.create_collection(COLLECTION, metadata={"hnsw:space": "cosine"})
+    step = client.get_max_batch_size()
+    for i in range(0, size, step):
+        collection.add(ids=ids[i:i + step], embeddings=embeddings[i:i + step].tolist(),
+                       metadatas=metadatas[i:i + step], documents=documents[i:i + step])
+    write_numpy_index(os.path.join(workdir, "numpy"), ids, embeddings, metadatas, documents, {"size": size})
+    return embeddings
+
+
+def measure(backend: str, workdir: str, queries_path: str, k: int, batch: int) -> dict:
+    """Runs in a fresh process, so the RSS numbers belong to this backend only."""
+    import chromadb  # noqa: F401  (both backends pay the same imports before the baseline)
+
+    from retrievers import ChromaRetriever, NumpyRetriever
+
+    queries = np.load(queries_path)
+    baseline = rss_mb()
+
+    start = time.perf_counter()
+    if backend == "chroma":
+        client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"))
+        retriever = ChromaRetriever(client.get_collection(COLLECTION))
+    else:
+        retriever = NumpyRetriever(os.path.join(workdir, "numpy"))
+    retriever.search_one(queries[0], k)
+    open_ms = (time.perf_counter() - start) * 1000
+
+    latencies, top_ids = [], []
+    for query in queries:
+        t = time.perf_counter()
+        hits = retriever.search_one(query, k)
+        latencies.append((time.perf_counter() - t) * 1000)
+        top_ids.append([hit.id for hit in hits])
+
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        retriever.search(queries[i:i + batch], k)
+    batched_s = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "backend": backend,
+        "open_ms": round(open_ms, 1),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))], 3),
+        "batched_qps": round(len(queries) / batched_s, 1),
+        "rss_mb": round(rss_mb() - baseline, 1),
+        "top_ids": top_ids,
+    }
+
+
+def run_measure(backend: str, workdir: str, queries_path: str, args) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.retrievers", "--measure", backend, "--workdir", workdir,
+         "--queries-file", queries_path, "--k", str(args.k), "--batch", str(args.batch)],
+        capture_output=True, text=True,
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith("RESULT ")]
+    if result.returncode or not lines:
+        raise SystemExit(f"{backend} measurement failed:\n{result.stderr[-3000:]}")
+    return json.loads(lines[-1][len("RESULT "):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[24, 1000, 10000])
+    parser.add_argument("--dim", type=int, default=384, help="paraphrase-multilingual-MiniLM-L12-v2 is 384")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--measure", choices=["chroma", "numpy"], help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--queries-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print("RESULT " + json.dumps(measure(args.measure, args.workdir, args.queries_file, args.k, args.batch)))
+        return
+
+    rows = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="chat-retrievers-") as workdir:
+            build_start = time.perf_counter()
+            embeddings = build_indexes(workdir, size, args.dim)
+            print(f"size {size}: indexes built in {time.perf_counter() - build_start:.1f}s", file=sys.stderr)
+            queries_path = os.path.join(workdir, "queries.npy")
+            np.save(queries_path, queries_for(embeddings, args.queries))
+
+            results = {backend: run_measure(backend, workdir, queries_path, args) for backend in ("chroma", "numpy")}
+            exact = results["numpy"]["top_ids"]
+            recall = statistics.mean(
+                len(set(approx) & set(truth)) / len(truth) for approx, truth in zip(results["chroma"]["top_ids"], exact)
+            )
+            for backend, result in results.items():
+                result.pop("top_ids")
+                rows.append({"size": size, **result, "recall": round(recall if backend == "chroma" else 1.0, 4)})
+
+    print(f"\n{'size':>8} {'backend':<8}{'open ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'batch q/s':>12}"
+          f"{'RSS MB':>9}{f'recall@{args.k}':>11}")
+    for row in rows:
+        print(f"{row['size']:>8} {row['backend']:<8}{row['open_ms']:>10}{row['p50_ms']:>10}{row['p99_ms']:>10}"
+              f"{row['batched_qps']:>12}{row['rss_mb']:>9}{row['recall']:>11}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
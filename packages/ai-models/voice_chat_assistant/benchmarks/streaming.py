@@ -0,0 +1,121 @@
+"""
+Time to first byte against total latency: /chat_swaraj (JSON, whole answer at once)
+against /chat_swaraj/stream (Server-Sent Events, token by token).
+
+Starts benchmarks.stub_groq with --llm-latency-ms to the first token and --token-ms per
+further word, and the backend under uvicorn (semantic cache off, so every request
+reaches the LLM). For each endpoint and request it measures on the client:
+  - ttfb_ms   : request sent -> first answer text (JSON: first body byte, SSE: first token event)
+  - total_ms  : request sent -> response complete
+and prints the server-side view from /stats (llm_usage) at the end.
+
+Run from the voice_chat_assistant directory:
+
+    python -m benchmarks.streaming --requests 20 --llm-latency-ms 300 --token-ms 25
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.stub_groq import StubGroqServer
+
+QUERIES = [
+    "How can I reset my password?",
+    "How do I file a complaint?",
+    "OTP not received on my phone",
+    "What documents are needed for registration?",
+]
+
+
+def wait_ready(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit("backend did not become ready")
+
+
+def timed_request(client: httpx.Client, url: str, query: str, streaming: bool) -> dict:
+    start = time.perf_counter()
+    ttfb = None
+    with client.stream("POST", url, json={"user_query": query, "language": "english"}) as response:
+        response.raise_for_status()
+        if streaming:
+            for line in response.iter_lines():
+                if ttfb is None and line.startswith("data:") and '"token"' in line:
+                    ttfb = time.perf_counter() - start
+        else:
+            for chunk in response.iter_bytes():
+                if ttfb is None and chunk:
+                    ttfb = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return {"ttfb_ms": (ttfb or total) * 1000, "total_ms": total * 1000}
+
+
+def percentiles(values: list[float]) -> dict:
+    values = sorted(values)
+    return {"p50": round(statistics.median(values), 1),
+            "p95": round(values[min(len(values) - 1, int(0.95 * len(values)))], 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20, help="per endpoint")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=25.0)
+    parser.add_argument("--port", type=int, default=8097)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    stub = StubGroqServer(latency_ms=args.llm_latency_ms, token_ms=args.token_ms).start()
+    env = dict(os.environ, GROQ_BASE_URL=stub.base_url, ANSWER_CACHE_SIZE="0",
+               GROQ_API_KEY=os.environ.get("GROQ_API_KEY", "unused-by-stub"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    rows = []
+    try:
+        wait_ready(base_url, args.timeout)
+        with httpx.Client(timeout=60) as client:
+            for endpoint, streaming in (("/chat_swaraj", False), ("/chat_swaraj/stream", True)):
+                samples = [timed_request(client, base_url + endpoint, QUERIES[i % len(QUERIES)], streaming)
+                           for i in range(args.requests)]
+                rows.append({
+                    "endpoint": endpoint,
+                    "ttfb_ms": percentiles([s["ttfb_ms"] for s in samples]),
+                    "total_ms": percentiles([s["total_ms"] for s in samples]),
+                })
+            server_stats = client.get(f"{base_url}/stats").json()["llm_usage"]
+    finally:
+        server.terminate()
+        server.wait()
+        stub.shutdown()
+
+    print(f"\nstub LLM: {args.llm_latency_ms:g} ms to first token, {args.token_ms:g} ms per word")
+    print(f"{'endpoint':<22}{'TTFB p50':>10}{'TTFB p95':>10}{'total p50':>11}{'total p95':>11}")
+    for row in rows:
+        print(f"{row['endpoint']:<22}{row['ttfb_ms']['p50']:>10}{row['ttfb_ms']['p95']:>10}"
+              f"{row['total_ms']['p50']:>11}{row['total_ms']['p95']:>11}")
+    print("server side (/stats llm_usage):",
+          {key: server_stats[key] for key in ("first_token_ms", "ttfb_ms", "latency_ms", "total_ms") if key in server_stats})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"client": rows, "server": server_stats}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Local stand-in for the Groq chat-completions API, so benchmarks exercise the whole
+chat pipeline without network calls, API keys or rate limits. Every request sleeps
+--latency-ms (time to first token), then --token-ms per word of one fixed reply; with
+"stream": true the words are sent as chat.completion.chunk events as they are
+"generated", usage in the last one (x_groq.usage, as Groq does).
+
+Point the backend at it with GROQ_BASE_URL=http://127.0.0.1:<port> (read by the Groq SDK).
+
+    python -m benchmarks.stub_groq --port 8089 --latency-ms 400 --token-ms 20
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = "You can reset your password from the login page using the 'Forgot password' link."
+
+
+class StubGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency_ms: float = 0.0, token_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.token_ms = token_ms
+        self.requests = 0
+        super().__init__(("127.0.0.1", port), _Handler)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "StubGroqServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        self.server.requests += 1
+        time.sleep(self.server.latency_ms / 1000)
+
+        # rough token estimate (~4 chars per token), enough for relative comparisons
+        prompt_chars = sum(len(str(message.get("content", ""))) for message in body.get("messages", []))
+        prompt_tokens, completion_tokens = prompt_chars // 4, len(ANSWER) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        words = ANSWER.split(" ")
+        chunk = {"id": "chatcmpl-stub", "created": int(time.time()), "model": body.get("model", "stub")}
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.end_headers()
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(self.server.token_ms / 1000)
+                delta = {"role": "assistant", "content": word} if i == 0 else {"content": " " + word}
+                self._event({**chunk, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            self._event({**chunk, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                         "x_groq": {"id": "stub", "usage": usage}})
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+
+        time.sleep(self.server.token_ms * (len(words) - 1) / 1000)
+        payload = json.dumps({
+            **chunk,
+            "object": "chat.completion",
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": ANSWER},
+            }],
+            "usage": usage,
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _event(self, data: dict):
+        self.wfile.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="time to first token")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="time per further word of the reply")
+    args = parser.parse_args()
+
+    server = StubGroqServer(args.port, args.latency_ms, args.token_ms)
+    print(f"stub Groq API on {server.base_url} ({args.latency_ms:g} ms to first token, {args.token_ms:g} ms per word)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Prebuilt deployment bundle for cold-start sensitive targets (AWS Lambda via Mangum).
+
+build_bundle() writes, once at image build time:
+  embedding_model/   the sentence-transformer saved locally (no Hub download at runtime)
+  onnx_model/        with EMBEDDING_BACKEND=onnx: its int8 ONNX export, which then
+                     embeds the index and the queries (embedding_model/ is dropped)
+  chroma_store/      the Chroma index, fully embedded from the corpus
+  numpy_index/       the same vectors for the numpy retriever (memory-mapped in place)
+  manifest.json      model id (model + backend), corpus hash and record count
+
+At runtime (BUNDLE_DIR set) nothing is embedded or downloaded: the model is loaded from
+the bundle, and the index is copied once per container to BUNDLE_SCRATCH_DIR, because
+the Lambda package is read-only and Chroma opens its SQLite file for writing. Later
+invocations in the same (warm) container reuse the copy. With RETRIEVER_BACKEND=numpy
+the matrix is memory-mapped straight from the bundle and Chroma is not touched at all.
+
+    python bundle.py --out bundle
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+from config import settings
+
+MANIFEST = "manifest.json"
+MODEL_DIR = "embedding_model"
+ONNX_DIR = "onnx_model"
+CHROMA_DIR = "chroma_store"
+NUMPY_DIR = "numpy_index"
+
+
+def read_manifest(bundle_dir: str) -> dict:
+    with open(os.path.join(bundle_dir, MANIFEST), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_bundle(out_dir: str, model_name: str | None = None, corpus_path: str | None = None,
+                 backend: str | None = None) -> dict:
+    import chromadb
+    from chromadb import PersistentClient
+    from sentence_transformers import SentenceTransformer
+
+    from embedding_backends import export_onnx, load_embedding_model, model_id
+    from ingest import sync_collection
+    from retrievers import export_collection
+
+    model_name = model_name or settings.EMBEDDING_MODEL
+    backend = backend or settings.EMBEDDING_BACKEND
+    model_dir = os.path.join(out_dir, MODEL_DIR)
+    onnx_dir = os.path.join(out_dir, ONNX_DIR)
+    chroma_dir = os.path.join(out_dir, CHROMA_DIR)
+    numpy_dir = os.path.join(out_dir, NUMPY_DIR)
+    for path in (model_dir, onnx_dir, chroma_dir, numpy_dir):
+        shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    SentenceTransformer(model_name, device="cpu").save(model_dir)
+    if backend == "onnx":
+        export_onnx(model_dir, onnx_dir)
+
+    # Index with the saved copy, so the vectors come from exactly what is shipped
+    embedding_model = load_embedding_model(model_dir, onnx_dir, backend=backend)
+    client = PersistentClient(path=chroma_dir)
+    collection, stats = sync_collection(client, embedding_model, corpus_path=corpus_path,
+                                        model_name=model_id(backend, model_name), rebuild=True)
+    export_collection(collection, numpy_dir)
+    if backend == "onnx":
+        # only needed for the export; keeps the PyTorch weights out of the image
+        shutil.rmtree(model_dir)
+
+    manifest = {
+        "embedding_model": model_id(backend, model_name),
+        "embedding_backend": backend,
+        "collection": collection.name,
+        "corpus_hash": collection.metadata["corpus_hash"],
+        "records": collection.count(),
+        "chromadb": chromadb.__version__,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "build_seconds": round(time.perf_counter() - start, 1),
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def prepare_bundle(bundle_dir: str, scratch_dir: str | None = None, copy_chroma: bool = True) -> dict:
+    """
+    Make the bundle usable in this container. Returns the embedding model path, a writable
+    Chroma path (copied only if copy_chroma), the NumPy index path and the manifest.
+    """
+    scratch_dir = scratch_dir or settings.BUNDLE_SCRATCH_DIR
+    manifest = read_manifest(bundle_dir)
+    chroma_path = os.path.join(scratch_dir, CHROMA_DIR)
+
+    copied = None
+    try:
+        copied = read_manifest(chroma_path)
+    except (OSError, ValueError):
+        pass
+    if copy_chroma and copied != manifest:
+        shutil.rmtree(chroma_path, ignore_errors=True)
+        shutil.copytree(os.path.join(bundle_dir, CHROMA_DIR), chroma_path)
+        # written last: a copy interrupted half-way is redone by the next cold start
+        with open(os.path.join(chroma_path, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+    return {
+        "embedding_model": os.path.join(bundle_dir, MODEL_DIR),
+        "onnx_model": os.path.join(bundle_dir, ONNX_DIR),
+        "chroma_path": chroma_path,
+        "numpy_index": os.path.join(bundle_dir, NUMPY_DIR),
+        "manifest": manifest,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="bundle", help="output directory")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL, help="HF model id or local directory")
+    parser.add_argument("--corpus", default=settings.CORPUS_PATH)
+    parser.add_argument("--backend", choices=["torch", "onnx"], default=settings.EMBEDDING_BACKEND)
+    args = parser.parse_args()
+
+    manifest = build_bundle(args.out, model_name=args.model, corpus_path=args.corpus, backend=args.backend)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
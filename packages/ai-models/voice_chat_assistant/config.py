@@ -0,0 +1,97 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ON_LAMBDA = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+
+
+def _flag(name: str, default: bool) -> bool:
+    return os.getenv(name, "true" if default else "false").lower() in ("1", "true", "yes")
+
+
+class Settings:
+    # Knowledge base (JSON list of {title, content, tags}) and the persistent Chroma store
+    CORPUS_PATH: str = os.getenv("CORPUS_PATH", "SwarajDesk_vectorDB.json")
+    CHROMA_PATH: str = os.getenv("CHROMA_PATH", "./chroma_store")
+    COLLECTION_NAME: str = os.getenv("COLLECTION_NAME", "swarajdesk_chroma_db")
+    # Hot reload (corpus_reload.py): seconds between checks of CORPUS_PATH for changes
+    # (0 = off), and the token for POST /admin/reload (empty = endpoint disabled)
+    CORPUS_WATCH_INTERVAL: float = float(os.getenv("CORPUS_WATCH_INTERVAL", "0" if ON_LAMBDA else "5"))
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+
+    # Sentence-transformers model (HF id or local directory) and records per embedding call
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+    # How the model runs (embedding_backends.py): torch (sentence-transformers) | onnx
+    # (int8-quantized export in ONNX_MODEL_DIR, run by onnxruntime)
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch").strip().lower()
+    ONNX_MODEL_DIR: str = os.getenv("ONNX_MODEL_DIR", "./onnx_model")
+    # Query embedding (embedding_service.py): ms to gather concurrent queries into one batch
+    # (0 = only those already waiting), max batch, LRU of recent query embeddings, and the
+    # URL of a shared embedding service (empty = embed in this process)
+    EMBED_BATCH_WAIT_MS: float = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+    EMBED_MAX_BATCH: int = int(os.getenv("EMBED_MAX_BATCH", "32"))
+    EMBED_CACHE_SIZE: int = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+    EMBEDDING_SERVICE_URL: str = os.getenv("EMBEDDING_SERVICE_URL", "")
+
+    # Similarity search backend: chroma (HNSW collection) | numpy (exact search over a
+    # memory-mapped copy of the collection's vectors, written to NUMPY_INDEX_DIR)
+    RETRIEVER_BACKEND: str = os.getenv("RETRIEVER_BACKEND", "chroma").strip().lower()
+    NUMPY_INDEX_DIR: str = os.getenv("NUMPY_INDEX_DIR", "./numpy_index")
+
+    # Records passed to the LLM as context
+    RETRIEVAL_TOP_K: int = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+    # Hybrid retrieval (hybrid.py): BM25 fused with the dense scores, weight of the dense
+    # side, dense candidates per query, and tag words in the query as a prefilter
+    RETRIEVER_HYBRID: bool = _flag("RETRIEVER_HYBRID", False)
+    HYBRID_ALPHA: float = float(os.getenv("HYBRID_ALPHA", "0.6"))
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "50"))
+    HYBRID_TAG_FILTER: bool = _flag("HYBRID_TAG_FILTER", False)
+    # Context packing (context_packer.py): max tokens of retrieved context in the prompt
+    # (0 = every retrieved record in full) and the min retrieval score for a record to be
+    # included (the best one always is)
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+    CONTEXT_MIN_SCORE: float = float(os.getenv("CONTEXT_MIN_SCORE", "0.25"))
+
+    # Groq chat model used for answers
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "openai/gpt-oss-120b")
+    # Groq client (one per process): pooled connections, per-request timeout (s), retries
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "60"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    # Threads for query embedding + retrieval, off the event loop (bounds concurrent CPU work)
+    RAG_WORKERS: int = int(os.getenv("RAG_WORKERS", "2"))
+    # Recent LLM calls kept for the token / latency percentiles in /stats
+    LLM_STATS_WINDOW: int = int(os.getenv("LLM_STATS_WINDOW", "1000"))
+
+    # Semantic answer cache: max entries (0 = off), seconds an answer is reused, and the
+    # min cosine similarity between two queries (same language) to share an answer
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+    ANSWER_CACHE_TTL: float = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    ANSWER_CACHE_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    # Precomputed FAQ answers (faq.py): canonical questions, the generated table, the min
+    # cosine similarity between a query and a question to answer from the table, and
+    # whether the server regenerates a table built from another corpus (in the background;
+    # off = only `python faq.py` writes it)
+    FAQ_QUESTIONS_PATH: str = os.getenv("FAQ_QUESTIONS_PATH", "faq_questions.json")
+    FAQ_TABLE_DIR: str = os.getenv("FAQ_TABLE_DIR", "./faq_table")
+    FAQ_MATCH_THRESHOLD: float = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.9"))
+    FAQ_REBUILD: bool = _flag("FAQ_REBUILD", False)
+
+    # Build the RAG resources in the background: the server accepts connections at once
+    # and /ready returns 503 until they are warm (default: startup waits for them)
+    WARMUP_IN_BACKGROUND: bool = _flag("WARMUP_IN_BACKGROUND", False)
+    # Build them on the first request that needs them (or /ready) instead of at startup
+    LAZY_INIT: bool = _flag("LAZY_INIT", ON_LAMBDA)
+
+    # Prebuilt artifacts from bundle.py (embedding model + embedded Chroma index; "" = off)
+    # and the writable directory the index is copied to (on Lambda only /tmp is writable)
+    BUNDLE_DIR: str = os.getenv("BUNDLE_DIR", "")
+    BUNDLE_SCRATCH_DIR: str = os.getenv("BUNDLE_SCRATCH_DIR", "/tmp")
+
+    # Uploaded and generated audio, served under /static
+    STATIC_DIR: str = os.getenv("STATIC_DIR", "/tmp/static" if ON_LAMBDA else "static")
+
+
+settings = Settings()
@@ -0,0 +1,123 @@
+"""
+Token-budgeted context for the LLM prompt.
+
+Instead of pasting every retrieved chunk in full, pack_context:
+  1. drops hits scoring below CONTEXT_MIN_SCORE (the best hit is always kept, so the
+     model can still say the information is missing in the right terms)
+  2. drops sentences that repeat one already packed (mostly the same words, any chunk)
+  3. adds chunks best-first while they fit in CONTEXT_TOKEN_BUDGET; a chunk that fits
+     and lost no sentence is passed through unchanged, one that does not fit is trimmed
+     to its sentences sharing the most words with the query. A chunk with no sentence
+     that fits is skipped, except the first one, which is cut at the budget
+  4. stops at the budget
+
+Sentences end at . ! ? or ।; the corpus's "a → b → c" step lists and UI paths stay
+inside their sentence.
+
+The result is formatted by build_context_text, so the prompt layout is unchanged.
+"""
+import re
+
+from hybrid import tokenize
+from tokens import count_tokens
+
+SENTENCE_RE = re.compile(r"(?<=[.!?।])\s+")
+SEPARATOR = "\n\n---\n\n"
+DUPLICATE_OVERLAP = 0.8
+
+
+def split_sentences(text: str) -> list[str]:
+    return [sentence.strip() for sentence in SENTENCE_RE.split(text) if sentence and sentence.strip()]
+
+
+def _overlap(a: set[str], b: set[str]) -> float:
+    """Jaccard: a short sentence inside a longer one is not a repeat of it."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Longest prefix of whole words within max_tokens."""
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+
+def pack_context(hits, query: str, budget_tokens: int, min_score: float = 0.0) -> tuple[list[dict], dict]:
+    """
+    Returns (metadatas to format with build_context_text, stats). Each metadata is a copy
+    of the hit's with "content" possibly trimmed.
+    """
+    kept_hits = [hit for i, hit in enumerate(hits) if i == 0 or hit.score >= min_score]
+    query_words = set(tokenize(query))
+
+    packed, seen_sentences = [], []
+    used = 0
+    trimmed = duplicates = 0
+    for hit in kept_hits:
+        metadata = hit.metadata or {}
+        content = metadata.get("content") or hit.document or ""
+
+        sentences, removed = [], 0
+        for sentence in split_sentences(content):
+            words = set(tokenize(sentence))
+            if any(_overlap(words, seen) >= DUPLICATE_OVERLAP for seen in seen_sentences):
+                removed += 1
+                continue
+            sentences.append((sentence, words))
+        duplicates += removed
+        if not sentences:
+            continue
+
+        header = f"[{len(packed) + 1}] {metadata.get('title', f'Chunk {len(packed) + 1}')}\n"
+        overhead = count_tokens(header) + (count_tokens(SEPARATOR) if packed else 0)
+        remaining = budget_tokens - used - overhead
+        # untouched chunks keep their own line breaks and spacing
+        full_text = content.strip() if not removed else " ".join(sentence for sentence, _ in sentences)
+        cost = count_tokens(full_text)
+
+        if cost > remaining:
+            # most query words first, original order among equals; then restore reading order
+            ranked = sorted(range(len(sentences)), key=lambda i: -len(sentences[i][1] & query_words))
+            chosen, cost = [], 0
+            for i in ranked:
+                sentence_cost = count_tokens(sentences[i][0]) + 1
+                if cost + sentence_cost <= remaining:
+                    chosen.append(i)
+                    cost += sentence_cost
+            if chosen:
+                sentences = [sentences[i] for i in sorted(chosen)]
+                full_text = " ".join(sentence for sentence, _ in sentences)
+            elif packed:
+                continue            # a later, shorter chunk may still fit
+            else:
+                # the best chunk is never dropped: its start, cut at the budget
+                full_text = _truncate(full_text, remaining)
+                if not full_text:
+                    break
+                cost = count_tokens(full_text)
+                sentences = [(full_text, set(tokenize(full_text)))]
+            trimmed += 1
+
+        seen_sentences.extend(words for _, words in sentences)
+        packed.append(dict(metadata, content=full_text))
+        used += overhead + cost
+        if used >= budget_tokens:
+            break
+
+    stats = {
+        "retrieved": len(hits),
+        "below_cutoff": len(hits) - len(kept_hits),
+        "packed": len(packed),
+        "trimmed": trimmed,
+        "duplicate_sentences": duplicates,
+        "context_tokens": used,
+    }
+    return packed, stats
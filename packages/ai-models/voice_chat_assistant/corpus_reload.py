@@ -0,0 +1,144 @@
+"""
+Hot reload of the knowledge base: a changed CORPUS_PATH is picked up without a restart.
+
+reload_corpus() runs in a background thread while the live index keeps answering:
+  1. ingest.stage_collection() builds the new corpus into a staging collection, copying
+     the vectors of unchanged records from the live one and embedding only the rest
+  2. the retriever over it (NumPy export, BM25 index) is built and queried once, so the
+     first user query does not pay for loading it. The NumPy index is written to a new
+     directory and renamed into place
+  3. swap: resources.collection / retriever / corpus_hash are replaced. A query uses
+     whichever retriever it picked up, old or new, and both are complete
+  4. the answer cache is invalidated (answer_cache.set_corpus); answers still being
+     generated from the old corpus are not stored when they finish
+  5. ingest.promote_collection() points COLLECTION_NAME at the staging collection, so a
+     restart loads it without embedding
+  6. the FAQ answer table is regenerated in the background (faq.refresh_faq_table); until
+     then those questions are answered live
+
+Each worker process runs its own watcher over the same CHROMA_PATH: steps 1-5 hold a
+lock file there (.reload.lock), so workers reload one at a time. A worker that finds the
+active collection already built from the new corpus (by another worker) serves that one
+and skips steps 1 and 5.
+
+Triggers: CorpusWatcher polls CORPUS_PATH every CORPUS_WATCH_INTERVAL seconds and
+reloads once its mtime and size have been stable for one interval, and POST
+/admin/reload (ADMIN_TOKEN) reloads on demand. A corpus whose hash did not change is
+not rebuilt. With BUNDLE_DIR the index is prebuilt and read-only: rebuild the bundle.
+"""
+import os
+import threading
+import time
+
+from app import build_search_index, resources
+from config import settings
+from faq import refresh_faq_table
+from file_lock import file_lock
+from semantic_cache import answer_cache
+
+RELOAD_LOCK_FILE = ".reload.lock"
+
+# one reload at a time in this process; RELOAD_LOCK_FILE serializes the processes
+_reload_lock = threading.Lock()
+
+
+def reload_corpus(force: bool = False, wait: bool = False) -> dict:
+    """
+    Rebuild the index from CORPUS_PATH and swap it in. force rebuilds an unchanged corpus;
+    wait blocks while another reload runs (otherwise that raises RuntimeError).
+    """
+    if settings.BUNDLE_DIR:
+        raise RuntimeError("BUNDLE_DIR is set: the prebuilt index is read-only, rebuild the bundle instead")
+    if not resources.ready.is_set():
+        raise RuntimeError("The RAG resources are not ready yet")
+    if not _reload_lock.acquire(blocking=wait):
+        raise RuntimeError("A reload is already running")
+    try:
+        return _reload(force)
+    finally:
+        _reload_lock.release()
+
+
+def _reload(force: bool) -> dict:
+    from embedding_backends import model_id
+    from ingest import (active_collection_name, corpus_hash, hold_collection, load_records, promote_collection,
+                        stage_collection)
+
+    start = time.perf_counter()
+    records, hashes = load_records(settings.CORPUS_PATH)
+    new_hash = corpus_hash(hashes)
+    if new_hash == resources.corpus_hash and not force:
+        return {"reloaded": False, "records": len(records), "corpus_hash": new_hash}
+
+    client = resources.client
+    with file_lock(os.path.join(settings.CHROMA_PATH, RELOAD_LOCK_FILE)):
+        active = client.get_collection(active_collection_name(client, settings.COLLECTION_NAME))
+        metadata = active.metadata or {}
+        if not force and (metadata.get("corpus_hash"), metadata.get("embedding_model")) == (new_hash, model_id()):
+            # another worker already built and promoted this corpus
+            collection, stats = active, {"records": active.count(), "reused": active.name}
+        else:
+            collection, stats = stage_collection(client, resources.embedding_model, resources.collection)
+        retriever = build_search_index(collection, settings.NUMPY_INDEX_DIR)
+        retriever.search_one(resources.query_embedder.embed("warmup"), 1, query_text="warmup")
+
+        resources.collection = collection
+        resources.retriever = retriever
+        resources.corpus_hash = new_hash
+        resources.ingest_stats = stats
+        answer_cache.set_corpus(new_hash)
+        hold_collection(client, settings.COLLECTION_NAME, collection)
+        if collection is not active:
+            promote_collection(client, collection, settings.COLLECTION_NAME)
+    refresh_faq_table()
+
+    result = {"reloaded": True, **stats, "corpus_hash": new_hash,
+              "seconds": round(time.perf_counter() - start, 3)}
+    resources.last_reload = {**result, "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+    print(f"Corpus reloaded: {result}")
+    return result
+
+
+class CorpusWatcher:
+    """Polls the corpus file and reloads it when it changes (one daemon thread)."""
+
+    def __init__(self, path: str, interval: float):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "CorpusWatcher":
+        self._thread = threading.Thread(target=self._run, name="corpus-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _signature(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _run(self):
+        # taken before the resources are built: a change made while they load is not missed
+        loaded, pending = self._signature(), None
+        while not self._stop.wait(self.interval):
+            current = self._signature()
+            if current is None or current == loaded or not resources.ready.is_set():
+                pending = None
+                continue
+            if current != pending:
+                # may still be being written: reload once it has not changed for one interval
+                pending = current
+                continue
+            try:
+                reload_corpus(wait=True)
+            except Exception as e:
+                print(f"Corpus reload failed, still serving the previous index: {type(e).__name__}: {e}")
+            loaded, pending = current, None
@@ -0,0 +1,270 @@
+"""
+Embedding backends for EMBEDDING_MODEL (EMBEDDING_BACKEND).
+
+  torch   sentence-transformers through HuggingFaceEmbeddings (PyTorch)
+  onnx    the same model exported to ONNX with int8 dynamic quantization, run by
+          onnxruntime with the model's own fast tokenizer and pooling. No torch import,
+          a quarter of the weights, faster on CPU.
+
+Vectors from the two backends are close but not identical, so the index records which
+one built it (model_id(), stored as the collection's "embedding_model"): switching the
+backend makes ingest.py rebuild the collection, and the NumPy index follows. An fp32
+export (--no-quantize) is "#onnx-fp32", the int8 one "#onnx-int8".
+
+    python embedding_backends.py export --out onnx_model      # needs torch, once
+    python embedding_backends.py parity --onnx-dir onnx_model  # cosine vs PyTorch over the corpus
+
+The parity check embeds every corpus record and the labeled retrieval queries with both
+backends, reports the cosine similarity of each pair and how often the ONNX top-k matches
+the PyTorch top-k, and fails when the lowest cosine is below --min-cosine.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from config import settings
+
+INFO_FILE = "onnx_info.json"
+MODEL_FILE = "model.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+# onnx_info.json of the export load_embedding_model() loaded in this process
+_loaded_onnx_info: dict | None = None
+
+
+def _read_onnx_info(onnx_dir: str) -> dict | None:
+    try:
+        with open(os.path.join(onnx_dir, INFO_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def model_id(backend: str | None = None, model_name: str | None = None, onnx_dir: str | None = None) -> str:
+    """
+    Identity of the vectors: the model, plus the runtime when it is not the reference one.
+    The onnx suffix follows the export: the one in onnx_dir if given, else the one loaded
+    in this process, else the one in ONNX_MODEL_DIR (int8 when there is none yet, as
+    load_embedding_model would export it).
+    """
+    backend = backend or settings.EMBEDDING_BACKEND
+    model_name = model_name or settings.EMBEDDING_MODEL
+    if backend == "torch":
+        return model_name
+    info = _read_onnx_info(onnx_dir) if onnx_dir else _loaded_onnx_info or _read_onnx_info(settings.ONNX_MODEL_DIR)
+    return f"{model_name}#onnx-{'int8' if (info or {}).get('quantized', True) else 'fp32'}"
+
+
+class OnnxEmbeddings:
+    """embed_documents / embed_query like HuggingFaceEmbeddings, from an export_onnx() directory."""
+
+    def __init__(self, model_dir: str, batch_size: int = 32):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, INFO_FILE), "r", encoding="utf-8") as f:
+            self.info = json.load(f)
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(self.info["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.info["pad_token_id"], pad_token=self.info["pad_token"])
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(os.path.join(model_dir, MODEL_FILE), options,
+                                                    providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask, "token_type_ids": np.zeros_like(ids)}
+        hidden = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+
+        if self.info["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            weights = mask[..., None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        if self.info["normalize"]:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        return np.concatenate([self._embed_batch(texts[i:i + self.batch_size])
+                               for i in range(0, len(texts), self.batch_size)]).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def export_onnx(model_name: str, out_dir: str, quantize: bool = True) -> dict:
+    """Export the sentence-transformer's encoder to ONNX (int8 weights unless quantize=False)."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st = SentenceTransformer(model_name, device="cpu")
+    encoder = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+    modules = [type(module).__name__ for module in st]
+    pooling = st[1].get_config_dict().get("pooling_mode", "mean") if len(st) > 1 else "mean"
+    if pooling not in ("mean", "cls"):
+        raise ValueError(f"Unsupported pooling {pooling!r} (mean or cls)")
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids=None):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    os.makedirs(out_dir, exist_ok=True)
+    sample = tokenizer(["export sample", "a second, longer export sample"], padding=True, return_tensors="pt")
+    names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    axes = {"batch": 0, "tokens": 1}
+    fp32_path = os.path.join(out_dir, "model_fp32.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(encoder), tuple(sample[name] for name in names), fp32_path,
+            input_names=names, output_names=["last_hidden_state"],
+            dynamic_axes={name: {v: k for k, v in axes.items()} for name in names + ["last_hidden_state"]},
+            opset_version=17, dynamo=False,
+        )
+
+    model_path = os.path.join(out_dir, MODEL_FILE)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, model_path, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+    else:
+        os.replace(fp32_path, model_path)
+
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, TOKENIZER_FILE))
+    info = {
+        "source_model": model_name,
+        "quantized": quantize,
+        "pooling": pooling,
+        "normalize": "Normalize" in modules,
+        "max_seq_length": st.max_seq_length,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+        "model_mb": round(os.path.getsize(model_path) / 2 ** 20, 1),
+    }
+    # written last: a directory without it is an unfinished export
+    with open(os.path.join(out_dir, INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+def load_embedding_model(model_path: str | None = None, onnx_dir: str | None = None, backend: str | None = None):
+    """
+    The configured backend. torch loads model_path (default EMBEDDING_MODEL); onnx loads
+    onnx_dir (default ONNX_MODEL_DIR), exporting the model there first if it is missing or
+    was exported from another model.
+    """
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == "torch":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=model_path or settings.EMBEDDING_MODEL)
+    if backend == "onnx":
+        global _loaded_onnx_info
+        onnx_dir = onnx_dir or settings.ONNX_MODEL_DIR
+        source = model_path or settings.EMBEDDING_MODEL
+        exported_from = (_read_onnx_info(onnx_dir) or {}).get("source_model")
+        # a bundle's export is checked through its manifest; elsewhere it must match EMBEDDING_MODEL
+        if exported_from is None or (source == settings.EMBEDDING_MODEL and exported_from != source):
+            print(f"No ONNX export of {source} in {onnx_dir}, exporting it (int8)")
+            export_onnx(source, onnx_dir)
+        model = OnnxEmbeddings(onnx_dir)
+        _loaded_onnx_info = model.info
+        return model
+    raise ValueError(f"Unknown EMBEDDING_BACKEND={backend!r} (expected torch or onnx)")
+
+
+def parity(onnx_dir: str, model_name: str, k: int, min_cosine: float, queries_path: str) -> dict:
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    from ingest import load_corpus
+
+    records = load_corpus(settings.CORPUS_PATH)
+    documents = [record["content"] for record in records]
+    with open(queries_path, "r", encoding="utf-8") as f:
+        queries = [item["query"] for item in json.load(f)]
+
+    def normalized(vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    def timed_load(load):
+        start = time.perf_counter()
+        model = load()
+        model.embed_query("warmup")
+        return model, round(time.perf_counter() - start, 2)
+
+    def query_latency_ms(model) -> float:
+        start = time.perf_counter()
+        for query in queries:
+            model.embed_query(query)
+        return round((time.perf_counter() - start) * 1000 / len(queries), 2)
+
+    torch_model, torch_load_s = timed_load(lambda: HuggingFaceEmbeddings(model_name=model_name))
+    onnx_model, onnx_load_s = timed_load(lambda: OnnxEmbeddings(onnx_dir))
+
+    torch_docs, onnx_docs = normalized(torch_model.embed_documents(documents)), normalized(onnx_model.embed_documents(documents))
+    torch_queries, onnx_queries = normalized(torch_model.embed_documents(queries)), normalized(onnx_model.embed_documents(queries))
+    cosines = np.concatenate([(torch_docs * onnx_docs).sum(axis=1), (torch_queries * onnx_queries).sum(axis=1)])
+
+    k = min(k, len(documents))
+    torch_top = np.argsort(-(torch_queries @ torch_docs.T), axis=1)[:, :k]
+    onnx_top = np.argsort(-(onnx_queries @ onnx_docs.T), axis=1)[:, :k]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(torch_top, onnx_top)]
+
+    return {
+        "texts": len(cosines),
+        "cosine_min": round(float(cosines.min()), 4),
+        "cosine_mean": round(float(cosines.mean()), 4),
+        "cosine_p5": round(float(np.percentile(cosines, 5)), 4),
+        f"top{k}_overlap": round(float(np.mean(overlap)), 4),
+        "top1_agreement": round(float(np.mean(torch_top[:, 0] == onnx_top[:, 0])), 4),
+        "load_s": {"torch": torch_load_s, "onnx": onnx_load_s},
+        "query_ms": {"torch": query_latency_ms(torch_model), "onnx": query_latency_ms(onnx_model)},
+        "passed": bool(cosines.min() >= min_cosine),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="export EMBEDDING_MODEL to ONNX")
+    export.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    export.add_argument("--out", default=settings.ONNX_MODEL_DIR)
+    export.add_argument("--no-quantize", action="store_true", help="keep float32 weights")
+    check = commands.add_parser("parity", help="compare the ONNX export with PyTorch over the corpus")
+    check.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    check.add_argument("--onnx-dir", default=settings.ONNX_MODEL_DIR)
+    check.add_argument("--k", type=int, default=5)
+    check.add_argument("--min-cosine", type=float, default=0.98)
+    check.add_argument("--queries", default="benchmarks/retrieval_queries.json")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(json.dumps(export_onnx(args.model, args.out, quantize=not args.no_quantize), indent=2))
+        return
+    report = parity(args.onnx_dir, args.model, args.k, args.min_cosine, args.queries)
+    print(json.dumps(report, indent=2))
+    if not report["passed"]:
+        raise SystemExit(f"ONNX embeddings diverge: min cosine {report['cosine_min']} < {args.min_cosine}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Query embedding shared by the chat and voice requests: micro-batching plus an LRU cache,
+in process or as a separate service shared by several uvicorn workers.
+
+QueryEmbedder wraps any LangChain-style embeddings object (embed_documents):
+  - repeated queries come from an LRU of EMBED_CACHE_SIZE recent query embeddings
+  - the others are queued; one thread takes the first, gathers whatever else arrives
+    within EMBED_BATCH_WAIT_MS (up to EMBED_MAX_BATCH) and embeds them in one call.
+    It only waits while there is concurrent traffic (the previous batch had more than one
+    query), so a lone request is not delayed. Requests that arrived while the previous
+    batch was running always join the next one.
+For sentence-transformers, embed_documents and embed_query give the same vectors, so
+batching does not change retrieval.
+
+Separate process: every uvicorn worker otherwise loads its own copy of the model and
+batches only its own requests. Run
+
+    python embedding_service.py --port 8095
+
+and set EMBEDDING_SERVICE_URL=http://127.0.0.1:8095 for the chat backend; its workers then
+embed through RemoteEmbeddings (no model loaded) and the service batches across all of them.
+"""
+import asyncio
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError
+
+from config import settings
+
+
+class QueryEmbedder:
+    def __init__(self, embeddings, max_batch: int = 32, wait_ms: float = 5.0, cache_size: int = 2048):
+        self.embeddings = embeddings
+        self.max_batch = max(1, max_batch)
+        self.wait_s = max(0.0, wait_ms) / 1000
+        self.cache_size = cache_size
+
+        self._cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._worker: threading.Thread | None = None
+        self._worker_lock = threading.Lock()
+        self._counters = dict.fromkeys(("requests", "cache_hits", "batches", "embedded"), 0)
+        self._max_batch_seen = 0
+        self._last_batch = 0
+
+    def embed(self, text: str) -> list[float]:
+        """Blocking; for worker threads."""
+        cached = self._cached(text)
+        if cached is not None:
+            return cached
+        return self._submit(text).result()
+
+    async def aembed(self, text: str) -> list[float]:
+        """Awaitable; waits for the batch without holding a thread."""
+        cached = self._cached(text)
+        if cached is not None:
+            return cached
+        return await asyncio.wrap_future(self._submit(text))
+
+    def stats(self) -> dict:
+        with self._cache_lock:
+            batches = self._counters["batches"]
+            return {
+                **self._counters,
+                "cache_entries": len(self._cache),
+                "mean_batch": round(self._counters["embedded"] / batches, 2) if batches else None,
+                "max_batch": self._max_batch_seen,
+            }
+
+    def _cached(self, text: str) -> list[float] | None:
+        with self._cache_lock:
+            self._counters["requests"] += 1
+            embedding = self._cache.get(text)
+            if embedding is not None:
+                self._cache.move_to_end(text)
+                self._counters["cache_hits"] += 1
+            return embedding
+
+    def _remember(self, texts: list[str], embeddings: list[list[float]]):
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            for text, embedding in zip(texts, embeddings):
+                self._cache[text] = embedding
+                self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _submit(self, text: str) -> Future:
+        future = Future()
+        self._queue.put((text, future))
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name="query-embedder", daemon=True)
+                    self._worker.start()
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + (self.wait_s if self._last_batch > 1 else 0.0)
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # waiters that went away (cancelled aembed, disconnected client) are not embedded
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+            self._last_batch = len(batch)
+            try:
+                self._embed_batch(batch)
+            except Exception as e:
+                for _, future in batch:
+                    self._resolve(future, exception=e)
+
+    def _embed_batch(self, batch: list[tuple[str, Future]]):
+        # the same text twice in one batch is embedded once
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        embeddings = self.embeddings.embed_documents(texts)
+        by_text = dict(zip(texts, embeddings))
+        self._remember(texts, embeddings)
+        with self._cache_lock:
+            self._counters["batches"] += 1
+            self._counters["embedded"] += len(texts)
+            self._max_batch_seen = max(self._max_batch_seen, len(texts))
+        for text, future in batch:
+            self._resolve(future, result=by_text[text])
+
+    @staticmethod
+    def _resolve(future: Future, result=None, exception: BaseException | None = None):
+        """A waiter can be cancelled at any moment; that must not stop the batching thread."""
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+
+class RemoteEmbeddings:
+    """embed_documents / embed_query over HTTP, against `python embedding_service.py`."""
+
+    def __init__(self, url: str, timeout: float = 30.0, batch_size: int = 256):
+        import httpx
+
+        self.url = url.rstrip("/")
+        self.batch_size = batch_size
+        self._client = httpx.Client(timeout=timeout, limits=httpx.Limits(max_keepalive_connections=32))
+
+    def info(self) -> dict:
+        response = self._client.get(f"{self.url}/info")
+        response.raise_for_status()
+        return response.json()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        embeddings = []
+        for i in range(0, len(texts), self.batch_size):
+            response = self._client.post(f"{self.url}/embed", json={"texts": texts[i:i + self.batch_size]})
+            response.raise_for_status()
+            embeddings.extend(response.json()["embeddings"])
+        return embeddings
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def build_query_embedder(embeddings) -> QueryEmbedder:
+    return QueryEmbedder(embeddings, max_batch=settings.EMBED_MAX_BATCH, wait_ms=settings.EMBED_BATCH_WAIT_MS,
+                         cache_size=settings.EMBED_CACHE_SIZE)
+
+
+def create_service_app(model_name: str):
+    """
+    The embedding service: one model (EMBEDDING_BACKEND), one QueryEmbedder for every
+    connected worker.
+    """
+    from contextlib import asynccontextmanager
+
+    from fastapi import FastAPI
+    from pydantic import BaseModel
+
+    class EmbedRequest(BaseModel):
+        texts: list[str]
+
+    state = {}
+
+    def load_model():
+        from embedding_backends import load_embedding_model
+
+        embedder = build_query_embedder(load_embedding_model(model_name))
+        embedder.embed("warmup")
+        state["embedder"] = embedder
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await asyncio.to_thread(load_model)
+        yield
+
+    service = FastAPI(title="Swaraj_chat embedding service", lifespan=lifespan)
+
+    @service.post("/embed")
+    async def embed(req: EmbedRequest):
+        embedder = state["embedder"]
+        # one future per text: texts from concurrent requests share batches
+        return {"embeddings": await asyncio.gather(*(embedder.aembed(text) for text in req.texts))}
+
+    @service.get("/info")
+    def info():
+        from embedding_backends import model_id
+
+        return {"embedding_model": model_id(model_name=model_name)}
+
+    @service.get("/stats")
+    def stats():
+        return state["embedder"].stats()
+
+    return service
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Shared query-embedding service for the chat workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8095)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    args = parser.parse_args()
+    uvicorn.run(create_service_app(args.model), host=args.host, port=args.port)
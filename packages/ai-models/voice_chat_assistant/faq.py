@@ -0,0 +1,279 @@
+"""
+Precomputed answers to the most frequent questions, in every output language, served
+without an LLM call.
+
+FAQ_QUESTIONS_PATH lists canonical questions, each with optional variants (other
+phrasings or languages that should get the same answer):
+
+    [{"question": "How can I reset my password?", "variants": ["forgot password", ...]}, ...]
+
+The offline job answers every question in english / hindi / hinglish / odia through the
+normal RAG pipeline and writes a compact table to FAQ_TABLE_DIR:
+  embeddings.npy   one L2-normalized float32 row per phrasing (question or variant)
+  faq.json         info (corpus hash, model id, questions hash), the questions, their
+                   answers per language, the question of each row and the checksum of
+                   embeddings.npy; both are written to temp files and renamed, faq.json last
+
+prepare_query checks the table before the semantic cache: a query within
+FAQ_MATCH_THRESHOLD (cosine) of a phrasing gets that question's answer in the requested
+language. Answers are only served for the corpus they were generated from; after a
+corpus change those questions are answered live until the table is rebuilt:
+
+    python faq.py                 # build FAQ_TABLE_DIR for the current corpus (calls Groq)
+
+The server loads the table at startup and again after a hot reload. With FAQ_REBUILD on
+it also regenerates a stale table itself, in a background thread; worker processes that
+share FAQ_TABLE_DIR take a lock file there, so one of them builds and the others load
+its result.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from io import BytesIO
+from typing import NamedTuple
+
+import numpy as np
+
+from config import settings
+from file_lock import file_lock
+
+LANGUAGES = ("english", "hindi", "hinglish", "odia")
+TABLE_FILE = "faq.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+LOCK_FILE = ".lock"
+
+
+class Table(NamedTuple):
+    info: dict
+    questions: list[str]
+    answers: list[dict[str, str]]      # per question: language -> answer
+    rows: list[int]                    # per embedding row: index of its question
+    matrix: np.ndarray
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class FAQTable:
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        # replaced as a whole, so a lookup never sees half of two tables
+        self._table: Table | None = None
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(("hits", "misses"), 0)
+
+    @property
+    def info(self) -> dict | None:
+        table = self._table
+        return table.info if table else None
+
+    def set(self, table: Table | None):
+        self._table = table
+
+    def load(self, table_dir: str, embedding_model: str) -> bool:
+        """Load a table written by write_table(), if it was built with this embedding model."""
+        try:
+            with open(os.path.join(table_dir, TABLE_FILE), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with open(os.path.join(table_dir, EMBEDDINGS_FILE), "rb") as f:
+                raw = f.read()
+        except (OSError, ValueError):
+            return False
+        # embeddings.npy replaced between the two reads: not this table's matrix
+        if hashlib.sha256(raw).hexdigest() != data.get("embeddings_sha256"):
+            return False
+        if data["info"].get("embedding_model") != embedding_model:
+            return False
+        matrix = np.load(BytesIO(raw))
+        self.set(Table(data["info"], data["questions"], data["answers"], data["rows"], matrix))
+        return True
+
+    def lookup(self, embedding, language: str, corpus_hash: str | None) -> str | None:
+        table = self._table
+        if table is None or table.info["corpus_hash"] != corpus_hash:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        scores = table.matrix @ (query / norm if norm else query)
+        best = int(np.argmax(scores))
+        answer = table.answers[table.rows[best]].get(language) if scores[best] >= self.threshold else None
+        with self._lock:
+            self._counters["hits" if answer else "misses"] += 1
+        return answer or None
+
+    def stats(self) -> dict:
+        table = self._table
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "questions": len(table.questions) if table else 0,
+                "corpus_hash": table.info["corpus_hash"] if table else None,
+                "threshold": self.threshold,
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else None,
+            }
+
+
+faq_table = FAQTable(threshold=settings.FAQ_MATCH_THRESHOLD)
+
+
+def load_questions(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def questions_hash(questions: list[dict]) -> str:
+    return hashlib.sha256(json.dumps(questions, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def build_table(questions: list[dict]) -> Table:
+    """Answer every question in every language from the current index (resources must be ready)."""
+    from app import prepare_query, resources
+    from embedding_backends import model_id
+
+    # captured first: if the corpus is reloaded meanwhile, this table is never served
+    corpus = resources.corpus_hash
+    phrasings, rows = [], []
+    for i, item in enumerate(questions):
+        for text in [item["question"], *item.get("variants", [])]:
+            phrasings.append(text)
+            rows.append(i)
+    matrix = _normalize_rows(np.asarray(resources.embedding_model.embed_documents(phrasings), dtype=np.float32))
+
+    answers = []
+    for item in questions:
+        by_language = {}
+        for language in LANGUAGES:
+            prepared = prepare_query(item["question"], language=language, use_cache=False)
+            by_language[language] = resources.llm.invoke(prepared.messages).content.strip()
+        answers.append(by_language)
+
+    info = {
+        "corpus_hash": corpus,
+        "embedding_model": model_id(),
+        "questions_hash": questions_hash(questions),
+        "llm_model": settings.LLM_MODEL,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    return Table(info, [item["question"] for item in questions], answers, rows, matrix)
+
+
+def write_table(table_dir: str, table: Table):
+    """
+    Both files go to temp names and are renamed into place, embeddings.npy first and
+    faq.json last; faq.json carries the checksum of its embeddings.npy, so a reader that
+    catches the two from different builds rejects the pair instead of mixing them.
+    """
+    os.makedirs(table_dir, exist_ok=True)
+    buffer = BytesIO()
+    np.save(buffer, table.matrix)
+    raw = buffer.getvalue()
+    data = {"info": table.info, "questions": table.questions, "answers": table.answers, "rows": table.rows,
+            "embeddings_sha256": hashlib.sha256(raw).hexdigest()}
+    for name, payload in ((EMBEDDINGS_FILE, raw), (TABLE_FILE, json.dumps(data, ensure_ascii=False).encode("utf-8"))):
+        tmp = os.path.join(table_dir, f"{name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, os.path.join(table_dir, name))
+
+
+def writer_lock(table_dir: str):
+    """One builder at a time across the processes sharing table_dir."""
+    return file_lock(os.path.join(table_dir, LOCK_FILE))
+
+
+## Regeneration in the server when the corpus changes
+
+_builder: threading.Thread | None = None
+_builder_lock = threading.Lock()
+_pending = False
+
+
+def _is_current(questions: list[dict]) -> bool:
+    from app import resources
+    from embedding_backends import model_id
+
+    info = faq_table.info or {}
+    return (info.get("corpus_hash"), info.get("embedding_model"), info.get("questions_hash")) == (
+        resources.corpus_hash, model_id(), questions_hash(questions))
+
+
+def refresh_faq_table():
+    """
+    Called at startup and after a hot reload. Without FAQ_REBUILD (default), or with
+    BUNDLE_DIR, it only reloads FAQ_TABLE_DIR, e.g. after `python faq.py` was run for the
+    new corpus. With FAQ_REBUILD it regenerates the table in the background unless it
+    matches the current corpus, model and questions.
+    """
+    global _builder, _pending
+    if not settings.FAQ_REBUILD or settings.BUNDLE_DIR or not os.path.exists(settings.FAQ_QUESTIONS_PATH):
+        from app import resources
+        from embedding_backends import model_id
+
+        if resources.ready.is_set() and (faq_table.info or {}).get("corpus_hash") != resources.corpus_hash:
+            faq_table.load(settings.FAQ_TABLE_DIR, model_id())
+        return
+    with _builder_lock:
+        _pending = True
+        if _builder is None:
+            _builder = threading.Thread(target=_rebuild, name="faq-builder", daemon=True)
+            _builder.start()
+
+
+def _rebuild():
+    global _builder, _pending
+    from app import resources
+    from embedding_backends import model_id
+
+    resources.ready.wait()
+    while True:
+        with _builder_lock:
+            if not _pending:
+                _builder = None
+                return
+            _pending = False
+        try:
+            questions = load_questions(settings.FAQ_QUESTIONS_PATH)
+            if _is_current(questions):
+                continue
+            with writer_lock(settings.FAQ_TABLE_DIR):
+                # another worker may have built it while this one waited for the lock
+                faq_table.load(settings.FAQ_TABLE_DIR, model_id())
+                if _is_current(questions):
+                    continue
+                start = time.perf_counter()
+                table = build_table(questions)
+                write_table(settings.FAQ_TABLE_DIR, table)
+            faq_table.set(table)
+            print(f"FAQ table rebuilt: {len(table.questions)} questions x {len(LANGUAGES)} languages "
+                  f"in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            print(f"FAQ table rebuild failed, answering those questions live: {type(e).__name__}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", default=settings.FAQ_QUESTIONS_PATH)
+    parser.add_argument("--out", default=settings.FAQ_TABLE_DIR)
+    args = parser.parse_args()
+
+    from app import init_resources
+
+    init_resources()
+    start = time.perf_counter()
+    with writer_lock(args.out):
+        table = build_table(load_questions(args.questions))
+        write_table(args.out, table)
+    size_kb = sum(os.path.getsize(os.path.join(args.out, name)) for name in (TABLE_FILE, EMBEDDINGS_FILE)) / 1024
+    print(f"{args.out}: {len(table.questions)} questions, {len(table.rows)} phrasings, "
+          f"{len(LANGUAGES)} languages, {size_kb:.0f} KB in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Exclusive lock on a file, shared by every process that opens the same path.
+
+Uvicorn / gunicorn workers each run their own corpus watcher and FAQ builder, but they
+share CHROMA_PATH, NUMPY_INDEX_DIR and FAQ_TABLE_DIR: whatever rewrites one of those
+holds its lock. flock is advisory and POSIX-only; without fcntl (Windows) the lock is a
+no-op, which is fine for the single-process setups run there.
+"""
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def file_lock(path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
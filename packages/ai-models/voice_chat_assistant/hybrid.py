@@ -0,0 +1,155 @@
+"""
+Hybrid retrieval: BM25 over titles, tags and content fused with the dense scores, with
+an optional tag prefilter.
+
+Dense retrieval alone handles paraphrases and other languages well, but misses exact
+terms ("OTP", "SMS", "helpline", ids). The BM25 index is built once per process from
+the records already in the dense index (no separate corpus read). The tokenizer keeps
+Devanagari and Odia words whole (their vowel signs are not \\w).
+
+    fused = HYBRID_ALPHA * cosine + (1 - HYBRID_ALPHA) * bm25 / max(bm25 for this query)
+
+Tag prefilter: explicit tags from the request restrict the candidates to records carrying
+one of them; with HYBRID_TAG_FILTER, tag words found in the query do the same. A filter
+that matches nothing is ignored rather than returning no context.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from retrievers import Hit, Retriever
+
+TOKEN_RE = re.compile("[\\w\u0900-\u097F\u0B00-\u0B7F]+")
+STOPWORDS = frozenset(
+    "a an and are can do does for from how i in is it me my of on or the to what when where which "
+    "who why with you your kaise kya hai ka ki ke".split()
+)
+# title and tags describe the record; weigh their terms above body text
+FIELD_WEIGHTS = {"title": 2.0, "tags": 2.0, "content": 1.0}
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_tags(tags) -> list[str]:
+    """Tags as stored in metadata (", " joined) or as given by a client (list)."""
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return [tag.strip().lower() for tag in tags if tag and tag.strip()]
+
+
+class BM25Index:
+    def __init__(self, metadatas: list[dict], documents: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        self.tag_docs: dict[str, set[int]] = defaultdict(set)       # full tag -> records
+        self.tag_words: dict[str, set[int]] = defaultdict(set)      # word of a tag -> records
+
+        lengths = []
+        for i, (metadata, document) in enumerate(zip(metadatas, documents)):
+            metadata = metadata or {}
+            fields = {"title": metadata.get("title", ""), "tags": metadata.get("tags", ""),
+                      "content": metadata.get("content") or document or ""}
+            weighted = Counter()
+            for field, text in fields.items():
+                for token in tokenize(text):
+                    weighted[token] += FIELD_WEIGHTS[field]
+            for token, tf in weighted.items():
+                self.postings[token].append((i, tf))
+            lengths.append(sum(weighted.values()))
+
+            for tag in split_tags(fields["tags"]):
+                self.tag_docs[tag].add(i)
+                for word in tokenize(tag.replace("-", " ")):
+                    self.tag_words[word].add(i)
+
+        self.size = len(lengths)
+        self.lengths = np.asarray(lengths, dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if self.size else 0.0
+        self.idf = {
+            token: math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in self.postings.items()
+        }
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(tokenize(query)):
+            idf = self.idf.get(token)
+            if idf is None:
+                continue
+            for i, tf in self.postings[token]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def records_with_tags(self, tags) -> set[int]:
+        matched = set()
+        for tag in split_tags(tags):
+            matched |= self.tag_docs.get(tag, set())
+        return matched
+
+    def records_with_tag_words(self, query: str) -> set[int]:
+        matched = set()
+        for token in tokenize(query):
+            matched |= self.tag_words.get(token, set())
+        return matched
+
+
+class HybridRetriever(Retriever):
+    name = "hybrid"
+
+    def __init__(self, dense: Retriever, alpha: float = 0.6, candidates: int = 50, tag_filter: bool = False):
+        self.dense = dense
+        self.alpha = alpha
+        self.candidates = candidates
+        self.tag_filter = tag_filter
+        self.ids, self.metadatas, self.documents = dense.records()
+        self.position = {rid: i for i, rid in enumerate(self.ids)}
+        self.bm25 = BM25Index(self.metadatas, self.documents)
+
+    def allowed_records(self, query_text: str | None, tags) -> set[int] | None:
+        allowed = self.bm25.records_with_tags(tags) if tags else set()
+        if not allowed and self.tag_filter and query_text:
+            allowed = self.bm25.records_with_tag_words(query_text)
+        return allowed or None
+
+    def search(self, query_embeddings, k, query_texts=None, tags=None):
+        if not query_texts:
+            return self.dense.search(query_embeddings, k)
+        pool = min(len(self.ids), max(k, self.candidates))
+        dense_hits = self.dense.search(query_embeddings, pool)
+
+        results = []
+        for hits, query_text in zip(dense_hits, query_texts):
+            dense = {self.position[hit.id]: hit.score for hit in hits}
+            # records outside the dense pool score no better than its worst member
+            floor = min(dense.values()) if dense else 0.0
+
+            bm25 = self.bm25.scores(query_text)
+            top_bm25 = float(bm25.max()) if len(bm25) else 0.0
+            lexical = bm25 / top_bm25 if top_bm25 > 0 else bm25
+            lexical_pool = np.argsort(-bm25)[:pool]
+            candidates = set(dense) | {int(i) for i in lexical_pool if bm25[i] > 0}
+
+            allowed = self.allowed_records(query_text, tags)
+            if allowed is not None:
+                candidates &= allowed
+                if not candidates:
+                    candidates = allowed
+
+            fused = sorted(
+                ((self.alpha * dense.get(i, floor) + (1 - self.alpha) * float(lexical[i]), i) for i in candidates),
+                reverse=True,
+            )[:k]
+            results.append([Hit(self.ids[i], score, self.metadatas[i], self.documents[i]) for score, i in fused])
+        return results
+
+    def records(self):
+        return self.ids, self.metadatas, self.documents
+
+    def __len__(self):
+        return len(self.ids)
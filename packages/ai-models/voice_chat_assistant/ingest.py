@@ -0,0 +1,315 @@
+"""
+Incremental build of the Chroma collection from the knowledge base JSON.
+
+Every record gets a stable id (from its title) and a content hash. On each run only
+records that are new or whose hash changed are embedded (in batches, with
+embed_documents), they are upserted in bulk, and ids that disappeared from the
+corpus are deleted. The embedding model name is kept in the collection metadata:
+when it changes (or the store was written by the old one-id-per-index loader) the
+collection is rebuilt from scratch. An unchanged corpus costs zero embedding calls.
+
+For a running server (hot reload) stage_collection() builds the new version next to the
+live collection instead, as "<COLLECTION_NAME>__<timestamp>", reusing the vectors of
+unchanged records. promote_collection() then points COLLECTION_NAME at it: the name of
+the active collection is kept in CHROMA_PATH/<COLLECTION_NAME>.active, replaced in one
+rename, so the name always resolves to a complete collection (no collection is renamed).
+Processes record the collection they serve in CHROMA_PATH/.holders/, and a promotion
+only drops versions that no live process holds.
+
+    python ingest.py                  # sync CHROMA_PATH with CORPUS_PATH
+    python ingest.py --rebuild        # drop the collection and embed everything
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from config import settings
+from embedding_backends import model_id
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record_id(record: dict) -> str:
+    return "kb-" + hashlib.sha1(record["title"].encode("utf-8")).hexdigest()[:16]
+
+
+def record_hash(record: dict) -> str:
+    payload = json.dumps(
+        {"title": record["title"], "content": record["content"], "tags": record["tags"]},
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def record_metadata(record: dict, content_hash: str) -> dict:
+    return {
+        "title": record["title"],
+        "content": record["content"],
+        "tags": ", ".join(record["tags"]),    # Chroma metadata values must be scalars
+        "content_hash": content_hash,
+    }
+
+
+def corpus_hash(hashes: dict[str, str]) -> str:
+    """One hash for the whole corpus; changes whenever any record is added, edited or removed."""
+    digest = hashlib.sha256()
+    for rid in sorted(hashes):
+        digest.update(f"{rid}:{hashes[rid]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_records(corpus_path: str) -> tuple[dict[str, dict], dict[str, str]]:
+    """Records and their content hashes by record id."""
+    records = {}
+    for record in load_corpus(corpus_path):
+        rid = record_id(record)
+        if rid in records:
+            raise ValueError(f"Duplicate title in {corpus_path}: {record['title']!r}")
+        records[rid] = record
+    return records, {rid: record_hash(record) for rid, record in records.items()}
+
+
+ACTIVE_SUFFIX = ".active"
+HOLDERS_DIR = ".holders"
+
+
+def _collection_metadata(model_name: str, corpus: str) -> dict:
+    return {"hnsw:space": "cosine", "embedding_model": model_name, "corpus_hash": corpus}
+
+
+def _merged_metadata(collection, **updates) -> dict:
+    """
+    modify() replaces the whole metadata dict: keep the other keys. The distance function
+    is fixed when the collection is created (Chroma refuses "hnsw:space" in modify), so
+    it is left out and stays as created.
+    """
+    metadata = {**(collection.metadata or {}), **updates}
+    metadata.pop("hnsw:space", None)
+    return metadata
+
+
+def _collection_names(client) -> set[str]:
+    return {c.name if hasattr(c, "name") else c for c in client.list_collections()}
+
+
+def _store_dir(client) -> str:
+    return client.get_settings().persist_directory
+
+
+def _write_atomic(path: str, text: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def active_collection_name(client, name: str) -> str:
+    """The collection serving `name`: the last one promoted, else `name` itself."""
+    try:
+        with open(os.path.join(_store_dir(client), name + ACTIVE_SUFFIX), "r", encoding="utf-8") as f:
+            active = f.read().strip()
+    except OSError:
+        return name
+    return active if active in _collection_names(client) else name
+
+
+def hold_collection(client, name: str, collection):
+    """Record that this process serves `collection` for `name`, so no promotion drops it."""
+    _write_atomic(os.path.join(_store_dir(client), HOLDERS_DIR, f"{name}.{os.getpid()}"), collection.name)
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name == "nt":
+        return True         # os.kill would terminate it: keep every holder
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _held_collections(client, name: str) -> set[str]:
+    holders_dir = os.path.join(_store_dir(client), HOLDERS_DIR)
+    held = set()
+    for entry in os.listdir(holders_dir) if os.path.isdir(holders_dir) else ():
+        holder, _, pid = entry.rpartition(".")
+        if holder != name or not pid.isdigit():
+            continue
+        path = os.path.join(holders_dir, entry)
+        try:
+            if not _process_alive(int(pid)):
+                os.remove(path)
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                held.add(f.read().strip())
+        except OSError:
+            continue
+    return held
+
+
+def _open_collection(client, name: str, model_name: str, rebuild: bool):
+    """Returns (collection, recreated)."""
+    if name in _collection_names(client):
+        collection = client.get_collection(name)
+        stored_model = (collection.metadata or {}).get("embedding_model")
+        if not rebuild and stored_model == model_name:
+            return collection, False
+        # Other model (vectors are not comparable) or legacy store: start over
+        client.delete_collection(name)
+    collection = client.create_collection(name=name, metadata=_collection_metadata(model_name, ""))
+    return collection, True
+
+
+def sync_collection(client, embedding_model, corpus_path: str | None = None, collection_name: str | None = None,
+                    model_name: str | None = None, batch_size: int | None = None, rebuild: bool = False):
+    """
+    Bring the collection in line with the corpus file.
+    Returns (collection, stats) where stats counts added / updated / deleted / unchanged records.
+    """
+    corpus_path = corpus_path or settings.CORPUS_PATH
+    collection_name = active_collection_name(client, collection_name or settings.COLLECTION_NAME)
+    # model + backend (embedding_backends.model_id): vectors from another backend are rebuilt
+    model_name = model_name or model_id()
+    batch_size = batch_size or settings.EMBED_BATCH_SIZE
+    start = time.perf_counter()
+
+    records, hashes = load_records(corpus_path)
+
+    collection, recreated = _open_collection(client, collection_name, model_name, rebuild)
+
+    stored = collection.get(include=["metadatas"])
+    stored_hashes = {
+        rid: (meta or {}).get("content_hash") for rid, meta in zip(stored["ids"], stored["metadatas"])
+    }
+
+    changed = [rid for rid in records if stored_hashes.get(rid) != hashes[rid]]
+    removed = [rid for rid in stored_hashes if rid not in records]
+
+    max_batch = client.get_max_batch_size()
+    for i in range(0, len(changed), batch_size):
+        ids = changed[i:i + batch_size]
+        documents = [records[rid]["content"] for rid in ids]
+        embeddings = embedding_model.embed_documents(documents)
+        for j in range(0, len(ids), max_batch):
+            collection.upsert(
+                ids=ids[j:j + max_batch],
+                embeddings=embeddings[j:j + max_batch],
+                documents=documents[j:j + max_batch],
+                metadatas=[record_metadata(records[rid], hashes[rid]) for rid in ids[j:j + max_batch]],
+            )
+    for j in range(0, len(removed), max_batch):
+        collection.delete(ids=removed[j:j + max_batch])
+
+    corpus = corpus_hash(hashes)
+    if (collection.metadata or {}).get("corpus_hash") != corpus:
+        collection.modify(metadata=_merged_metadata(collection, embedding_model=model_name, corpus_hash=corpus))
+
+    added = sum(1 for rid in changed if rid not in stored_hashes)
+    stats = {
+        "records": len(records),
+        "added": added,
+        "updated": len(changed) - added,
+        "deleted": len(removed),
+        "unchanged": len(records) - len(changed),
+        "recreated": recreated,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    return collection, stats
+
+
+def stage_collection(client, embedding_model, live, corpus_path: str | None = None, model_name: str | None = None,
+                     batch_size: int | None = None, name: str | None = None):
+    """
+    Build the corpus into a new "<name>__<timestamp in µs>" collection, leaving `live`
+    untouched (it keeps serving queries). Vectors of records whose hash did not change
+    are copied from `live`; only new and edited records are embedded.
+    Returns (staging collection, stats) with the same counts as sync_collection.
+    """
+    name = name or settings.COLLECTION_NAME
+    corpus_path = corpus_path or settings.CORPUS_PATH
+    model_name = model_name or model_id()
+    batch_size = batch_size or settings.EMBED_BATCH_SIZE
+    start = time.perf_counter()
+
+    records, hashes = load_records(corpus_path)
+    # a failed build is left behind and dropped by the next promotion
+    staging = client.create_collection(name=f"{name}__{time.time_ns() // 1000}",
+                                       metadata=_collection_metadata(model_name, corpus_hash(hashes)))
+
+    stored_vectors = {}
+    if (live.metadata or {}).get("embedding_model") == model_name:
+        stored = live.get(include=["embeddings", "metadatas"])
+        stored_vectors = {
+            rid: embedding for rid, meta, embedding in zip(stored["ids"], stored["metadatas"], stored["embeddings"])
+            if rid in hashes and (meta or {}).get("content_hash") == hashes[rid]
+        }
+    changed = [rid for rid in records if rid not in stored_vectors]
+    vectors = {rid: list(map(float, embedding)) for rid, embedding in stored_vectors.items()}
+    for i in range(0, len(changed), batch_size):
+        ids = changed[i:i + batch_size]
+        vectors.update(zip(ids, embedding_model.embed_documents([records[rid]["content"] for rid in ids])))
+
+    ids = list(records)
+    max_batch = client.get_max_batch_size()
+    for j in range(0, len(ids), max_batch):
+        chunk = ids[j:j + max_batch]
+        staging.add(
+            ids=chunk,
+            embeddings=[vectors[rid] for rid in chunk],
+            documents=[records[rid]["content"] for rid in chunk],
+            metadatas=[record_metadata(records[rid], hashes[rid]) for rid in chunk],
+        )
+
+    live_ids = set(live.get(include=[])["ids"])
+    added = sum(1 for rid in changed if rid not in live_ids)
+    stats = {
+        "records": len(records),
+        "added": added,
+        "updated": len(changed) - added,
+        "deleted": len(live_ids - set(records)),
+        "unchanged": len(stored_vectors),
+        "recreated": False,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    return staging, stats
+
+
+def promote_collection(client, staging, name: str):
+    """
+    Make `staging` the collection served as `name` (one atomic replace of the pointer file).
+    Other versions of `name` are dropped, except the one just replaced (queries that
+    started on it may still be running) and those a live process holds (hold_collection).
+    """
+    previous = active_collection_name(client, name)
+    _write_atomic(os.path.join(_store_dir(client), name + ACTIVE_SUFFIX), staging.name)
+    keep = {staging.name, previous} | _held_collections(client, name)
+    for other in _collection_names(client):
+        if (other == name or other.startswith(f"{name}__")) and other not in keep:
+            client.delete_collection(other)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="drop the collection and embed every record")
+    args = parser.parse_args()
+
+    from chromadb import PersistentClient
+
+    from embedding_backends import load_embedding_model
+
+    embedding_model = load_embedding_model()
+    client = PersistentClient(path=settings.CHROMA_PATH)
+    collection, stats = sync_collection(client, embedding_model, rebuild=args.rebuild)
+    print(f"{settings.CHROMA_PATH}/{collection.name}: {collection.count()} records {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Per-request LLM usage: prompt / completion tokens, the packed context behind them and
+timings. latency_ms is the LLM call and total_ms the whole answer (embedding, retrieval,
+LLM); streamed answers also report first_token_ms (LLM call to first token) and ttfb_ms
+(start of the answer to first token).
+
+answer_user_query records one sample per LLM call. Token counts come from the
+provider's usage report (Groq returns it with every response) and fall back to
+tokens.count_tokens when it is missing. The last LLM_STATS_WINDOW samples are kept
+for the p50 / p95 figures in /stats; totals cover the whole process.
+"""
+import statistics
+import threading
+from collections import deque
+
+from config import settings
+
+FIELDS = ("prompt_tokens", "completion_tokens", "context_tokens", "chunks_packed",
+          "latency_ms", "first_token_ms", "ttfb_ms", "total_ms")
+
+
+def response_usage(response) -> dict:
+    """(prompt, completion) tokens from a LangChain chat response, {} when not reported."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        return {"prompt_tokens": usage.get("input_tokens"), "completion_tokens": usage.get("output_tokens")}
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    if usage:
+        return {"prompt_tokens": usage.get("prompt_tokens"), "completion_tokens": usage.get("completion_tokens")}
+    return {}
+
+
+class UsageStats:
+    def __init__(self, window: int):
+        self._samples: deque[dict] = deque(maxlen=window)
+        self._totals = dict.fromkeys(("requests", "total_prompt_tokens", "total_completion_tokens"), 0)
+        self._lock = threading.Lock()
+
+    def record(self, **sample):
+        with self._lock:
+            self._samples.append(sample)
+            self._totals["requests"] += 1
+            self._totals["total_prompt_tokens"] += sample.get("prompt_tokens") or 0
+            self._totals["total_completion_tokens"] += sample.get("completion_tokens") or 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+            totals = dict(self._totals)
+        summary = {}
+        for field in FIELDS:
+            values = sorted(s[field] for s in samples if s.get(field) is not None)
+            if values:
+                summary[field] = {
+                    "mean": round(statistics.mean(values), 1),
+                    "p50": values[len(values) // 2],
+                    "p95": values[min(len(values) - 1, int(0.95 * len(values)))],
+                }
+        return {"window": len(samples), **totals, **summary}
+
+
+llm_usage = UsageStats(window=settings.LLM_STATS_WINDOW)
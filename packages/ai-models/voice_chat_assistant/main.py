@@ -1,14 +1,53 @@
-from fastapi import FastAPI, Request, HTTPException
+import asyncio
+import hmac
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Header, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from mangum import Mangum
 
-from app import answer_user_query, collection
-from voice_routes import router as voice_router   
-
-
-app = FastAPI(title="Swaraj_chat Backend API")
+from app import answer_user_query, init_resources, require_ready, resources, stream_user_query
+from config import settings
+from corpus_reload import CorpusWatcher, reload_corpus
+from faq import faq_table, refresh_faq_table
+from llm_stats import llm_usage
+from semantic_cache import answer_cache
+from voice_routes import router as voice_router
+
+
+# ----- startup: embedding model, Chroma collection, LLM client -----
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Hot reload when the corpus file changes (the bundle's index is read-only); started
+    # first, so an edit made while the resources load is picked up as well
+    watcher = None
+    if settings.CORPUS_WATCH_INTERVAL > 0 and not settings.BUNDLE_DIR:
+        watcher = CorpusWatcher(settings.CORPUS_PATH, settings.CORPUS_WATCH_INTERVAL).start()
+    if settings.LAZY_INIT:
+        # Built by the first request that needs them (see require_ready)
+        pass
+    elif settings.WARMUP_IN_BACKGROUND:
+        # Serve /health and /ready right away; chat endpoints answer 503 until warm
+        warmup = asyncio.create_task(asyncio.to_thread(init_resources))
+        # failures are kept in resources.error and reported by /ready
+        warmup.add_done_callback(lambda task: task.cancelled() or task.exception())
+    else:
+        await asyncio.to_thread(init_resources)
+    # Regenerate the FAQ answer table in the background if it was built from another corpus
+    # (FAQ_REBUILD; otherwise only the table written by `python faq.py` is used)
+    refresh_faq_table()
+    yield
+    if watcher:
+        watcher.stop()
+
+
+app = FastAPI(title="Swaraj_chat Backend API", lifespan=lifespan)
 
 
 # ----- CORS -----
@@ -21,13 +60,15 @@ app.add_middleware(
 )
 
 # Serve audio response files (voice output)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+os.makedirs(os.path.join(settings.STATIC_DIR, "voice"), exist_ok=True)
+app.mount("/static", StaticFiles(directory=settings.STATIC_DIR), name="static")
 
 
 # ----- request model -----
 class ChatRequest(BaseModel):
     user_query: str
     language: str = "english"
+    tags: list[str] | None = None     # optional prefilter on knowledge-base tags (hybrid retrieval)
 
 
 # ----- response model -----
@@ -36,7 +77,7 @@ class ChatResponse(BaseModel):
 
 
 # ----- /chat endpoint (text input) -----
-@app.post("/chat_swaraj", response_model=ChatResponse)
+@app.post("/chat_swaraj", response_model=ChatResponse, dependencies=[Depends(require_ready)])
 async def chat(req: ChatRequest, request: Request):
     # Validate Content-Type
     content_type = request.headers.get("content-type", "")
@@ -44,10 +85,47 @@ async def chat(req: ChatRequest, request: Request):
         raise HTTPException(status_code=415, detail="Content-Type must be application/json")
 
     # Same RAG pipeline as before
-    answer = answer_user_query(req.user_query, collection, req.language)
+    answer = await answer_user_query(req.user_query, language=req.language, tags=req.tags)
     return ChatResponse(bot_response=answer)
 
 
+# ----- /chat_swaraj/stream: same answer as Server-Sent Events, token by token -----
+def sse(data: dict, event: str | None = None) -> str:
+    return (f"event: {event}\n" if event else "") + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat_swaraj/stream", dependencies=[Depends(require_ready)])
+async def chat_stream(req: ChatRequest, request: Request):
+    """
+    data: {"token": "..."}    for every piece of the answer, as the model produces it
+    event: done               {"bot_response": full answer, "ttfb_ms": ..., "total_ms": ...}
+    event: error              {"detail": "..."} if the answer failed midway
+    """
+    content_type = request.headers.get("content-type", "")
+    if "application/json" not in content_type.lower():
+        raise HTTPException(status_code=415, detail="Content-Type must be application/json")
+    started = time.perf_counter()
+
+    async def events():
+        parts, ttfb_ms = [], None
+        try:
+            async for token in stream_user_query(req.user_query, language=req.language, tags=req.tags):
+                if ttfb_ms is None:
+                    ttfb_ms = round((time.perf_counter() - started) * 1000, 1)
+                parts.append(token)
+                yield sse({"token": token})
+        except Exception as e:
+            print(f"Streaming answer failed: {type(e).__name__}: {e}")
+            yield sse({"detail": "The answer could not be completed"}, event="error")
+            return
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        yield sse({"bot_response": "".join(parts).strip(), "ttfb_ms": ttfb_ms, "total_ms": total_ms}, event="done")
+
+    # no-transform / X-Accel-Buffering: proxies must pass the events through unbuffered
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"})
+
+
 # ----- include voice bot API (WAV/MP3 input + MP3 output) -----
 app.include_router(voice_router)
 
@@ -58,9 +136,49 @@ def health():
     return {"status": "ok"}
 
 
+# ----- readiness: 200 once the RAG resources are warm (with startup timings) -----
+@app.get("/ready")
+def ready():
+    if settings.LAZY_INIT and not resources.ready.is_set():
+        # With lazy init (Lambda) this is also the warm-up call
+        try:
+            init_resources()
+        except Exception:
+            pass
+    status = resources.status()
+    return JSONResponse(status, status_code=200 if status["status"] == "ready" else 503)
+
+
+# ----- runtime counters (semantic answer cache hit rate, ...) -----
+@app.get("/stats")
+def stats():
+    embedder = resources.query_embedder
+    return {"answer_cache": answer_cache.stats(), "faq": faq_table.stats(), "llm_usage": llm_usage.stats(),
+            "query_embedder": embedder.stats() if embedder else None}
+
+
+# ----- admin: rebuild the index from the corpus file and swap it in -----
+@app.post("/admin/reload")
+async def admin_reload(force: bool = False, x_admin_token: str | None = Header(default=None)):
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token or "", settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    try:
+        # queries keep being answered from the current index while the new one is built
+        return await asyncio.to_thread(reload_corpus, force)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        # unreadable JSON, duplicate titles, ...: the current index stays in place
+        raise HTTPException(status_code=422, detail=f"Corpus not loaded: {e}")
+
+
 @app.get("/")
 def root():
     return {"status": "This is the SwarajDesk RAG-Based Multilingual Chatbot Backend"}
 
-handler = Mangum(app)
+# Lambda entrypoint; with LAZY_INIT there is nothing to run at startup, so skip the
+# lifespan cycle Mangum would otherwise run around every invocation
+handler = Mangum(app, lifespan="off" if settings.LAZY_INIT else "auto")
 
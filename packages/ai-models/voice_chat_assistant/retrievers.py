@@ -0,0 +1,190 @@
+"""
+Retriever backends behind retrieve_context (RETRIEVER_BACKEND).
+
+  chroma   the persistent Chroma collection (HNSW, SQLite) — the source of truth ingest.py
+           keeps in sync with the corpus
+  numpy    exact search over a read-only copy of the same vectors: L2-normalized float32
+           matrix in embeddings.npy, memory-mapped, top-k by one matrix product and
+           argpartition. For a small static corpus this is faster than Chroma, and the
+           mapped pages are shared between processes.
+
+Both return, per query, the top-k hits with cosine similarity, metadata and document,
+best first. Queries can be batched. hybrid.HybridRetriever wraps either one and also
+uses the query text (BM25) and tag filters, which the dense backends ignore.
+"""
+import json
+import os
+import shutil
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+from file_lock import file_lock
+
+EMBEDDINGS_FILE = "embeddings.npy"
+RECORDS_FILE = "records.json"
+
+
+class Hit(NamedTuple):
+    id: str
+    score: float            # cosine similarity (hybrid: fused score), higher is closer
+    metadata: dict
+    document: str
+
+
+class Retriever:
+    name = "base"
+
+    def search(self, query_embeddings: Sequence[Sequence[float]], k: int,
+               query_texts: Sequence[str] | None = None, tags: Sequence[str] | None = None) -> list[list[Hit]]:
+        raise NotImplementedError
+
+    def search_one(self, query_embedding: Sequence[float], k: int, query_text: str | None = None,
+                   tags: Sequence[str] | None = None) -> list[Hit]:
+        return self.search([query_embedding], k, None if query_text is None else [query_text], tags)[0]
+
+    def records(self) -> tuple[list[str], list[dict], list[str]]:
+        """Every stored record: (ids, metadatas, documents)."""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class ChromaRetriever(Retriever):
+    name = "chroma"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def search(self, query_embeddings, k, query_texts=None, tags=None):
+        results = self.collection.query(
+            query_embeddings=[list(map(float, q)) for q in query_embeddings],
+            n_results=k,
+            include=["metadatas", "documents", "distances"],
+        )
+        return [
+            # collection uses the cosine space: distance = 1 - similarity
+            [Hit(rid, 1.0 - distance, metadata, document)
+             for rid, distance, metadata, document in zip(ids, distances, metadatas, documents)]
+            for ids, distances, metadatas, documents in zip(
+                results["ids"], results["distances"], results["metadatas"], results["documents"])
+        ]
+
+    def records(self):
+        stored = self.collection.get(include=["metadatas", "documents"])
+        return stored["ids"], stored["metadatas"], stored["documents"]
+
+    def __len__(self):
+        return self.collection.count()
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class NumpyRetriever(Retriever):
+    name = "numpy"
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, RECORDS_FILE), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        self.info = records["info"]
+        self.ids = records["ids"]
+        self.metadatas = records["metadatas"]
+        self.documents = records["documents"]
+        # read-only mapping: pages come from the page cache and are shared across workers
+        self.embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+
+    def search(self, query_embeddings, k, query_texts=None, tags=None):
+        queries = _normalize_rows(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+        scores = queries @ self.embeddings.T                    # (queries, records)
+        k = min(k, scores.shape[1])
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), (len(queries), k))
+        rows = np.arange(len(queries))[:, None]
+        order = np.argsort(-scores[rows, top], axis=1)
+        top = top[rows, order]
+        return [
+            [Hit(self.ids[i], float(scores[q, i]), self.metadatas[i], self.documents[i]) for i in top[q]]
+            for q in range(len(queries))
+        ]
+
+    def records(self):
+        return self.ids, self.metadatas, self.documents
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _index_lock(index_dir: str):
+    # next to the directory, which is itself swapped out
+    return file_lock(os.path.normpath(index_dir) + ".lock")
+
+
+def write_numpy_index(index_dir: str, ids: list[str], embeddings, metadatas: list[dict],
+                      documents: list[str], info: dict):
+    """
+    Write the files NumpyRetriever maps into a new directory and rename it into place.
+    The files of the previous index are never modified: retrievers that have them mapped
+    keep reading them. export_collection() holds _index_lock(index_dir) around it, since
+    workers share the directory.
+    """
+    index_dir = os.path.normpath(index_dir)
+    matrix = _normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+    tmp_dir, old_dir = f"{index_dir}.{os.getpid()}.tmp", f"{index_dir}.{os.getpid()}.old"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, EMBEDDINGS_FILE), matrix)
+    with open(os.path.join(tmp_dir, RECORDS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"info": info, "ids": ids, "metadatas": metadatas, "documents": documents}, f, ensure_ascii=False)
+    # a directory cannot replace a non-empty one: move the old one aside first
+    if os.path.exists(index_dir):
+        os.rename(index_dir, old_dir)
+    os.rename(tmp_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def read_index_info(index_dir: str) -> dict | None:
+    try:
+        with open(os.path.join(index_dir, RECORDS_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)["info"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def export_collection(collection, index_dir: str) -> bool:
+    """
+    Mirror the Chroma collection into a NumPy index (no re-embedding) unless the one on
+    disk already matches its model and corpus hash. Returns True when it was rewritten.
+    """
+    metadata = collection.metadata or {}
+    info = {"embedding_model": metadata.get("embedding_model"), "corpus_hash": metadata.get("corpus_hash")}
+    with _index_lock(index_dir):
+        if read_index_info(index_dir) == info:
+            return False
+        stored = collection.get(include=["embeddings", "metadatas", "documents"])
+        write_numpy_index(index_dir, stored["ids"], stored["embeddings"], stored["metadatas"],
+                          stored["documents"], info)
+    return True
+
+
+def build_retriever(backend: str, collection, index_dir: str, export: bool = True) -> Retriever:
+    """export=False: index_dir is read-only and already current (bundle), never rewrite it."""
+    if backend == "chroma":
+        return ChromaRetriever(collection)
+    if backend == "numpy":
+        if not export or collection is None:
+            return NumpyRetriever(index_dir)
+        export_collection(collection, index_dir)
+        # another process may be swapping the directory: map it under the same lock
+        with _index_lock(index_dir):
+            return NumpyRetriever(index_dir)
+    raise ValueError(f"Unknown RETRIEVER_BACKEND={backend!r} (expected chroma or numpy)")
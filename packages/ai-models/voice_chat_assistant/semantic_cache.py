@@ -0,0 +1,142 @@
+"""
+Semantic answer cache in front of answer_user_query.
+
+A query reuses a stored answer when its embedding is within ANSWER_CACHE_THRESHOLD
+(cosine similarity) of a cached query with the same target language, so "How do I
+reset my password?" and "how can i reset password" cost one LLM call, not two.
+
+  - LRU eviction at ANSWER_CACHE_SIZE entries, entries expire after ANSWER_CACHE_TTL
+  - everything is dropped when the corpus hash changes (answers may be stale)
+  - hits / misses / evictions are counted for /stats
+
+Lookups are exact (one matrix-vector product per language), which is cheap at the
+sizes a cache like this holds.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import settings
+
+
+class _Entry:
+    __slots__ = ("embedding", "language", "answer", "expires_at")
+
+    def __init__(self, embedding: np.ndarray, language: str, answer: str, expires_at: float):
+        self.embedding = embedding
+        self.language = language
+        self.answer = answer
+        self.expires_at = expires_at
+
+
+def _normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.corpus_hash: str | None = None
+
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._next_id = 0
+        # per language: (entry ids, stacked embeddings), rebuilt after a change
+        self._matrices: dict[str, tuple[list[int], np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(("hits", "misses", "stores", "evictions", "expirations", "invalidations", "stale"), 0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def lookup(self, embedding, language: str) -> str | None:
+        if not self.enabled:
+            return None
+        query = _normalize(embedding)
+        with self._lock:
+            self._expire()
+            ids, matrix = self._matrix(language)
+            if ids:
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry_id = ids[best]
+                    self._entries.move_to_end(entry_id)
+                    self._counters["hits"] += 1
+                    return self._entries[entry_id].answer
+            self._counters["misses"] += 1
+            return None
+
+    def store(self, embedding, language: str, answer: str, corpus_hash: str | None = None):
+        """corpus_hash: the corpus the answer was generated from; dropped if it is no longer current."""
+        if not self.enabled or not answer:
+            return
+        with self._lock:
+            if corpus_hash is not None and corpus_hash != self.corpus_hash:
+                self._counters["stale"] += 1
+                return
+            self._entries[self._next_id] = _Entry(
+                _normalize(embedding), language, answer, time.monotonic() + self.ttl_seconds
+            )
+            self._next_id += 1
+            self._counters["stores"] += 1
+            self._matrices.pop(language, None)
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._matrices.pop(evicted.language, None)
+                self._counters["evictions"] += 1
+
+    def set_corpus(self, corpus_hash: str | None):
+        """Drop every answer when the knowledge base they were generated from changes."""
+        with self._lock:
+            if corpus_hash != self.corpus_hash:
+                if self._entries:
+                    self._counters["invalidations"] += 1
+                self._entries.clear()
+                self._matrices.clear()
+                self.corpus_hash = corpus_hash
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "threshold": self.threshold,
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else None,
+            }
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry.expires_at <= now]
+        for entry_id in expired:
+            entry = self._entries.pop(entry_id)
+            self._matrices.pop(entry.language, None)
+        self._counters["expirations"] += len(expired)
+
+    def _matrix(self, language: str) -> tuple[list[int], np.ndarray]:
+        if language not in self._matrices:
+            ids = [entry_id for entry_id, entry in self._entries.items() if entry.language == language]
+            matrix = (np.stack([self._entries[entry_id].embedding for entry_id in ids])
+                      if ids else np.empty((0, 0), dtype=np.float32))
+            self._matrices[language] = (ids, matrix)
+        return self._matrices[language]
+
+
+answer_cache = SemanticAnswerCache(
+    max_entries=settings.ANSWER_CACHE_SIZE,
+    ttl_seconds=settings.ANSWER_CACHE_TTL,
+    threshold=settings.ANSWER_CACHE_THRESHOLD,
+)
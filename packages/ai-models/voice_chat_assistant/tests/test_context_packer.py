@@ -0,0 +1,52 @@
+from context_packer import pack_context, split_sentences
+from retrievers import Hit
+
+PASSWORD_RESET = ("Click 'Forgot Password' on the login page → enter your registered mobile number or email → "
+                  "receive a verification OTP → create a new password following platform guidelines.")
+
+
+def hit(title: str, content: str, score: float = 0.9) -> Hit:
+    return Hit(title, score, {"title": title, "content": content}, content)
+
+
+def test_step_lists_stay_whole():
+    assert split_sentences("Go to Dashboard → My Complaints → View Status. Then wait.") == [
+        "Go to Dashboard → My Complaints → View Status.", "Then wait."]
+
+
+def test_a_chunk_that_fits_is_passed_through_unchanged():
+    content = "Escalation hierarchy: Level 1 → Support Agent → Level 2 → Municipal Admin.\nReply within 48 hours."
+    packed, stats = pack_context([hit("Escalation", content)], "escalation", budget_tokens=800)
+    assert packed[0]["content"] == content
+    assert stats["trimmed"] == stats["duplicate_sentences"] == 0
+
+
+def test_a_step_inside_a_longer_sentence_is_not_a_duplicate():
+    hits = [hit("Password Reset Procedure", PASSWORD_RESET),
+            hit("Login", "Enter your registered mobile number or email.", score=0.8)]
+    packed, stats = pack_context(hits, "reset password", budget_tokens=800)
+    assert [metadata["content"] for metadata in packed] == [PASSWORD_RESET, hits[1].metadata["content"]]
+    assert stats["duplicate_sentences"] == 0
+
+
+def test_a_repeated_sentence_is_dropped():
+    hits = [hit("A", "Enter your registered mobile number or email."),
+            hit("B", "Enter your registered mobile number or email. The OTP expires in 10 minutes.", score=0.8)]
+    packed, stats = pack_context(hits, "otp", budget_tokens=800)
+    assert packed[1]["content"] == "The OTP expires in 10 minutes."
+    assert stats["duplicate_sentences"] == 1
+
+
+def test_a_top_chunk_too_long_for_the_budget_is_cut_not_dropped():
+    content = "Citizens can file complaints about roads, water supply, electricity, sanitation, " * 3
+    packed, stats = pack_context([hit("Complaints", content)], "file a complaint", budget_tokens=20)
+    assert len(packed) == 1
+    assert content.startswith(packed[0]["content"]) and packed[0]["content"]
+    assert stats["context_tokens"] <= 20
+
+
+def test_a_later_chunk_that_does_not_fit_is_skipped():
+    hits = [hit("Short", "Call 1800-000-000."), hit("Long", PASSWORD_RESET, score=0.8),
+            hit("Also short", "Chrome works.", score=0.7)]
+    packed, _ = pack_context(hits, "help", budget_tokens=30)
+    assert [metadata["title"] for metadata in packed] == ["Short", "Also short"]
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+pytest.importorskip("langchain_groq")
+
+import corpus_reload
+from app import resources
+from config import settings
+from embedding_backends import model_id
+from ingest import active_collection_name, sync_collection
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class FakeQueryEmbedder:
+    def embed(self, text):
+        return [float(len(text)), 1.0]
+
+
+def write_corpus(path, contents):
+    path.write_text(json.dumps([{"title": f"T{i}", "content": c, "tags": []} for i, c in enumerate(contents)]))
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    """The RAG resources of one worker serving the store in tmp_path."""
+    for name, value in {"CHROMA_PATH": str(tmp_path / "chroma"), "COLLECTION_NAME": "kb_test",
+                        "CORPUS_PATH": str(tmp_path / "corpus.json"), "RETRIEVER_BACKEND": "chroma",
+                        "RETRIEVER_HYBRID": False, "FAQ_TABLE_DIR": str(tmp_path / "faq")}.items():
+        monkeypatch.setattr(settings, name, value)
+    write_corpus(tmp_path / "corpus.json", ["aa", "bbbb"])
+    client = chromadb.PersistentClient(path=settings.CHROMA_PATH)
+    collection, _ = sync_collection(client, FakeEmbeddings(), model_name=model_id())
+
+    def start():
+        resources.client, resources.collection = client, collection
+        resources.embedding_model, resources.query_embedder = FakeEmbeddings(), FakeQueryEmbedder()
+        resources.corpus_hash = collection.metadata["corpus_hash"]
+        resources.ready.set()
+
+    start()
+    yield client, start
+    resources.ready.clear()
+
+
+def test_second_worker_serves_the_collection_the_first_one_promoted(tmp_path, worker):
+    client, start_other_worker = worker
+    write_corpus(tmp_path / "corpus.json", ["aa", "cccccc"])
+    first = corpus_reload.reload_corpus()
+    promoted = active_collection_name(client, "kb_test")
+    assert first["reloaded"] and promoted != "kb_test"
+
+    start_other_worker()            # still on the old collection and corpus hash
+    second = corpus_reload.reload_corpus()
+    assert second["reused"] == promoted
+    assert resources.collection.name == promoted
+    assert active_collection_name(client, "kb_test") == promoted
+    assert {c.name for c in client.list_collections()} == {"kb_test", promoted}
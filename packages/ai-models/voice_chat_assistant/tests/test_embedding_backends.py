@@ -0,0 +1,25 @@
+import json
+
+import embedding_backends
+from embedding_backends import INFO_FILE, model_id
+
+
+def write_info(path, quantized: bool) -> str:
+    path.mkdir()
+    (path / INFO_FILE).write_text(json.dumps({"source_model": "m", "quantized": quantized}))
+    return str(path)
+
+
+def test_model_id_follows_the_onnx_export(tmp_path, monkeypatch):
+    int8 = write_info(tmp_path / "int8", quantized=True)
+    fp32 = write_info(tmp_path / "fp32", quantized=False)
+    assert model_id("onnx", "m", onnx_dir=int8) == "m#onnx-int8"
+    assert model_id("onnx", "m", onnx_dir=fp32) == "m#onnx-fp32"
+    assert model_id("torch", "m", onnx_dir=fp32) == "m"
+
+    # no explicit directory: the export loaded in this process, else ONNX_MODEL_DIR
+    monkeypatch.setattr(embedding_backends.settings, "ONNX_MODEL_DIR", int8)
+    monkeypatch.setattr(embedding_backends, "_loaded_onnx_info", None)
+    assert model_id("onnx", "m") == "m#onnx-int8"
+    monkeypatch.setattr(embedding_backends, "_loaded_onnx_info", {"quantized": False})
+    assert model_id("onnx", "m") == "m#onnx-fp32"
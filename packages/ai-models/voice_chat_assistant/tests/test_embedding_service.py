@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+from embedding_service import QueryEmbedder
+
+
+def embed(embedder, text):
+    # bounded wait: a dead batching thread fails the test instead of hanging it
+    return asyncio.run(asyncio.wait_for(embedder.aembed(text), timeout=5))
+
+
+class SlowEmbeddings:
+    """embed_documents blocks until released, so a waiter can go away mid-batch."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = False
+
+    def embed_documents(self, texts):
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("model failed")
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_cancelled_waiter_does_not_stop_the_batching_thread():
+    embeddings = SlowEmbeddings()
+    embedder = QueryEmbedder(embeddings, wait_ms=0, cache_size=0)
+
+    async def scenario():
+        waiter = asyncio.create_task(embedder.aembed("first query"))
+        await asyncio.to_thread(embeddings.started.wait, 5)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        embeddings.release.set()
+        return await asyncio.wait_for(embedder.aembed("next query"), timeout=5)
+
+    assert asyncio.run(scenario()) == [10.0, 1.0]
+    assert embedder._worker.is_alive()
+
+
+def test_embedder_error_goes_to_the_batch_and_the_next_query_works():
+    embeddings = SlowEmbeddings()
+    embeddings.fail = True
+    embeddings.release.set()
+    embedder = QueryEmbedder(embeddings, wait_ms=0, cache_size=0)
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        embed(embedder, "broken")
+    embeddings.fail = False
+    assert embed(embedder, "works") == [5.0, 1.0]
+
+
+def test_worker_is_restarted_if_it_died():
+    embedder = QueryEmbedder(SlowEmbeddings(), wait_ms=0, cache_size=0)
+    embedder.embeddings.release.set()
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    embedder._worker = dead
+    assert embed(embedder, "abc") == [3.0, 1.0]
+    assert embedder._worker is not dead and embedder._worker.is_alive()
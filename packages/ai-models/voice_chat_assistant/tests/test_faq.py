@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+
+from faq import EMBEDDINGS_FILE, FAQTable, Table, write_table
+
+
+def make_table(corpus_hash: str, rows: int) -> Table:
+    matrix = np.eye(rows, 4, dtype=np.float32)
+    info = {"corpus_hash": corpus_hash, "embedding_model": "model", "questions_hash": "q"}
+    return Table(info, ["q"], [{"english": corpus_hash}], [0] * rows, matrix)
+
+
+def test_written_table_loads(tmp_path):
+    write_table(str(tmp_path), make_table("a", 3))
+    table = FAQTable(threshold=0.9)
+    assert table.load(str(tmp_path), "model")
+    assert table.lookup([1, 0, 0, 0], "english", "a") == "a"
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_files_from_two_builds_are_rejected(tmp_path):
+    write_table(str(tmp_path / "old"), make_table("old", 2))
+    write_table(str(tmp_path / "new"), make_table("new", 3))
+    # a reader between the two renames: the new embeddings with the old faq.json
+    os.replace(tmp_path / "new" / EMBEDDINGS_FILE, tmp_path / "old" / EMBEDDINGS_FILE)
+    assert not FAQTable(threshold=0.9).load(str(tmp_path / "old"), "model")
+
+
+def test_other_embedding_model_is_rejected(tmp_path):
+    write_table(str(tmp_path), make_table("a", 2))
+    assert not FAQTable(threshold=0.9).load(str(tmp_path), "other-model")
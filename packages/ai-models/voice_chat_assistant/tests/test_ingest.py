@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+
+from ingest import (active_collection_name, hold_collection, promote_collection, stage_collection,
+                    sync_collection)
+
+
+class FakeEmbeddings:
+    """Two-dimensional vectors: the length of the text on one axis, 1 on the other."""
+
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def write_corpus(path, contents):
+    path.write_text(json.dumps([{"title": f"T{i}", "content": c, "tags": []} for i, c in enumerate(contents)]))
+
+
+def test_sync_keeps_the_collection_metadata(tmp_path):
+    corpus = tmp_path / "corpus.json"
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    client.create_collection("kb_test", metadata={"hnsw:space": "cosine", "embedding_model": "fake", "owner": "ops"})
+
+    for contents in (["aa", "bbbb"], ["aa", "cccccc"]):
+        write_corpus(corpus, contents)
+        collection, _ = sync_collection(client, FakeEmbeddings(), corpus_path=str(corpus),
+                                        collection_name="kb_test", model_name="fake")
+
+    reopened = chromadb.PersistentClient(path=str(tmp_path / "chroma")).get_collection("kb_test")
+    assert reopened.metadata["owner"] == "ops"
+    assert reopened.metadata["corpus_hash"] == collection.metadata["corpus_hash"] != ""
+    # cosine, not l2: a scaled copy of a stored vector is at distance 0
+    result = reopened.query(query_embeddings=[[4.0, 2.0]], n_results=1)
+    assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-5)
+
+
+def stage(client, corpus, contents, live):
+    write_corpus(corpus, contents)
+    return stage_collection(client, FakeEmbeddings(), live, corpus_path=str(corpus), model_name="fake",
+                            name="kb_test")[0]
+
+
+def test_promotion_swaps_the_active_name_and_keeps_held_versions(tmp_path):
+    corpus = tmp_path / "corpus.json"
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    write_corpus(corpus, ["aa", "bbbb"])
+    first, _ = sync_collection(client, FakeEmbeddings(), corpus_path=str(corpus), collection_name="kb_test",
+                               model_name="fake")
+    hold_collection(client, "kb_test", first)     # this process serves it
+
+    second = stage(client, corpus, ["aa", "cc"], first)
+    promote_collection(client, second, "kb_test")
+    assert active_collection_name(client, "kb_test") == second.name
+    third = stage(client, corpus, ["aa", "dd"], second)
+    promote_collection(client, third, "kb_test")
+
+    assert active_collection_name(client, "kb_test") == third.name
+    # first: held by a live process; second: the one just replaced
+    assert {c.name for c in client.list_collections()} == {first.name, second.name, third.name}
+    assert sync_collection(client, FakeEmbeddings(), corpus_path=str(corpus), collection_name="kb_test",
+                           model_name="fake")[0].name == third.name
+
+    hold_collection(client, "kb_test", third)
+    fourth = stage(client, corpus, ["aa", "ee"], third)
+    promote_collection(client, fourth, "kb_test")
+    assert {c.name for c in client.list_collections()} == {third.name, fourth.name}
@@ -0,0 +1,24 @@
+import os
+
+import numpy as np
+
+from retrievers import NumpyRetriever, read_index_info, write_numpy_index
+
+
+def write_index(index_dir: str, ids: list[str], version: int):
+    embeddings = np.eye(len(ids), 4, dtype=np.float32)
+    write_numpy_index(index_dir, ids, embeddings, [{"title": rid} for rid in ids],
+                      [f"{rid} v{version}" for rid in ids], {"version": version})
+
+
+def test_rewrite_leaves_mapped_index_intact(tmp_path):
+    index_dir = str(tmp_path / "numpy_index")
+    write_index(index_dir, ["a", "b"], version=1)
+    old = NumpyRetriever(index_dir)
+
+    write_index(index_dir, ["c", "d", "e"], version=2)
+    assert read_index_info(index_dir) == {"version": 2}
+    assert [hit.id for hit in NumpyRetriever(index_dir).search_one([0, 0, 1, 0], 1)] == ["e"]
+    # the old retriever still reads its own files, not the new ones
+    assert [(hit.id, hit.document) for hit in old.search_one([0, 1, 0, 0], 1)] == [("b", "b v1")]
+    assert sorted(os.listdir(tmp_path)) == ["numpy_index"]
@@ -2,10 +2,14 @@ from gtts import gTTS
 import uuid
 import os
 
+from config import settings
+
 def text_to_speech(text: str, lang: str) -> str:
-    os.makedirs("static/voice", exist_ok=True)
+    os.makedirs(os.path.join(settings.STATIC_DIR, "voice"), exist_ok=True)
 
-    filename = f"static/voice/{uuid.uuid4().hex}.mp3"
+    # written under STATIC_DIR, returned as the URL path it is served from
+    name = f"{uuid.uuid4().hex}.mp3"
+    filename = f"static/voice/{name}"
     lang_lower = lang.lower()
 
     if lang_lower == "hindi":
@@ -16,6 +20,6 @@ def text_to_speech(text: str, lang: str) -> str:
         lang_code = "en"
 
     tts = gTTS(text=text, lang=lang_code)
-    tts.save(filename)
+    tts.save(os.path.join(settings.STATIC_DIR, "voice", name))
 
     return filename
@@ -0,0 +1,26 @@
+"""
+Token counting for context budgets and usage stats.
+
+Uses tiktoken's o200k_base (the gpt-oss tokenizer family) when it is installed, and
+falls back to ~4 characters per token otherwise, which is close enough for budgets.
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
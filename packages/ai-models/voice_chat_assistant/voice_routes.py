@@ -1,25 +1,27 @@
-from fastapi import APIRouter, UploadFile, Form
+from fastapi import APIRouter, Depends, UploadFile, Form
+import asyncio
 import os
 
 from speech_to_text import speech_to_text
 from text_to_speech import text_to_speech
-from app import answer_user_query, collection   
+from app import answer_user_query, require_ready
+from config import settings
 
 router = APIRouter()
 
-@router.post("/voice-chat")
+@router.post("/voice-chat", dependencies=[Depends(require_ready)])
 async def voice_chat(file: UploadFile, language: str = Form("english")):
     temp_path = None
     try:
         # 1) Save uploaded audio temporarily
-        os.makedirs("static/voice", exist_ok=True)
-        temp_path = f"static/voice/{file.filename}"
+        os.makedirs(os.path.join(settings.STATIC_DIR, "voice"), exist_ok=True)
+        temp_path = os.path.join(settings.STATIC_DIR, "voice", file.filename)
         
         with open(temp_path, "wb") as f:
             f.write(await file.read())
 
-        # 2) Convert speech → text
-        user_msg = speech_to_text(temp_path)
+        # 2) Convert speech → text (ffmpeg + Google STT: blocking, so in a worker thread)
+        user_msg = await asyncio.to_thread(speech_to_text, temp_path)
 
         if not user_msg or user_msg.strip() == "":
             return {
@@ -29,10 +31,10 @@ async def voice_chat(file: UploadFile, language: str = Form("english")):
             }
 
         # 3) Pass transcription to RAG — forced to selected language
-        bot_reply = answer_user_query(user_msg, collection, language)
+        bot_reply = await answer_user_query(user_msg, language=language)
 
         # 4) Convert reply to speech — same language user selected
-        audio_file = text_to_speech(bot_reply, language)
+        audio_file = await asyncio.to_thread(text_to_speech, bot_reply, language)
 
         return {
             "audio_url": audio_file,